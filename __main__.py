@@ -1,17 +1,43 @@
 from abc import ABC, abstractmethod
-from functools import reduce
+from functools import partial, reduce
+from collections import OrderedDict
 from enum import Enum, auto
 from time import time as get_cur_time
-from string import ascii_lowercase, ascii_uppercase
-from random import randint, uniform as randfloat, choice as random_choice, sample as random_sample, shuffle
+from string import ascii_uppercase
+from random import getrandbits
 from platform import system
-from math import pi, sqrt
+from argparse import ArgumentParser
+from sys import stdout
+from contextlib import nullcontext
+from os import cpu_count
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 from prompt_toolkit import HTML
 from prompt_toolkit.styles import Style
 from prompt_toolkit.layout.controls import FormattedTextControl
-from prompt_toolkit.filters import renderer_height_is_known, has_focus
+from prompt_toolkit.filters import renderer_height_is_known, has_focus, to_filter
+from prompt_toolkit.filters import Condition as FilterCondition
 from button_replacement import Button
+from question_generation import (
+    TestSettings,
+    TestDifficultySetting,
+    TestContentArea,
+    TestQuestionCountSetting,
+    QuestionRecordType,
+    get_input_error_msg,
+    generate_question,
+    generate_question_bank,
+    question_record_to_dict,
+    warm_question_caches
+)
+from question_bank import QuestionBank, QuestionBankError, write_question_bank
+from persistent_vector import PersistentVector
+from results_store import ResultsStore
+from leaderboard import Leaderboard, LeaderboardEntry
+from telnet_server import DEFAULT_PORT, serve
+from prefork_server import serve_prefork
 from prompt_toolkit.widgets import (
     Dialog,
     Label,
@@ -33,17 +59,13 @@ from prompt_toolkit.layout.containers import (
     VerticalAlign
 )
 from prompt_toolkit.layout import Layout
+from prompt_toolkit.layout.layout import walk
 from prompt_toolkit.key_binding.key_bindings import KeyBindings, merge_key_bindings
 from prompt_toolkit.key_binding.bindings.focus import focus_next, focus_previous
 from prompt_toolkit.output.color_depth import ColorDepth
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.application import Application
 
-# The target element to focus when switching scenes. if none, equals None.
-# this is safe because only one app can run at a time.
-global__default_target_focus = None
-
-
 def exit_current_app():
     """Exits the current application, restoring previous terminal state."""
     get_app().exit()
@@ -55,6 +77,7 @@ class RootScreenType(Enum):
     SETTINGS = auto()
     HELP = auto()
     PLAYING = auto()
+    LEADERBOARD = auto()
 
 
 class UsernameScreenState:
@@ -62,6 +85,11 @@ class UsernameScreenState:
     the user is taken to the menu screen."""
     root_screen_type = RootScreenType.SET_USERNAME
 
+    def __init__(self, question_bank=None, results_store=None, leaderboard=None):
+        self.question_bank = question_bank
+        self.results_store = results_store
+        self.leaderboard = leaderboard
+
 
 class MenuScreenState:
     """Screen where user can navigate to all the other screens (play screen,
@@ -91,6 +119,15 @@ class SettingsScreenState:
         self.session = session
 
 
+class LeaderboardScreenState:
+    """Screen showing the best tests and class statistics, overall and for each
+    difficulty and content area."""
+    root_screen_type = RootScreenType.LEADERBOARD
+
+    def __init__(self, session):
+        self.session = session
+
+
 class PlayingScreenState:
     """Screen where the user takes the test."""
     root_screen_type = RootScreenType.PLAYING
@@ -103,22 +140,91 @@ class PlayingScreenState:
 class Session:
     """Stores information about the user (username) and the test settings to be
     shared across all screens in this execution of the program."""
-    def __init__(self, username, settings):
+    def __init__(self, username, settings, question_bank=None, results_store=None,
+                 leaderboard=None):
         self.username = username
         self.settings = settings
+        # The records of the test to take if the questions come from a
+        # question bank (eg. a QuestionBankSlice, or a list of records),
+        # otherwise None (questions are randomly generated).
+        self.question_bank = question_bank
+        # ResultsStore finished tests are recorded in, or None to not record
+        # them.
+        self.results_store = results_store
+        # Leaderboard shared by every session in this process, or None.
+        self.leaderboard = leaderboard
+
+    @property
+    def test_settings(self):
+        """The settings the test questions are generated with: the question
+        bank's when the questions come from one that knows them (any sequence
+        of records can be used as a question bank)."""
+        return getattr(self.question_bank, 'settings', None) or self.settings
 
 
 class Test:
-    def __init__(self, start_time, questions, question_index):
+    def __init__(self, start_time, questions, question_index, score):
         # When the current test was started.
         self.start_time = start_time
-        # TestQuestion list.
+        # TestQuestion persistent vector, so answering a question only copies
+        # O(log n) of it and old test states stay valid.
         self.questions = questions
         # The index of the current question.
         self.question_index = question_index
+        # TestScore of the questions (kept up to date with each answer so the
+        # questions never have to be rescanned).
+        self.score = score
         pass
 
 
+class TestScore:
+    def __init__(self, question_count, correct_count=0, incorrect_count=0, incorrect_questions=0):
+        self.question_count = question_count
+        self.correct_count = correct_count
+        self.incorrect_count = incorrect_count
+        # Bitset of the incorrectly answered question indices.
+        self.incorrect_questions = incorrect_questions
+
+    @property
+    def unanswered_count(self):
+        return self.question_count - self.correct_count - self.incorrect_count
+
+    @property
+    def first_incorrect_question_index(self):
+        # Index of the lowest set bit, or None if no question is incorrect.
+        if self.incorrect_questions == 0:
+            return None
+        return (self.incorrect_questions & -self.incorrect_questions).bit_length() - 1
+
+    def iter_incorrect_question_indices(self):
+        incorrect_questions = self.incorrect_questions
+        while incorrect_questions:
+            lowest_bit = incorrect_questions & -incorrect_questions
+            yield lowest_bit.bit_length() - 1
+            incorrect_questions ^= lowest_bit
+
+    def update(self, question_index, old_answer_state_type, new_answer_state_type):
+        # Returns the score after the answer state of a question changes.
+        correct_count = self.correct_count
+        incorrect_count = self.incorrect_count
+        incorrect_questions = self.incorrect_questions
+        question_bit = 1 << question_index
+
+        if old_answer_state_type == TestQuestionAnswerStateType.ANSWERED_CORRECT:
+            correct_count -= 1
+        elif old_answer_state_type == TestQuestionAnswerStateType.ANSWERED_INCORRECT:
+            incorrect_count -= 1
+            incorrect_questions &= ~question_bit
+
+        if new_answer_state_type == TestQuestionAnswerStateType.ANSWERED_CORRECT:
+            correct_count += 1
+        elif new_answer_state_type == TestQuestionAnswerStateType.ANSWERED_INCORRECT:
+            incorrect_count += 1
+            incorrect_questions |= question_bit
+
+        return TestScore(self.question_count, correct_count, incorrect_count, incorrect_questions)
+
+
 class TestQuestion:
     def __init__(self, question_component, answer_state):
         # The component that renders this question.
@@ -154,33 +260,6 @@ class TestQuestionAnswerStateAnsweredIncorrect:
         self.chosen_answer = chosen_answer
 
 
-class TestSettings:
-    def __init__(self, difficulty, content, question_count):
-        # Either normal or god mode.
-        self.difficulty = difficulty
-        # A set containing the content in the test.
-        self.content = content
-        # The number of questions in the test.
-        self.question_count = question_count
-
-
-class TestDifficultySetting(Enum):
-    NORMAL = auto()
-    HARD = auto()
-
-
-class TestContentArea(Enum):
-    NUMBER_THEORY = auto()
-    ALGEBRA = auto()
-    GEOMETRY = auto()
-
-
-class TestQuestionCountSetting(Enum):
-    SHORT = 15 # 15 Questions.
-    NORMAL = 30 # 30 Questions.
-    LONG = 60 # 60 Questions.
-
-
 def InputDialog(
     on_ok,
     on_cancel,
@@ -268,6 +347,10 @@ def create_horizontal_button_list_keybindings(buttons):
 
 
 def SetUsernameScreen(controller):
+    question_bank = controller.state.question_bank
+    results_store = controller.state.results_store
+    leaderboard = controller.state.leaderboard
+
     def is_username_valid(username):
         return len(username) > 0
 
@@ -281,7 +364,10 @@ def SetUsernameScreen(controller):
                 content={TestContentArea.NUMBER_THEORY,
                          TestContentArea.ALGEBRA, TestContentArea.GEOMETRY},
                 question_count=TestQuestionCountSetting.NORMAL
-            )
+            ),
+            question_bank=question_bank,
+            results_store=results_store,
+            leaderboard=leaderboard
         )
         new_state = MenuScreenState(session)
         controller.set_state(new_state)
@@ -297,15 +383,24 @@ def SetUsernameScreen(controller):
 
 
 def MenuScreen(controller):
+    # The menu only changes with the session (its handlers read the current
+    # state), so it is reused eg. when coming back from the help screen.
+    return controller.mount('menu', controller.state.session,
+                            lambda: build_menu_screen(controller))
+
+
+def build_menu_screen(controller):
     def on_start_click():
         # Generate questions and start test.
         start_time = get_cur_time()
+        questions = make_questions(controller)
         new_state = PlayingScreenState(
             session=controller.state.session,
             test=Test(
                 start_time=start_time,
-                questions=make_questions(controller),
-                question_index=0
+                questions=questions,
+                question_index=0,
+                score=TestScore(len(questions))
             )
         )
         controller.set_state(new_state)
@@ -323,6 +418,11 @@ def MenuScreen(controller):
         )
         controller.set_state(new_state)
 
+    def on_leaderboard_click():
+        # Go to leaderboard screen.
+        new_state = LeaderboardScreenState(session=controller.state.session)
+        controller.set_state(new_state)
+
     buttons = [
         Button('start', handler=on_start_click),
         Button('settings', handler=on_settings_click),
@@ -330,6 +430,9 @@ def MenuScreen(controller):
         Button('quit', handler=exit_current_app)
     ]
 
+    if controller.state.session.leaderboard is not None:
+        buttons.insert(2, Button('leaderboard', handler=on_leaderboard_click))
+
     keybindings = create_vertical_button_list_keybindings(buttons)
 
     body = Box(
@@ -438,10 +541,17 @@ Clicking "retry test" will allow you to restart the entire test - your questions
 
 Clicking "retry incorrect questions" will allow you to retry only the questions marked incorrect. The questions marked correct will remain correct.
 
+The leaderboard screen, which can be accessed through the menu screen, ranks the tests taken by score and then by time taken, for all tests or only the tests of a difficulty or content area. Tests still being taken are shown with their score so far.
+
 Good luck!'''
 
 
 def HelpScreen(controller):
+    # The help screen never changes (going back reads the current state).
+    return controller.mount('help', None, lambda: build_help_screen(controller))
+
+
+def build_help_screen(controller):
     body = Box(
         TextArea(
             help_text,
@@ -561,7 +671,10 @@ def SettingsScreen(controller):
                     difficulty=difficulty,
                     content=set(content),
                     question_count=question_count
-                )
+                ),
+                question_bank=controller.state.session.question_bank,
+                results_store=controller.state.session.results_store,
+                leaderboard=controller.state.session.leaderboard
             )
         )
         controller.set_state(new_state)
@@ -595,6 +708,117 @@ def SettingsScreen(controller):
     return ToolbarFrame(body, toolbar_content, position=ToolbarFrameToolbarPosition.BOTTOM)
 
 
+# How often (in seconds) the leaderboard screen redraws to show other users'
+# progress.
+LEADERBOARD_REFRESH_INTERVAL = 2
+
+# How many tests the leaderboard screen lists.
+LEADERBOARD_SIZE = 10
+
+
+def LeaderboardScreen(controller):
+    state = controller.state
+    leaderboard = state.session.leaderboard
+
+    # The values get the rankings when they are shown (a ranking is only added
+    # to the leaderboard once a test of its kind is).
+    ranking_ui = RadioList(values=[
+        (lambda: leaderboard.overall, 'All Tests'),
+        (partial(leaderboard.difficulty_ranking, 'normal'), 'Normal'),
+        (partial(leaderboard.difficulty_ranking, 'hard'), 'God Mode'),
+        (partial(leaderboard.content_ranking, 'number_theory'), 'Number Theory'),
+        (partial(leaderboard.content_ranking, 'algebra'), 'Algebra'),
+        (partial(leaderboard.content_ranking, 'geometry'), 'Geometry')
+    ])
+
+    def update_leaderboard():
+        # Reads the results log, so only done when the screen is shown and
+        # then every refresh (not on every render).
+        leaderboard.catch_up()
+        leaderboard.prune_live(get_cur_time())
+
+    update_leaderboard()
+
+    def get_ranking_text():
+        ranking = ranking_ui.current_value()
+
+        if len(ranking) == 0:
+            return 'No tests taken yet.'
+
+        lines = [
+            '%2s. %-20s %3s/%-3s %4.0f%%  %8s%s' % (
+                i + 1, entry.username[:20], entry.correct_count, entry.question_count,
+                entry.score * 100, format_short_time(entry.time_taken),
+                '' if entry.finished else '  (in progress)')
+            for i, entry in enumerate(ranking.top(LEADERBOARD_SIZE))
+        ]
+        lines.append('')
+        lines.append('Tests: %s   Mean score: %.0f%%   Median score: %.0f%%   Mean time: %s' % (
+            len(ranking), ranking.mean_score * 100, ranking.median_score * 100,
+            format_short_time(ranking.mean_time_taken)))
+        return '\n'.join(lines)
+
+    ranking_window = Window(content=FormattedTextControl(get_ranking_text))
+
+    async def refresh_periodically():
+        while controller.state is state:
+            await asyncio.sleep(LEADERBOARD_REFRESH_INTERVAL)
+            update_leaderboard()
+            # Only the ranking changes, the rest of the screen isn't redrawn.
+            get_app().invalidate_window(ranking_window)
+
+    get_app().create_background_task(refresh_periodically())
+
+    body = Box(
+        HSplit(
+            [
+                Label(text=HTML('<b><i>Leaderboard</i></b>')),
+                VSplit(
+                    [
+                        ranking_ui,
+                        ranking_window
+                    ],
+                    padding=Dimension(preferred=2, max=2)
+                )
+            ],
+            padding=Dimension(preferred=1, max=1)
+        ),
+        style='bg:#88ff88 #000000'
+    )
+
+    def on_back_click():
+        # Go to menu screen.
+        new_state = MenuScreenState(session=state.session)
+        controller.set_state(new_state)
+
+    buttons = [
+        Button('back', handler=on_back_click),
+        Button('quit', handler=exit_current_app)
+    ]
+
+    toolbar_keybindings = KeyBindings()
+
+    @toolbar_keybindings.add('up')
+    def _toolbar_on_key_up(_):
+        app = get_app()
+        app.layout.focus(ranking_ui)
+
+    toolbar_content = Box(
+        VSplit(
+            children=buttons,
+            align=HorizontalAlign.CENTER,
+            padding=Dimension(preferred=10, max=10),
+            key_bindings=merge_key_bindings([
+                create_horizontal_button_list_keybindings(buttons),
+                toolbar_keybindings
+            ])
+        ),
+        height=1
+    )
+
+    return ToolbarFrame(body, toolbar_content, position=ToolbarFrameToolbarPosition.BOTTOM)
+
+
 class QuestionComponent(ABC):
     @abstractmethod
     def render(self, update_question_answer_state):
@@ -603,6 +827,33 @@ class QuestionComponent(ABC):
     def refocus(self):
         pass
 
+    def release_view(self):
+        """Drops the widgets kept from previous renders."""
+        pass
+
+
+# How many questions of a session keep their widgets built, so going back and
+# forth between them doesn't build them again.
+QUESTION_VIEW_CACHE_SIZE = 16
+
+
+class QuestionViewCache:
+    """Least recently rendered question components whose widgets are kept.
+    Components evicted from the cache release their widgets."""
+
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._question_components = OrderedDict()
+
+    def touch(self, question_component):
+        """Marks the component as rendered, evicting the least recently
+        rendered component if the cache is full."""
+        self._question_components[question_component] = None
+        self._question_components.move_to_end(question_component)
+        while len(self._question_components) > self._capacity:
+            evicted_component, _ = self._question_components.popitem(last=False)
+            evicted_component.release_view()
+
 
 def get_is_test_current_question_answered(controller):
     test = controller.state.test
@@ -615,63 +866,82 @@ class MultipleChoiceQuestion(QuestionComponent):
         self._question = question
         self._choices = choices
         self._correct_choice_index = correct_choice_index
+        # The widgets, kept while the question is in the question view cache,
+        # and the answer state they show.
+        self._view = None
+        self._rendered_answer_state = None
 
     def render(self, update_question_answer_state):
+        # The widgets are built once and only patched when the answer state
+        # changed since they were last rendered.
+        self._update_question_answer_state = update_question_answer_state
+        self._controller.question_views.touch(self)
+        if self._view is None:
+            self._view = self._build()
+            self._rendered_answer_state = None
+
+        is_answered = get_is_test_current_question_answered(self._controller)
+        test = self._controller.state.test
+        answer_state = test.questions[test.question_index].answer_state
+        if answer_state is not self._rendered_answer_state:
+            self._show_answer_state(answer_state, is_answered)
+            self._rendered_answer_state = answer_state
+
+        if not is_answered:
+            self._controller.default_target_focus = self._first_button
+
+        return self._view
+
+    def _show_answer_state(self, answer_state, is_answered):
+        correct_choice_index = self._correct_choice_index
+
+        for (letter, i, choice_text, button) in zip(
+                ascii_uppercase, range(len(self._choices)), self._choices, self._buttons):
+            # Updates button element for the MC choice.
+            is_correct_answer = is_answered and i == correct_choice_index
+            is_correct_chosen_answer = is_answered and i == correct_choice_index and answer_state.type == TestQuestionAnswerStateType.ANSWERED_CORRECT and answer_state.chosen_answer == i
+            is_incorrect_chosen_answer = is_answered and i != correct_choice_index and answer_state.type == TestQuestionAnswerStateType.ANSWERED_INCORRECT and answer_state.chosen_answer == i
+
+            button.update(
+                '[%s] %s%s' % (letter, choice_text, ' ✓' if is_correct_chosen_answer else (
+                    ' ✘' if is_incorrect_chosen_answer else '')),
+                focusable=not is_answered,
+                class_='correct' if is_correct_answer else 'incorrect' if is_incorrect_chosen_answer else None
+            )
+
+    def _build(self):
         question = self._question
         choices = self._choices
         correct_choice_index = self._correct_choice_index
-        is_answered = get_is_test_current_question_answered(self._controller)
 
         def make_choice_click_handler(choice_index):
             is_correct_choice_index = choice_index == correct_choice_index
 
             def on_choice_click():
                 # One of the choices was chosen.
-                if is_answered:
+                if get_is_test_current_question_answered(self._controller):
                     return
                 if is_correct_choice_index:
                     # Answered correct.
-                    update_question_answer_state(
+                    self._update_question_answer_state(
                         TestQuestionAnswerStateAnsweredCorrect(choice_index))
                 else:
                     # Answered incorrect.
-                    update_question_answer_state(
+                    self._update_question_answer_state(
                         TestQuestionAnswerStateAnsweredIncorrect(choice_index))
 
             return on_choice_click
 
-        test = self._controller.state.test
-        answer_state = test.questions[test.question_index].answer_state
-
-        def make_button(letter, i, choice_text):
-            # Makes button element for the MC choice with click handler.
-            is_correct_answer = is_answered and i == correct_choice_index
-            is_correct_chosen_answer = is_answered and i == correct_choice_index and answer_state.type == TestQuestionAnswerStateType.ANSWERED_CORRECT and answer_state.chosen_answer == i
-            is_incorrect_chosen_answer = is_answered and i != correct_choice_index and answer_state.type == TestQuestionAnswerStateType.ANSWERED_INCORRECT and answer_state.chosen_answer == i
-
-            return Button(
-                '[%s] %s%s' % (letter, choice_text, ' ✓' if is_correct_chosen_answer else (
-                    ' ✘' if is_incorrect_chosen_answer else '')),
-                handler=make_choice_click_handler(i),
-                focusable=not is_answered,
-                class_='correct' if is_correct_answer else 'incorrect' if is_incorrect_chosen_answer else None
-            )
-
+        # The text, focusability and style are set by _show_answer_state().
         buttons = [
-            make_button(letter, i, choice_text) for (letter, i, choice_text) in zip(
-                ascii_uppercase,
-                range(len(choices)),
-                choices,
-            )
+            Button('[%s] %s' % (letter, choice_text), handler=make_choice_click_handler(i))
+            for (letter, i, choice_text) in zip(ascii_uppercase, range(len(choices)), choices)
         ]
+        self._buttons = buttons
 
         first_button = buttons[0]
         self._first_button = first_button
 
-        global global__default_target_focus
-        if not is_answered:
-            global__default_target_focus = first_button
-
         keybindings = create_vertical_button_list_keybindings(buttons)
         is_first_button_selected = has_focus(first_button)
 
@@ -717,6 +987,11 @@ class MultipleChoiceQuestion(QuestionComponent):
         # Focus first MC button.
         app.layout.focus(first_button)
 
+    def release_view(self):
+        self._view = None
+        self._buttons = None
+        self._first_button = None
+
 
 class InputQuestion(QuestionComponent):
     def __init__(self, controller, question, get_input_error_msg, is_ans_correct, ex_correct_ans):
@@ -725,21 +1000,69 @@ class InputQuestion(QuestionComponent):
         self._get_input_error_msg = get_input_error_msg
         self._is_ans_correct = is_ans_correct
         self._ex_correct_ans = ex_correct_ans
+        # The widgets, kept while the question is in the question view cache,
+        # and the answer state they show.
+        self._view = None
+        self._rendered_answer_state = None
 
     def render(self, update_question_answer_state):
+        # The widgets are built once and only patched when the answer state
+        # changed since they were last rendered.
+        self._update_question_answer_state = update_question_answer_state
+        self._controller.question_views.touch(self)
+        if self._view is None:
+            self._view = self._build()
+            self._rendered_answer_state = None
+
         is_answered = get_is_test_current_question_answered(self._controller)
-        error_msg = None
+        self._error_msg = None
+
+        test = self._controller.state.test
+        answer_state = test.questions[test.question_index].answer_state
+        if answer_state is not self._rendered_answer_state:
+            self._show_answer_state(answer_state, is_answered)
+            self._rendered_answer_state = answer_state
+
+        if not is_answered:
+            self._controller.default_target_focus = self._textfield
+
+        return self._view
+
+    def _show_answer_state(self, answer_state, is_answered):
+        is_answered_correct = answer_state.type == TestQuestionAnswerStateType.ANSWERED_CORRECT
+        is_answered_incorrect = answer_state.type == TestQuestionAnswerStateType.ANSWERED_INCORRECT
+
+        textfield = self._textfield
+        textfield.read_only = is_answered
+        textfield.control.focusable = to_filter(not is_answered)
+        if is_answered:
+            textfield.text = ' ' + answer_state.chosen_answer + (
+                ' ✓' if is_answered_correct else ' ✘ answer is ' + self._ex_correct_ans)
+        elif self._is_answered_shown:
+            # Retrying the question.
+            textfield.text = ''
+        textfield.window.style = 'class:text-area ' + (
+            correct_style if is_answered_correct else incorrect_style if is_answered_incorrect else 'bg:#aaffaa #000000 italic')
+        textfield.window.get_line_prefix = None if is_answered else lambda line_number, wrap_count: '> '
+        self._ok_button.update('Ok', focusable=not is_answered)
+        # The Ok button is removed once answered.
+        self._bottom_group.children = self._bottom_group_children[:1 if is_answered else 2]
+        self._is_answered_shown = is_answered
+
+    def _build(self):
+        def show_error_msg(error):
+            self._error_msg = error
+            # Only the error label changes. (The rest of the screen is drawn
+            # again if it changed width.)
+            get_app().invalidate_window(error_label.window)
 
         def on_accept(buffer):
-            if is_answered:
+            if get_is_test_current_question_answered(self._controller):
                 return
             error = self._get_input_error_msg(textfield.text)
             if error:
                 # If error update UI with error msg.
-                nonlocal error_msg
-                error_msg = error
-                app = get_app()
-                app.invalidate()
+                show_error_msg(error)
             else:
                 # If no error focus OK button.
                 get_app().layout.focus(ok_button)
@@ -747,48 +1070,32 @@ class InputQuestion(QuestionComponent):
 
         def on_ok_clicked():
             # When OK button clicked.
-            if is_answered:
+            if get_is_test_current_question_answered(self._controller):
                 return
             ans = textfield.text
             error = self._get_input_error_msg(ans)
             if error:
                 # If error update UI with error msg.
-                nonlocal error_msg
-                error_msg = error
-                app = get_app()
-                app.invalidate()
+                show_error_msg(error)
                 return
             # If no error update answer as either correct/incorrect.
             if self._is_ans_correct(ans):
-                update_question_answer_state(
+                self._update_question_answer_state(
                     TestQuestionAnswerStateAnsweredCorrect(ans))
             else:
-                update_question_answer_state(
+                self._update_question_answer_state(
                     TestQuestionAnswerStateAnsweredIncorrect(ans))
 
-        test = self._controller.state.test
-        answer_state = test.questions[test.question_index].answer_state
-        is_answered_correct = answer_state.type == TestQuestionAnswerStateType.ANSWERED_CORRECT
-        is_answered_incorrect = answer_state.type == TestQuestionAnswerStateType.ANSWERED_INCORRECT
+        # The text, style and focusability are set by _show_answer_state().
         textfield = TextArea(
             multiline=False,
             wrap_lines=False,
-            read_only=is_answered,
-            focusable=not is_answered,
-            accept_handler=on_accept,
-            text=' ' + answer_state.chosen_answer +
-                 (' ✓' if is_answered_correct else ' ✘ answer is ' +
-                                                   self._ex_correct_ans) if is_answered else '',
-            style=correct_style if is_answered_correct else incorrect_style if is_answered_incorrect else 'bg:#aaffaa #000000 italic',
-            get_line_prefix=None if is_answered else lambda line_number, wrap_count: '> '
+            accept_handler=on_accept
         )
         self._textfield = textfield
-        ok_button = Button(text="Ok", handler=on_ok_clicked,
-                           focusable=not is_answered)
-
-        global global__default_target_focus
-        if not is_answered:
-            global__default_target_focus = textfield
+        self._is_answered_shown = False
+        ok_button = Button(text="Ok", handler=on_ok_clicked)
+        self._ok_button = ok_button
 
         keybindings = KeyBindings()
         is_textfield_focused = has_focus(textfield)
@@ -808,15 +1115,12 @@ class InputQuestion(QuestionComponent):
             app = get_app()
             app.layout.focus(textfield)
 
+        error_label = Label(text=lambda: self._error_msg or '', width=lambda: len(
+            self._error_msg) if self._error_msg else 0, dont_extend_height=True)
         bottom_toolbar = ConditionalContainer(
             content=Box(
                 VSplit(
-                    children=[
-                        DynamicContainer(
-                            get_container=lambda: Label(text=error_msg or '', width=len(
-                                error_msg) if error_msg else 0, dont_extend_height=True)
-                        )
-                    ],
+                    children=[error_label],
                     align=HorizontalAlign.CENTER,
                     padding=Dimension(preferred=10, max=10),
                     style='#dd0000'
@@ -826,17 +1130,21 @@ class InputQuestion(QuestionComponent):
             filter=renderer_height_is_known
         )
 
-        bottom_group_children = [
+        self._bottom_group_children = [
             VSplit(
                 [textfield],
                 align=HorizontalAlign.CENTER
-            )
-        ]
-        if not is_answered:
-            bottom_group_children.append(VSplit(
+            ),
+            VSplit(
                 [ok_button],
                 align=HorizontalAlign.CENTER
-            ))
+            )
+        ]
+        self._bottom_group = HSplit(
+            list(self._bottom_group_children),
+            padding=1,
+            key_bindings=keybindings,
+        )
 
         return Box(
             HSplit(
@@ -849,11 +1157,7 @@ class InputQuestion(QuestionComponent):
                         # Push input and ok button to bottom of screen.
                         height=Dimension(preferred=100000, max=100000)
                     ),
-                    HSplit(
-                        bottom_group_children,
-                        padding=1,
-                        key_bindings=keybindings,
-                    ),
+                    self._bottom_group,
                     bottom_toolbar
                 ],
                 padding=Dimension(preferred=2, max=2),
@@ -872,658 +1176,147 @@ class InputQuestion(QuestionComponent):
         # Focus textfield element.
         app.layout.focus(textfield)
 
+    def release_view(self):
+        self._view = None
+        self._textfield = None
+        self._ok_button = None
+        self._bottom_group = None
+        self._bottom_group_children = None
 
-def get_integer_error_msg(text):
-    try:
-        int(text)
-        return None
-    except ValueError:
-        return 'Please enter an integer.'
 
+# Shared by every test, so that many sessions in one process don't each start
+# their own thread.
+question_generation_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix='question-generation')
 
-def get_float_error_msg(text):
-    try:
-        float(text)
-        return None
-    except ValueError:
-        return 'Please enter a valid number.'
-
-
-def get_test_progress(controller, question_index):
-    """Maps the test progress to a float between 0 and 1"""
-    settings = controller.state.session.settings
-    question_count = settings.question_count.value
-    # Between 0 and 1.
-    return question_index / (question_count - 1)
-
-
-# https://stackoverflow.com/questions/1969240/mapping-a-range-of-values-to-another
-def map_range(value, leftMin, leftMax, rightMin, rightMax):
-    # Figure out how 'wide' each range is
-    leftSpan = leftMax - leftMin
-    rightSpan = rightMax - rightMin
-
-    # Convert the left range into a 0-1 range (float)
-    valueScaled = float(value - leftMin) / float(leftSpan)
-
-    # Convert the 0-1 range into a value in the right range.
-    return rightMin + (valueScaled * rightSpan)
-
-
-def q_bodmas(controller, question_index):
-    difficulty = controller.state.session.settings.difficulty
-
-    def add_parens(str):
-        """8+4 => (8+4)"""
-        return '(%s)' % str
-
-    def addition_op(lhs, rhs):
-        """8,4 => 8+4"""
-        (lhs_str, lhs_value, _) = lhs
-        (rhs_str, rhs_value, _) = rhs
-        new_str = '%s + %s' % (lhs_str, add_parens(rhs_str)
-                               if rhs_str[0] == '-' else rhs_str)
-        new_value = lhs_value + rhs_value
-        return new_str, new_value, False
-
-    def subtraction_op(lhs, rhs):
-        """8,4 => 8-4"""
-        (lhs_str, lhs_value, _) = lhs
-        (rhs_str, rhs_value, is_rhs_grouped) = rhs
-        new_str = '%s - %s' % (lhs_str,
-                               rhs_str if is_rhs_grouped else add_parens(rhs_str))
-        new_value = lhs_value - rhs_value
-        return new_str, new_value, False
-
-    def multiplication_op(lhs, rhs):
-        """8,4 => 8*4"""
-        (lhs_str, lhs_value, is_lhs_grouped) = lhs
-        (rhs_str, rhs_value, is_rhs_grouped) = rhs
-        new_str = '%s × %s' % (lhs_str if is_lhs_grouped else add_parens(
-            lhs_str), rhs_str if is_rhs_grouped else add_parens(rhs_str))
-        new_value = lhs_value * rhs_value
-        return new_str, new_value, True
-
-    # https://stackoverflow.com/questions/6800193/what-is-the-most-efficient-way-of-finding-all-the-factors-of-a-number-in-python
-    def factors(n):
-        """Gets all factors of n."""
-        return set(reduce(list.__add__,
-                          ([i, n // i] for i in range(1, int(n ** 0.5) + 1) if n % i == 0)))
-
-    def division_op(dividend):
-        """8,4 => 8/4"""
-        (dividend_str, dividend_value, is_dividend_grouped) = dividend
-        if dividend_value == 0:
-            divisor = randint(1, 10)
-        else:
-            dividend_factors = factors(abs(dividend_value))
-            divisor = random_choice(list(dividend_factors))
-        new_str = '%s ÷ %s' % (
-            dividend_str if is_dividend_grouped else add_parens(dividend_str), divisor)
-        new_value = dividend_value // divisor
-        return new_str, new_value, True
-
-    superscript = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
-
-    def power_op(base):
-        """8 => 8^2"""
-        (base_str, base_value, _) = base
-        if base_value < 0 or base_value > 20:
-            return None
-        exponent = randint(1, 5 if base_value <=
-                           2 else 3 if base_value <= 4 else 2)
-        new_str = '%s%s' % (
-            base_str if base_str.isdigit() else add_parens(base_str), str(exponent).translate(superscript))
-        new_value = base_value ** exponent
-        return new_str, new_value, True
-
-    def negate_op(expr):
-        """8 => -8"""
-        (expr_str, expr_value, is_expr_grouped) = expr
-        new_str = '-%s' % (expr_str if is_expr_grouped else add_parens(expr_str))
-        new_value = -expr_value
-        return new_str, new_value, False
-
-    def parens_op(expr):
-        """8-4 => (8-4)"""
-        (expr_str, expr_value, _) = expr
-        if expr_str.isdigit():
-            return None
-        new_str = add_parens(expr_str)
-        new_value = expr_value
-        return new_str, new_value, True
-
-    multi_ops = [
-        addition_op,
-        subtraction_op,
-        multiplication_op,
-    ]
-
-    single_ops = [
-        division_op,
-        power_op,
-        negate_op,
-        parens_op,
-    ]
 
-    test_progress = get_test_progress(controller, question_index)
-    if difficulty == TestDifficultySetting.NORMAL:
-        difficulty_progression_factor = round(
-            map_range(test_progress, 0, 1, 0, 4))
-        iterations = randint(2 + difficulty_progression_factor,
-                             4 + difficulty_progression_factor)
-    else:
-        difficulty_progression_factor = round(
-            map_range(test_progress, 0, 1, 0, 15))
-        iterations = randint(5 + difficulty_progression_factor,
-                             10 + difficulty_progression_factor)
-
-    def get_random_number_expr():
-        number = randint(-10, 10)
-        return (
-            str(number),
-            number,
-            number >= 0
-        )
+class QuestionQueue:
+    """Generates the question records of a test in the background, ahead of the
+    student. The components rendering them are only created on the event loop,
+    as the questions are shown."""
 
-    def get_q_expr():
-        # Generate random BODMAS expression (eg. 4+(6*8)/2^2)
-        expr = get_random_number_expr()
-        previous_op = None
-
-        nonlocal iterations
-        while iterations > 0:
-            if randint(0, 1) == 0:
-                op = random_choice(multi_ops)
-                if op == previous_op:
-                    continue
-                random_expr = get_random_number_expr()
-                if randint(0, 1) == 0:
-                    new_expr = op(expr, random_expr)
-                else:
-                    new_expr = op(random_expr, expr)
-            else:
-                op = random_choice(single_ops)
-                if op == previous_op:
-                    continue
-                new_expr = op(expr)
-            if new_expr is None:
+    def __init__(self, controller, generate_record, question_count):
+        self._controller = controller
+        # Function taking a question index and returning its question record.
+        # It must always give the same record for the same index.
+        self._generate_record = generate_record
+        self._question_count = question_count
+        # Question index => record, for the questions generated so far. Written
+        # by both the generator thread and the event loop (the first record
+        # generated for an index is kept).
+        self._records = {0: generate_record(0)}
+        # Question index => component, for the questions shown so far.
+        self._question_components = {}
+        if question_count > 1:
+            question_generation_executor.submit(self._produce)
+
+    def __len__(self):
+        return self._question_count
+
+    def _produce(self):
+        for question_index in range(1, self._question_count):
+            if question_index in self._records:
                 continue
-            previous_op = op
-            expr = new_expr
-            iterations -= 1
-
-        return expr
-
-    (expr_str, expr_value, _) = get_q_expr()
-    question = 'Evaluate %s' % (expr_str)
-
-    if randint(0, 1) == 0:
-        return InputQuestion(
-            controller=controller,
-            question=question,
-            get_input_error_msg=get_integer_error_msg,
-            is_ans_correct=lambda ans: ans == str(expr_value),
-            ex_correct_ans=str(expr_value)
-        )
-
-    # Generate fake answers.
-    fake_answer_range = abs(expr_value) + 15
-    fake_answers = []
-    while True:
-        fake_answer = randint(-fake_answer_range, fake_answer_range)
-        if fake_answer == expr_value or fake_answer in fake_answers:
-            continue
-        fake_answers.append(fake_answer)
-        if len(fake_answers) == 3:
-            break
-
-    choices = [str(expr_value)] + fake_answers
-    shuffle(choices)
-    correct_choice_index = choices.index(str(expr_value))
-
-    return MultipleChoiceQuestion(controller, question, choices, correct_choice_index)
-
+            try:
+                record = self._generate_record(question_index)
+            except Exception:
+                # Generated (and raised) again when the question is requested.
+                return
+            self._records.setdefault(question_index, record)
+
+    def get(self, question_index):
+        """Returns the component of the given question. If the student is ahead
+        of the generator (eg. every generator thread is busy with other
+        sessions), the question is generated straight away rather than waiting,
+        which would block every session sharing the event loop."""
+        question_component = self._question_components.get(question_index)
+        if question_component is None:
+            record = self._records.get(question_index)
+            if record is None:
+                record = self._records.setdefault(
+                    question_index, self._generate_record(question_index))
+            question_component = make_question_component(self._controller, record)
+            self._question_components[question_index] = question_component
+        return question_component
+
+
+class QueuedQuestion(QuestionComponent):
+    """Renders the question at the given index of a QuestionQueue."""
+
+    def __init__(self, question_queue, question_index):
+        self._question_queue = question_queue
+        self._question_index = question_index
 
-def q_factorise_quadratic(controller, question_index):
-    # The algorithm to generate the quadratic is that we generate random numbers
-    # k, a, and b. The quadratic will be of form k*(x+a)*(a+b), which is
-    # expanded as k*x^2 + k*(a+b)*x + k*a*b, and hence we derive the question
-    # expression.
+    def render(self, update_question_answer_state):
+        question_component = self._question_queue.get(self._question_index)
+        return question_component.render(update_question_answer_state)
 
-    difficulty = controller.state.session.settings.difficulty
+    def refocus(self):
+        self._question_queue.get(self._question_index).refocus()
+
+
+def make_question_component(controller, record):
+    """Creates the component that renders the given question record."""
+    if record.type == QuestionRecordType.MULTIPLE_CHOICE:
+        return MultipleChoiceQuestion(
+            controller, record.question, record.choices, record.correct_choice_index)
+    return InputQuestion(
+        controller=controller,
+        question=record.question,
+        get_input_error_msg=lambda text: get_input_error_msg(
+            record.answer_format, text),
+        is_ans_correct=lambda ans: ans == record.correct_answer,
+        ex_correct_ans=record.correct_answer
+    )
 
-    test_progress = get_test_progress(controller, question_index)
 
-    if difficulty == TestDifficultySetting.NORMAL:
-        max_val = round(map_range(test_progress, 0, 1, 8, 20))
-        k = 1
-    else:
-        max_val = round(map_range(test_progress, 0, 1, 25, 100))
-        k = randint(1, max_val)
-    a = randint(-max_val, max_val)
-    b = randint(-max_val, max_val)
-    x2_coeff = k
-    x1_coeff = k * (a + b)
-    x0_coeff = k * (a * b)
-    poly = ('' if x2_coeff == 1 else str(x2_coeff)) + 'x²'
-    if x1_coeff != 0:
-        poly += (' + ' if x1_coeff > 0 else ' - ') + \
-                ('' if abs(x1_coeff) == 1 else str(abs(x1_coeff))) + 'x'
-    if x0_coeff != 0:
-        poly += (' + ' if x0_coeff > 0 else ' - ') + str(abs(x0_coeff))
-    question = f'Factorise {poly} fully.'
-
-    def make_factored_poly(a, b):
-        # a,b ==> k(x+a)(x+b).
-        def make_term(n):
-            if n == 0:
-                return 'x'
-            return '(x' + ('+' if n > 0 else '-') + str(abs(n)) + ')'
-
-        a_term = make_term(a)
-        b_term = make_term(b)
-        return str('' if k == 1 else str(k)) + (
-            a_term + '²' if a_term == b_term else b_term + a_term if b_term == 'x' else a_term + b_term)
-
-    correct_ans = make_factored_poly(a, b)
-    # Generate fake answers.
-    wrong_ans_error_range = (abs(a) + abs(b)) // 2 + 4
-    choices = list({correct_ans, make_factored_poly(a + randint(-wrong_ans_error_range, wrong_ans_error_range),
-                                                    b + randint(-wrong_ans_error_range, wrong_ans_error_range)),
-                    make_factored_poly(a + randint(-wrong_ans_error_range, wrong_ans_error_range),
-                                       b + randint(-wrong_ans_error_range, wrong_ans_error_range)),
-                    make_factored_poly(a + randint(-wrong_ans_error_range, wrong_ans_error_range),
-                                       b + randint(-wrong_ans_error_range, wrong_ans_error_range))})
-    shuffle(choices)
-    correct_choice_index = choices.index(correct_ans)
-
-    return MultipleChoiceQuestion(controller, question, choices, correct_choice_index)
-
-
-class PolyTerm:
-    # eg. PolyTerm('x', 3, 5) ==> 3x^5.
-    def __init__(self, variable, coeff, power):
-        self.variable = variable
-        self.coeff = coeff
-        self.power = power  # Integer >= 0.
-
-
-def poly_to_str(terms):
-    """Returns algebraic expression of the sum of all the list of PolyTerm's."""
-    poly_str = ''
-    for term in terms:
-        if term.coeff == 0:
-            continue
-        if term.coeff < 0:
-            if poly_str == '':
-                poly_str += '-'
-            else:
-                poly_str += ' - '
-        elif poly_str != '':
-            poly_str += ' + '
-        if abs(term.coeff) != 1:
-            poly_str += str(abs(term.coeff))
-        if term.power == 0:
-            continue
-        if term.power == 1:
-            poly_str += term.variable
-        else:
-            poly_str += term.variable + '^' + str(term.power)
-    return poly_str
-
-
-def q_simplify_linear(controller, question_index):
-    # 1. Generate random algebraic variable names (eg. 'x', 'a', 'e', 'z').
-    # 2. Generate a random number of integer coefficients for each variable.
-    # 3. Create question expression from coefficients eg. 2x+4y-2x+9x.
-    # 4. Create answer expression by summing variable coefficients.
-    #    eg. 9x+4y
-
-    difficulty = controller.state.session.settings.difficulty
-    test_progress = get_test_progress(controller, question_index)
-    if difficulty == TestDifficultySetting.NORMAL:
-        variables = random_sample(population=['x', 'y'], k=randint(1, 2))
-        coeff_range = round(map_range(test_progress, 0, 1, 12, 50))
-        max_terms_per_var = round(map_range(test_progress, 0, 1, 2, 6))
-    else:
-        variables = random_sample(population=list(
-            ascii_lowercase), k=randint(3, 8))
-        coeff_range = round(map_range(test_progress, 0, 1, 1000, 3000))
-        max_terms_per_var = round(map_range(test_progress, 0, 1, 5, 12))
-    variable_coeffs = [
-        [coeff * random_choice((-1, 1)) for coeff in random_sample(population=range(1, coeff_range), k=randint(
-            2, max_terms_per_var))] for _ in variables]
-    poly_q_terms = [PolyTerm(variable=variable, coeff=coeff, power=1) for (
-        variable, coeffs) in zip(variables, variable_coeffs) for coeff in coeffs]
-    shuffle(poly_q_terms)
-    poly_q = poly_to_str(poly_q_terms)
-    poly_ans_coeffs = [sum(coeffs) for coeffs in variable_coeffs]
-    poly_ans_terms = [PolyTerm(variable=variable, coeff=coeff, power=1) for (
-        variable, coeff) in zip(variables, poly_ans_coeffs)]
-    correct_ans = poly_to_str(poly_ans_terms)
-
-    def make_wrong_ans():
-        def map_term(term):
-            wrong_range = (abs(term.coeff) // 2) + 10
-            return PolyTerm(variable=term.variable, coeff=term.coeff + randint(-wrong_range, wrong_range),
-                            power=term.power)
-
-        return poly_to_str([map_term(term) for term in poly_ans_terms])
-
-    # Make fake answers.
-    choices = list({correct_ans, make_wrong_ans(),
-                    make_wrong_ans(), make_wrong_ans()})
-    shuffle(choices)
-    correct_choice_index = choices.index(correct_ans)
-    question = f'Simplify %s' % (poly_q)
-    return MultipleChoiceQuestion(controller, question, choices, correct_choice_index)
-
-
-def generate_pythag_triple_list():
-    # https://stackoverflow.com/questions/575117/generating-unique-ordered-pythagorean-triplets
-    def pythagore_triplets(n):
-        maxn = int(n * (2 ** 0.5)) + 1
-        squares = [x * x for x in range(maxn + 1)]
-        reverse_squares = dict([(squares[i], i) for i in range(maxn + 1)])
-        for x in range(1, n):
-            x2 = squares[x]
-            for y in range(x, n + 1):
-                y2 = squares[y]
-                z = reverse_squares.get(x2 + y2)
-                if z is not None:
-                    yield x, y, z
-
-    return list(pythagore_triplets(2000))
-
-
-pythag_triple_list = generate_pythag_triple_list()
-units = ['mm', 'cm', 'm', 'km', ' miles', ' yoctometers', ' planck lengths']
-
-
-def q_find_hypot(controller, question_index):
-    difficulty = controller.state.session.settings.difficulty
-    test_progress = get_test_progress(controller, question_index)
-    if difficulty == TestDifficultySetting.NORMAL:
-        upper_bound = round(map_range(test_progress, 0, 1, 15, 50))
-    else:
-        upper_bound = round(map_range(test_progress, 0, 1,
-                                      500, len(pythag_triple_list) - 1))
-    i = randint(0, upper_bound)
-    # Get pythag triple satisfying a^2+b^2=c^2.
-    a, b, c = pythag_triple_list[i]
-    unit = random_choice(units)
-    question = f'What is the length of the hypotenuse in a right angled triangle with non-hypotenuse sides of length {a}{unit} and {b}{unit}?'
-    # Fake answers are the adjacent pythag triple d^2+e^2=f^2
-    d, e, f = pythag_triple_list[1 if i == 0 else i - 1]
-    choices = list({str(c) + unit, str(d) + unit,
-                    str(e) + unit, str(f) + unit})
-    shuffle(choices)
-    correct_choice_index = choices.index(str(c) + unit)
-    return MultipleChoiceQuestion(controller, question, choices, correct_choice_index)
-
-
-def q_general_geometry(controller, question_index):
-    difficulty = controller.state.session.settings.difficulty
-    test_progress = get_test_progress(controller, question_index)
-
-    def rand_progressive(min_upper, max_upper):
-        difficulty_factor = 1 if difficulty == TestDifficultySetting.NORMAL else 100
-        return randint(min_upper, round(
-            map_range(test_progress, 0, 1, min_upper + (max_upper - min_upper) / 5, max_upper * difficulty_factor)))
-
-    def circle_area_from_radius(unit):
-        radius = rand_progressive(5, 100)
-        return f'What is the area of a circle with radius {radius}{unit}', pi * radius ** 2
-
-    def circle_area_from_diameter(unit):
-        diameter = rand_progressive(5, 200)
-        return f'What is the area of a circle with diameter {diameter}{unit}', pi * (diameter / 2) ** 2
-
-    def circle_area_from_circumference(unit):
-        circumference = rand_progressive(5, 600)
-        radius = circumference / 2 / pi
-        return f'What is the area of a circle with circumference {circumference}{unit}', pi * radius ** 2
-
-    def circle_circumference_from_radius(unit):
-        radius = rand_progressive(5, 100)
-        return f'What is the circumference of a circle with radius {radius}{unit}', 2 * pi * radius
-
-    def circle_circumference_from_diameter(unit):
-        diameter = rand_progressive(5, 200)
-        return f'What is the circumference of a circle with diameter {diameter}{unit}', 2 * pi * (diameter / 2)
-
-    def circle_circumference_from_area(unit):
-        area = rand_progressive(5, 10000)
-        radius = sqrt(area / pi)
-        return f'What is the circumference of a circle with area {area}{unit}', 2 * pi * radius
-
-    def circle_radius_from_diameter(unit):
-        diameter = rand_progressive(5, 200)
-        return f'What is the radius of a circle with diameter {diameter}{unit}', diameter / 2
-
-    def circle_radius_from_circumference(unit):
-        circumference = rand_progressive(5, 600)
-        return f'What is the radius of a circle with circumference {circumference}{unit}', circumference / 2 / pi
-
-    def circle_radius_from_area(unit):
-        area = rand_progressive(5, 10000)
-        return f'What is the radius of a circle with area {area}{unit}', sqrt(area / pi)
-
-    def circle_diameter_from_radius(unit):
-        radius = rand_progressive(5, 100)
-        return f'What is the diameter of a circle with radius {radius}{unit}', radius * 2
-
-    def circle_diameter_from_circumference(unit):
-        circumference = rand_progressive(5, 600)
-        return f'What is the diameter of a circle with circumference {circumference}{unit}', circumference / pi
-
-    def circle_diameter_from_area(unit):
-        area = rand_progressive(5, 10000)
-        return f'What is the diameter of a circle with area {area}{unit}', sqrt(area / pi) * 2
-
-    def square_perimeter_from_side_length(unit):
-        side_length = rand_progressive(5, 100)
-        return f'What is the perimeter of a square with side length {side_length}{unit}', side_length * 4
-
-    def square_perimeter_from_area(unit):
-        area = rand_progressive(5, 10000)
-        return f'What is the perimeter of a square with area {area}{unit}', sqrt(area) * 4
-
-    def square_side_length_from_perimeter(unit):
-        perimeter = rand_progressive(5, 400)
-        return f'What is the side length of a square with perimeter {perimeter}{unit}', perimeter / 4
-
-    def square_side_length_from_area(unit):
-        area = rand_progressive(5, 100000)
-        return f'What is the side length of a square with area {area}{unit}', sqrt(area)
-
-    def square_area_from_side_length(unit):
-        side_length = rand_progressive(5, 100)
-        return f'What is the area of a square with side length {side_length}{unit}', side_length ** 2
-
-    def square_area_from_perimeter(unit):
-        perimeter = rand_progressive(5, 400)
-        return f'What is the area of a square with perimeter {perimeter}{unit}', (perimeter / 4) ** 2
-
-    def rectangle_area_from_side_lengths(unit):
-        a = rand_progressive(5, 100)
-        b = rand_progressive(5, 100)
-        return f'What is the area of a rectangle with side lengths {a}{unit} and {b}{unit}', a * b
-
-    def rectangle_perimeter_from_side_lengths(unit):
-        a = rand_progressive(5, 100)
-        b = rand_progressive(5, 100)
-        return f'What is the perimeter of a rectangle with side lengths {a}{unit} and {b}{unit}', 2 * (a + b)
-
-    def triangle_area_from_base_height(unit):
-        base = rand_progressive(5, 100)
-        height = rand_progressive(5, 100)
-        return f'What is the area of a triangle with base {base}{unit} and height {height}{unit}', base * height / 2
-
-    def trapezoid_area_from_top_bottom_height(unit):
-        top = rand_progressive(5, 100)
-        bottom = rand_progressive(5, 100)
-        height = rand_progressive(5, 100)
-        return f'What is the area of a trapezoid with bottom side {bottom}{unit}, top side {top}{unit} and height {height}{unit}', (
-            bottom + top) / 2 * height
-
-    def rhombus_area_from_diagonals(unit):
-        p = rand_progressive(5, 100)
-        q = rand_progressive(5, 100)
-        return f'What is the area of a rhombus with diagonals {p}{unit} and {q}{unit}', p * q / 2
-
-    def kite_area_from_diagonals(unit):
-        p = rand_progressive(5, 100)
-        q = rand_progressive(5, 100)
-        return f'What is the area of a kite with diagonals {p}{unit} and {q}{unit}', p * q / 2
-
-    def hypot_from_ab(unit):
-        a = rand_progressive(5, 100)
-        b = rand_progressive(5, 100)
-        return f'What is the length of the hypotenuse in a right angled triangle with non-hypotenuse sides of length {a}{unit} and {b}{unit}', sqrt(
-            a ** 2 + b ** 2)
-
-    def b_from_hypot_a(unit):
-        a = rand_progressive(5, 100)
-        hypot = rand_progressive(a + 1, a * 2)
-        return f'What is the length of the other non-hypotenuse side in a right angled triangle with hypotenuse of length {hypot}{unit} and non-hypotenuse side of length {a}{unit}', sqrt(
-            hypot ** 2 - a ** 2)
-
-    q_factories = [
-        circle_area_from_radius,
-        circle_area_from_diameter,
-        circle_area_from_circumference,
-        circle_circumference_from_radius,
-        circle_circumference_from_diameter,
-        circle_circumference_from_area,
-        circle_radius_from_diameter,
-        circle_radius_from_circumference,
-        circle_radius_from_area,
-        circle_diameter_from_radius,
-        circle_diameter_from_circumference,
-        circle_diameter_from_area,
-        square_perimeter_from_side_length,
-        square_perimeter_from_area,
-        square_side_length_from_perimeter,
-        square_side_length_from_area,
-        square_area_from_side_length,
-        square_area_from_perimeter,
-        rectangle_area_from_side_lengths,
-        rectangle_perimeter_from_side_lengths,
-        triangle_area_from_base_height,
-        trapezoid_area_from_top_bottom_height,
-        rhombus_area_from_diagonals,
-        kite_area_from_diagonals,
-        hypot_from_ab,
-        b_from_hypot_a
-    ]
+class QuestionBankQueue:
+    """Creates the question components of a test from question bank records as
+    they are needed."""
 
-    # Choose random type of question.
-    q_factory = random_choice(q_factories)
-    unit = random_choice(units)
-    (question, exact_ans) = q_factory(unit)
-    # Get how many decimal points to round to.
-    dp = 0 if float(exact_ans).is_integer() else randint(0, 4)
-
-    # https://stackoverflow.com/questions/20457038/how-to-round-to-2-decimals-with-python
-    def roundTraditional(val, digits):
-        # round() function is not sufficient, (eg. sometimes rounds 5 down).
-        return round(val + 10 ** (-len(str(val)) - 1), digits)
-
-    correct_ans = float(roundTraditional(exact_ans, dp))
-    question += f' to the nearest {unit.lstrip().rstrip("s")}?' if dp == 0 else f' to {dp} decimal place{"" if dp == 1 else "s"}?'
-
-    def num_to_str(num):
-        return '%.*f' % (dp, num)
-
-    def get_input_error_msg(text):
-        float_err = get_float_error_msg(text)
-        if float_err is not None:
-            return float_err
-        num = float(text)
-        if num < 0:
-            return 'Please enter a positive integer.'
-        return None
-
-    if randint(0, 1) == 0:
-        return InputQuestion(
-            controller=controller,
-            question=question,
-            get_input_error_msg=get_input_error_msg,
-            is_ans_correct=lambda num: num == num_to_str(correct_ans),
-            ex_correct_ans=num_to_str(correct_ans)
-        )
+    def __init__(self, controller, records):
+        self._controller = controller
+        # Sequence of question records (not decoded until accessed).
+        self._records = records
+        # Question index => component, for the questions shown so far.
+        self._question_components = {}
 
-    # Generate fake answers.
-    fake_answer_min = round(correct_ans / 3) + 1
-    fake_answer_max = round(correct_ans * 3) + 1
-    fake_answers = []
+    def __len__(self):
+        return len(self._records)
 
-    while True:
-        if correct_ans.is_integer():
-            fake_answer = randint(fake_answer_min, fake_answer_max)
-        else:
-            # Ensure rounding is same (eg. 0.2000 correct ans => 0.6000 fake
-            # answer instead of 0.6429 as otherwise the correct ans is too
-            # obvious).
-            rounded_correct_ans = num_to_str(correct_ans)
-            num_zeros = len(rounded_correct_ans) - \
-                len(rounded_correct_ans.rstrip('0'))
-            fake_answer = roundTraditional(
-                randfloat(fake_answer_min, fake_answer_max), dp - num_zeros)
-        if fake_answer == correct_ans or fake_answer in fake_answers:
-            # Ensure no duplicate answers.
-            continue
-        fake_answers.append(fake_answer)
-        if len(fake_answers) == 3:
-            break
-
-    choices = [num_to_str(
-        num) + unit for num in ([correct_ans] + fake_answers)]
-    shuffle(choices)
-    correct_choice_index = choices.index(num_to_str(correct_ans) + unit)
-
-    return MultipleChoiceQuestion(controller, question, choices, correct_choice_index)
+    def get(self, question_index):
+        question_component = self._question_components.get(question_index)
+        if question_component is None:
+            question_component = make_question_component(
+                self._controller, self._records[question_index])
+            self._question_components[question_index] = question_component
+        return question_component
 
 
 def make_questions(controller):
+    # The settings can't change during the test, and the generator thread
+    # shouldn't read the controller state as the user navigates.
     settings = controller.state.session.settings
-    content = settings.content
-    question_count = settings.question_count
-
-    # Add questions for chosen content areas.
-    possible_questions = []
-    if TestContentArea.NUMBER_THEORY in content:
-        possible_questions += [
-            q_bodmas
-        ]
-    if TestContentArea.ALGEBRA in content:
-        possible_questions += [
-            q_factorise_quadratic,
-            q_simplify_linear
-        ]
-    if TestContentArea.GEOMETRY in content:
-        possible_questions += [
-            q_find_hypot,
-            # Multiple times to increase probability of being chosen!!!!!
-            q_general_geometry,
-            q_general_geometry,
-            q_general_geometry,
-            q_general_geometry
-        ]
+    question_bank = controller.state.session.question_bank
 
-    def make_question(question_index):
-        # Creates random question component.
-        make_question_component = random_choice(possible_questions)
-        question_component = make_question_component(
-            controller, question_index)
-        return TestQuestion(
-            question_component=question_component,
-            answer_state=TestQuestionAnswerStateNotAnswered()
-        )
+    if question_bank is not None:
+        # Everyone using the bank gets the same questions.
+        question_queue = QuestionBankQueue(controller, question_bank)
+    else:
+        seed = getrandbits(64)
 
-    return [make_question(i) for i in range(question_count.value)]
+        # The questions are generated in the background. Retrying the test
+        # reuses the question components (and therefore the same queue).
+        question_queue = QuestionQueue(
+            controller, partial(generate_question, settings, seed),
+            settings.question_count.value)
+
+    return PersistentVector.from_iterable(
+        TestQuestion(
+            question_component=QueuedQuestion(question_queue, i),
+            answer_state=TestQuestionAnswerStateNotAnswered()
+        ) for i in range(len(question_queue))
+    )
 
 
 def format_time(time):
@@ -1534,13 +1327,61 @@ def format_time(time):
     return 'Hours: %s, Minutes: %s, Seconds: %s' % (h, m, s)
 
 
+def format_short_time(time):
+    """Formats the time as [hours:]minutes:seconds."""
+    m, s = divmod(round(time), 60)
+    h, m = divmod(m, 60)
+
+    return '%d:%02d:%02d' % (h, m, s) if h else '%d:%02d' % (m, s)
+
+
+def make_live_leaderboard_entry(session, test):
+    """Creates the leaderboard entry of a test in progress."""
+    settings = session.test_settings
+    return LeaderboardEntry(
+        username=session.username,
+        difficulty=settings.difficulty.name.lower(),
+        content=tuple(sorted(content.name.lower() for content in settings.content)),
+        correct_count=test.score.correct_count,
+        question_count=test.score.question_count,
+        start_time=test.start_time,
+        finish_time=get_cur_time(),
+        finished=False
+    )
+
+
+def make_test_result(session, test, finish_time):
+    """Creates the record of a finished test stored in the results store."""
+    settings = session.test_settings
+    time_taken = finish_time - test.start_time
+    return {
+        'username': session.username,
+        'difficulty': settings.difficulty.name.lower(),
+        'content': sorted(content.name.lower() for content in settings.content),
+        'question_count': test.score.question_count,
+        'correct_count': test.score.correct_count,
+        'answers': [
+            {
+                'state': question.answer_state.type.name.lower(),
+                'chosen_answer': getattr(question.answer_state, 'chosen_answer', None)
+            } for question in test.questions
+        ],
+        # A test finished again (after going back or retrying the incorrect
+        # questions) keeps its start time, so its latest result supersedes the
+        # earlier ones.
+        'start_time': test.start_time,
+        'finish_time': finish_time,
+        'time_taken': time_taken,
+        'time_taken_formatted': format_time(time_taken)
+    }
+
+
 def FinishScreen(controller):
     # Screen at end of test displaying score, time played and restart options.
     session = controller.state.session
     test = controller.state.test
-    questions_count = session.settings.question_count
-    questions_right = sum(1 if question.answer_state.type ==
-                          TestQuestionAnswerStateType.ANSWERED_CORRECT else 0 for question in test.questions)
+    questions_count = test.score.question_count
+    questions_right = test.score.correct_count
 
     start_time = test.start_time
     current_time = get_cur_time()
@@ -1548,7 +1389,13 @@ def FinishScreen(controller):
     time_played_formatted = format_time(time_played)
 
     text = "Congratulations! You reached the end of the test. You scored %s/%s.\n\nTime Taken:\n%s" % (
-        questions_right, questions_count.value, time_played_formatted)
+        questions_right, questions_count, time_played_formatted)
+
+    if session.leaderboard is not None:
+        entry = session.leaderboard.get(session.username, test.start_time)
+        if entry is not None and entry.finished:
+            text += "\n\nLeaderboard position: %s of %s" % (
+                session.leaderboard.overall.rank(entry), len(session.leaderboard.overall))
 
     def on_back_click():
         # Go back to last question of test.
@@ -1557,7 +1404,8 @@ def FinishScreen(controller):
             test=Test(
                 start_time=test.start_time,
                 questions=test.questions,
-                question_index=len(test.questions) - 1
+                question_index=len(test.questions) - 1,
+                score=test.score
             )
         )
         controller.set_state(new_state)
@@ -1601,38 +1449,37 @@ def FinishScreen(controller):
     def on_retry_test_click():
         # Retry test and reset all questions as unanswered.
         start_time = get_cur_time()
-        new_questions = [TestQuestion(question_component=question.question_component,
-                                      answer_state=TestQuestionAnswerStateNotAnswered()) for question in test.questions]
+        new_questions = PersistentVector.from_iterable(
+            TestQuestion(question_component=question.question_component,
+                         answer_state=TestQuestionAnswerStateNotAnswered()) for question in test.questions)
         new_state = PlayingScreenState(
             session=session,
             test=Test(
                 start_time=start_time,
                 questions=new_questions,
-                question_index=0
+                question_index=0,
+                score=TestScore(len(new_questions))
             )
         )
         controller.set_state(new_state)
 
     def on_retry_incorrect_questions_click():
         # Retry test and reset all incorrect questions as unanswered.
-        def map_question(question):
-            if question.answer_state.type == TestQuestionAnswerStateType.ANSWERED_INCORRECT:
-                return TestQuestion(question_component=question.question_component,
-                                    answer_state=TestQuestionAnswerStateNotAnswered())
-            return question
-
-        for i, question in enumerate(test.questions):
-            if question.answer_state.type == TestQuestionAnswerStateType.ANSWERED_INCORRECT:
-                first_incorrect_question_index = i
-                break
-        new_questions = [map_question(question) for question in test.questions]
+        # Only the incorrect questions are copied, the rest are shared.
+        new_questions = test.questions
+        for i in test.score.iter_incorrect_question_indices():
+            new_questions = new_questions.set(i, TestQuestion(
+                question_component=test.questions[i].question_component,
+                answer_state=TestQuestionAnswerStateNotAnswered()))
         new_state = PlayingScreenState(
             session=session,
             test=Test(
                 start_time=test.start_time,
                 questions=new_questions,
                 # Skip to first incorrect question.
-                question_index=first_incorrect_question_index
+                question_index=test.score.first_incorrect_question_index,
+                # Every incorrect question is now unanswered.
+                score=TestScore(test.score.question_count, test.score.correct_count)
             )
         )
         controller.set_state(new_state)
@@ -1642,12 +1489,11 @@ def FinishScreen(controller):
         Button('retry test', handler=on_retry_test_click)
     ]
 
-    if questions_right != questions_count.value:
+    if questions_right != questions_count:
         main_buttons.append(Button('retry incorrect questions',
                                    handler=on_retry_incorrect_questions_click))
 
-    global global__default_target_focus
-    global__default_target_focus = main_buttons[0]
+    controller.default_target_focus = main_buttons[0]
 
     main_keybindings = create_vertical_button_list_keybindings(main_buttons)
 
@@ -1686,6 +1532,72 @@ def FinishScreen(controller):
     return ToolbarFrame(body, toolbar_content, position=ToolbarFrameToolbarPosition.TOP)
 
 
+class PlayingScreenToolbar:
+    """Toolbar of the playing screen (question number and navigation buttons).
+    Built once per session and updated for each question."""
+
+    def __init__(self):
+        self.back_button = Button('(back)')
+        self.next_button = Button('(next)')
+        self.help_button = Button('help')
+        self.menu_button = Button('menu')
+        self._question_label = Label(text='', dont_extend_height=True)
+        # The question component refocused when pressing down.
+        self._question_component = None
+        self._has_back_button = False
+
+        buttons = [self.back_button, self.help_button, self.menu_button,
+                   Button('quit', handler=exit_current_app), self.next_button]
+
+        # Same as create_horizontal_button_list_keybindings, but the (back)
+        # button isn't always shown.
+        toolbar_keybindings = KeyBindings()
+        is_first_not_selected = FilterCondition(lambda: not get_app().layout.has_focus(
+            self.back_button if self._has_back_button else self.help_button))
+        is_last_not_selected = ~has_focus(self.next_button)
+        toolbar_keybindings.add('left', filter=is_first_not_selected)(focus_previous)
+        toolbar_keybindings.add('right', filter=is_last_not_selected)(focus_next)
+
+        is_button_focused = reduce(lambda a, b: a | b, map(has_focus, buttons))
+
+        @toolbar_keybindings.add('down', filter=is_button_focused)
+        def _toolbar_on_key_down(_):
+            self._question_component.refocus()
+
+        self._container = Box(
+            VSplit(
+                children=[
+                    self._question_label,
+                    ConditionalContainer(self.back_button,
+                                         filter=FilterCondition(lambda: self._has_back_button))
+                ] + buttons[1:],
+                align=HorizontalAlign.CENTER,
+                key_bindings=toolbar_keybindings
+            ),
+            height=1
+        )
+
+    def update(self, question_index, question_count, question_component,
+               on_back_click, on_help_click, on_menu_click, on_next_click):
+        question_label_text = 'Q%s.' % (question_index + 1)
+        self._question_label.text = question_label_text
+        self._question_label.window.width = len(question_label_text) + 3
+        self._question_component = question_component
+        self._has_back_button = question_index > 0
+
+        self.back_button.handler = on_back_click
+        self.help_button.handler = on_help_click
+        self.menu_button.handler = on_menu_click
+        self.next_button.handler = on_next_click
+        if question_index == question_count - 1:
+            self.next_button.update('(finish test)')
+        else:
+            self.next_button.update('(next)')
+
+    def __pt_container__(self):
+        return self._container
+
+
 def PlayingScreen(controller):
     session = controller.state.session
     test = controller.state.test
@@ -1706,16 +1618,18 @@ def PlayingScreen(controller):
             question_component=current_question_component,
             answer_state=answer_state
         )
-        new_questions = test.questions.copy()
-        new_questions[test.question_index] = new_current_question
-        new_state = PlayingScreenState(
-            session=session,
-            test=Test(
-                start_time=test.start_time,
-                questions=new_questions,
-                question_index=test.question_index
-            )
+        new_questions = test.questions.set(test.question_index, new_current_question)
+        new_score = test.score.update(
+            test.question_index, current_question.answer_state.type, answer_state.type)
+        new_test = Test(
+            start_time=test.start_time,
+            questions=new_questions,
+            question_index=test.question_index,
+            score=new_score
         )
+        if session.leaderboard is not None:
+            session.leaderboard.update(make_live_leaderboard_entry(session, new_test))
+        new_state = PlayingScreenState(session=session, test=new_test)
         controller.set_state(new_state)
 
     body = current_question_component.render(update_question_answer_state)
@@ -1727,19 +1641,29 @@ def PlayingScreen(controller):
             test=Test(
                 start_time=test.start_time,
                 questions=test.questions,
-                question_index=test.question_index - 1
+                question_index=test.question_index - 1,
+                score=test.score
             )
         )
         controller.set_state(new_state)
 
     def on_next_click():
         # Go to next question.
+        if test.question_index == len(test.questions) - 1:
+            # Finishing the test, record the result (written in the background).
+            result = make_test_result(session, test, get_cur_time())
+            if session.results_store is not None:
+                session.results_store.record(result)
+            if session.leaderboard is not None:
+                session.leaderboard.update(LeaderboardEntry.from_result(result))
+
         new_state = PlayingScreenState(
             session=session,
             test=Test(
                 start_time=test.start_time,
                 questions=test.questions,
-                question_index=test.question_index + 1
+                question_index=test.question_index + 1,
+                score=test.score
             )
         )
         controller.set_state(new_state)
@@ -1754,47 +1678,27 @@ def PlayingScreen(controller):
 
     def on_menu_click():
         # Go to menu (exiting test).
+        if session.leaderboard is not None:
+            session.leaderboard.discard_live(session.username, test.start_time)
         new_state = MenuScreenState(session=session)
         controller.set_state(new_state)
 
-    buttons = [
-        Button('help', handler=on_help_click),
-        Button('menu', handler=on_menu_click),
-        Button('quit', handler=exit_current_app)
-    ]
-
-    if test.question_index > 0:
-        buttons.insert(
-            0, Button('(back)', handler=on_back_click))
-
-    if test.question_index == len(test.questions) - 1:
-        buttons.append(Button('(finish test)', handler=on_next_click))
-    else:
-        buttons.append(Button('(next)', handler=on_next_click))
+    toolbar = controller.mount('playing toolbar', None, PlayingScreenToolbar)
+    toolbar.update(
+        question_index, len(test.questions), current_question_component,
+        on_back_click=on_back_click,
+        on_help_click=on_help_click,
+        on_menu_click=on_menu_click,
+        on_next_click=on_next_click
+    )
 
     if current_question.answer_state.type != TestQuestionAnswerStateType.NOT_ANSWERED:
-        global global__default_target_focus
-        global__default_target_focus = buttons[-1]
-
-    toolbar_keybindings = create_horizontal_button_list_keybindings(buttons)
-    is_button_focused = reduce(lambda a, b: a | b, map(has_focus, buttons))
-
-    @toolbar_keybindings.add('down', filter=is_button_focused)
-    def _toolbar_on_key_down(_):
-        current_question_component.refocus()
-
-    question_label_text = 'Q%s.' % (question_index + 1)
-    toolbar_content = Box(
-        VSplit(
-            children=[Label(text=question_label_text, dont_extend_height=True, width=len(
-                question_label_text) + 3)] + buttons,
-            align=HorizontalAlign.CENTER,
-            key_bindings=toolbar_keybindings
-        ),
-        height=1
-    )
+        controller.default_target_focus = toolbar.next_button
 
-    return ToolbarFrame(body, toolbar_content, position=ToolbarFrameToolbarPosition.TOP)
+    # Reused as long as the question is (eg. when it is answered).
+    return controller.mount(
+        'playing', body,
+        lambda: ToolbarFrame(body, toolbar, position=ToolbarFrameToolbarPosition.TOP))
 
 
 def RootScreen(controller):
@@ -1816,17 +1720,71 @@ def RootScreen(controller):
     if state.root_screen_type == RootScreenType.PLAYING:
         return PlayingScreen(controller)
 
+    if state.root_screen_type == RootScreenType.LEADERBOARD:
+        return LeaderboardScreen(controller)
+
 
 class Controller:
     # Controls state management and re-rendering according to changed state.
     def __init__(self, state, Screen):
         self._Screen = Screen
+        # The target element to focus when switching screens, or None. Set by
+        # the screen being rendered, and kept per controller so each
+        # application (eg. each telnet session) has its own.
+        self.default_target_focus = None
+        # Question components that keep their widgets between renders.
+        self.question_views = QuestionViewCache(QUESTION_VIEW_CACHE_SIZE)
+        # Whether the focus still has to be moved for the current screen (see
+        # resolve_focus).
+        self._is_focus_pending = False
+        # Slot => (key, component) of the components mounted by screens, so a
+        # screen rendered again can patch its widgets instead of building them
+        # from scratch (see mount).
+        self._mounted = {}
         self._container = DynamicContainer(lambda: self._current_screen)
         self.set_state(state)
 
     def set_state(self, new_state):
         self.state = new_state
+        # A target left by a screen that was never rendered (eg. two key
+        # presses handled before a render) isn't in the new screen.
+        self.default_target_focus = None
         self._current_screen = self._Screen(self)
+        self._is_focus_pending = True
+
+    def resolve_focus(self, layout):
+        """Moves the focus for the screen set by the last set_state, once,
+        before it is rendered: to the screen's target if it has one, otherwise
+        to the first focusable element if the focused element isn't on the new
+        screen (or can't be focused any more)."""
+        if not self._is_focus_pending:
+            return
+        self._is_focus_pending = False
+
+        target = self.default_target_focus
+        self.default_target_focus = None
+        if target is not None:
+            layout.focus(target)
+            return
+
+        focusable_windows = [
+            container for container in walk(self._container, skip_hidden=True)
+            if isinstance(container, Window) and container.content.is_focusable()
+        ]
+        if focusable_windows and layout.current_window not in focusable_windows:
+            layout.focus(focusable_windows[0])
+
+    def mount(self, slot, key, build):
+        """Returns the component mounted in the slot if it was built for the
+        same key (eg. the same question), otherwise builds a new one with
+        build() and mounts it in place of the old one. The screen then patches
+        the component for the current state."""
+        mounted = self._mounted.get(slot)
+        if mounted is not None and mounted[0] == key:
+            return mounted[1]
+        component = build()
+        self._mounted[slot] = (key, component)
+        return component
 
     def __pt_container__(self):
         return self._container
@@ -1873,30 +1831,15 @@ exit_bindings = KeyBindings()
 exit_bindings.add('c-c')(lambda e: exit_current_app())
 
 
-def build_application():
+def build_application(question_bank=None, results_store=None, leaderboard=None):
     """Creates prompt_toolkit application."""
-    layout = Layout(RootController())
-
-    def ensure_focus(_):
-        """Ensures that at least one element on the screen is focused"""
-        app = get_app()
-
-        # When switching screens or something prompt_toolkit doesn't recognize
-        # the new focusable elements added to the screen. This will ensure that
-        # at least one container/ui is marked as focusable so the screen can be
-        # interacted with.
-
-        global global__default_target_focus  # Preferred element to be focused.
-
-        if global__default_target_focus:
-            app.layout.focus(global__default_target_focus)
-            global__default_target_focus = None  # Reset for next render.
+    controller = RootController(UsernameScreenState(question_bank, results_store, leaderboard))
+    layout = Layout(controller)
 
-            app.invalidate()  # Trigger re-render.
-        elif len(app.layout.get_visible_focusable_windows()) == 0:
-            focus_first_element()
-
-            app.invalidate()  # Trigger re-render.
+    def resolve_focus(_):
+        """Focuses an element of the new screen after a screen change, before
+        it is rendered (so it is rendered once, with the right focus)."""
+        controller.resolve_focus(layout)
 
     keybindings = KeyBindings()
     keybindings.add('tab')(focus_next)
@@ -1911,15 +1854,119 @@ def build_application():
         key_bindings=keybindings,
         full_screen=True,
         mouse_support=True,
-        after_render=ensure_focus,
+        before_render=resolve_focus,
         style=root_style,
         color_depth=ColorDepth.DEPTH_24_BIT if system() == 'Windows' else None
     )
 
 
+def run_generate_bank(args):
+    """Generates a question bank and writes it either as a binary question bank
+    or as json lines (one question per line)."""
+    settings = TestSettings(
+        difficulty=TestDifficultySetting[args.difficulty.upper()],
+        content={TestContentArea[content.upper()] for content in args.content},
+        question_count=TestQuestionCountSetting[args.test_length.upper()]
+    )
+    records = generate_question_bank(
+        settings, args.seed, args.count, processes=args.processes)
+
+    if args.format == 'binary':
+        write_question_bank(args.output, records, settings)
+        return
+
+    with open(args.output, 'w', encoding='utf-8') if args.output else nullcontext(stdout) as file:
+        for record in records:
+            file.write(json.dumps(question_record_to_dict(record),
+                                  ensure_ascii=False) + '\n')
+
+
 def main():
+    parser = ArgumentParser(prog='quick-maths')
+    subparsers = parser.add_subparsers(dest='command')
+
+    bank_parser = subparsers.add_parser(
+        'generate-bank', help='generate a reproducible bank of questions')
+    bank_parser.add_argument('count', type=int,
+                             help='the number of questions to generate')
+    bank_parser.add_argument('--seed', type=int, default=0)
+    bank_parser.add_argument('--difficulty', choices=['normal', 'hard'],
+                             default='normal')
+    bank_parser.add_argument('--content', nargs='+',
+                             choices=['number_theory', 'algebra', 'geometry'],
+                             default=['number_theory', 'algebra', 'geometry'])
+    bank_parser.add_argument('--test-length', choices=['short', 'normal', 'long'],
+                             default='normal')
+    bank_parser.add_argument('--processes', type=int, default=None)
+    bank_parser.add_argument('--format', choices=['jsonl', 'binary'],
+                             default='jsonl')
+    bank_parser.add_argument('--output', help='file to write to (default stdout)')
+
+    serve_parser = subparsers.add_parser(
+        'serve', help='serve the quiz over telnet to many users at once')
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--workers', type=int, default=1,
+                              help='number of worker processes (0 for one per cpu)')
+    serve_parser.add_argument('--drain-timeout', type=float, default=600,
+                              help='seconds stopping workers wait for running tests to finish')
+    serve_parser.add_argument('--stats-interval', type=float, default=0,
+                              help='seconds between printing worker session counts')
+
+    parser.add_argument('--bank', metavar='PATH',
+                        help='take a test from a binary question bank instead of generating one')
+    parser.add_argument('--bank-test', type=int, default=0,
+                        help='which test in the question bank to take')
+    parser.add_argument('--results', metavar='PATH', default='results.jsonl',
+                        help='file finished tests are appended to (default results.jsonl)')
+    parser.add_argument('--no-results', action='store_true',
+                        help="don't record finished tests")
+
+    args = parser.parse_args()
+
+    if args.command == 'generate-bank':
+        if args.format == 'binary' and not args.output:
+            parser.error('--format binary requires --output')
+        run_generate_bank(args)
+        return
+
+    question_bank = None
+    if args.bank:
+        try:
+            question_bank = QuestionBank(args.bank).get_test(args.bank_test)
+        except (OSError, QuestionBankError, IndexError) as error:
+            parser.error(str(error))
+
+    # Shared by every session (and worker process), so results finishing
+    # together are written with the same fsync.
+    results_store = None if args.no_results else ResultsStore(args.results)
+    # Loads the results logged so far (before forking, so the workers share
+    # it), then follows the log for results finished by other processes.
+    leaderboard = Leaderboard(None if args.no_results else args.results)
+    leaderboard.catch_up()
+
+    if args.command == 'serve':
+        # Every telnet session gets its own application.
+        def build_session_application():
+            return build_application(question_bank, results_store, leaderboard)
+
+        worker_count = args.workers or cpu_count() or 1
+        if worker_count == 1:
+            serve(build_session_application, host=args.host, port=args.port)
+            if results_store is not None:
+                results_store.close()
+        else:
+            serve_prefork(build_session_application, worker_count, host=args.host,
+                          port=args.port, warm=warm_question_caches,
+                          drain_timeout=args.drain_timeout,
+                          stats_interval=args.stats_interval,
+                          on_worker_exit=results_store.close if results_store else None)
+        return
+
     # Create and run application.
-    build_application().run()
+    build_application(question_bank, results_store, leaderboard).run()
+    if results_store is not None:
+        results_store.close()
 
 
 if __name__ == "__main__":
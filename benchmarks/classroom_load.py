@@ -0,0 +1,431 @@
+# Load test of a class of simulated students taking tests at once, each in its
+# own application (as in the telnet server), all sharing one event loop.
+#
+# Every student types their name, takes tests and answers questions (some of
+# them wrong, or with an invalid answer first), goes back to earlier questions
+# and retries the test or its incorrect questions, one key press at a time. The
+# applications read their key presses from a pipe and draw to an in-memory
+# terminal. Reports the time from each key press to the frame drawn for it, the
+# bytes written per frame and the memory used per session.
+#
+# The students' key presses and pauses only depend on the seed (the script
+# digest is printed so runs can be compared).
+#
+# Usage: python3 benchmarks/classroom_load.py [--students N] [--seed S] ...
+
+import asyncio
+import gc
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_PATH)
+
+from prompt_toolkit.application.current import create_app_session  # noqa: E402
+from prompt_toolkit.data_structures import Size  # noqa: E402
+from prompt_toolkit.input.defaults import create_pipe_input  # noqa: E402
+from prompt_toolkit.output.vt100 import Vt100_Output  # noqa: E402
+
+from leaderboard import Leaderboard  # noqa: E402
+from question_generation import (  # noqa: E402
+    QuestionRecordType, TestContentArea, TestDifficultySetting,
+    TestQuestionCountSetting, TestSettings, generate_question,
+    get_input_error_msg
+)
+
+# The program itself (__main__.py at the root of the repository).
+_spec = importlib.util.spec_from_file_location(
+    'quick_maths', os.path.join(ROOT_PATH, '__main__.py'))
+quick_maths = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(quick_maths)
+
+ENTER = '\r'
+BACKSPACE = '\x7f'
+CTRL_C = '\x03'
+DOWN = '\x1b[B'
+LEFT = '\x1b[D'
+
+# Settings of the students' sessions (the defaults of the username screen).
+SETTINGS = TestSettings(
+    difficulty=TestDifficultySetting.NORMAL,
+    content={TestContentArea.NUMBER_THEORY, TestContentArea.ALGEBRA,
+             TestContentArea.GEOMETRY},
+    question_count=TestQuestionCountSetting.NORMAL
+)
+
+
+class SimulatedStudent:
+    """
+    Writes the key presses of a student taking `test_count` tests, and the
+    pauses before each of them. The student follows the screens as they are
+    drawn, so the script only depends on the random number generator.
+
+    :param records: The question records of the student's test.
+    """
+
+    def __init__(self, name, records, rng, test_count=3, think_time=0.05,
+                 correct_probability=0.7, invalid_answer_probability=0.1,
+                 back_probability=0.15):
+        self.name = name
+        self.records = records
+        self._rng = rng
+        self._test_count = test_count
+        self._think_time = think_time
+        self._correct_probability = correct_probability
+        self._invalid_answer_probability = invalid_answer_probability
+        self._back_probability = back_probability
+        # (pause in seconds, key) pairs.
+        self.script = []
+        # The score of each test taken, once finished for the last time (as
+        # shown on the leaderboard).
+        self.expected_scores = []
+
+    def _press(self, *keys):
+        for key in keys:
+            pause = self._rng.expovariate(1 / self._think_time) if self._think_time else 0
+            self.script.append((pause, key))
+
+    def _type(self, text):
+        self._press(*text)
+
+    def write_script(self):
+        # Username screen: the name, then the Ok button.
+        self._type(self.name)
+        self._press(ENTER, ENTER)
+        # Menu screen: start is focused.
+        self._press(ENTER)
+
+        question_count = len(self.records)
+        # None (not answered), True (correct) or False (incorrect).
+        answers = [None] * question_count
+        question_index = 0
+        is_retrying_incorrect = False
+        for test_number in range(self._test_count):
+            self._take_test(answers, question_index)
+            if is_retrying_incorrect:
+                self.expected_scores.pop()
+            self.expected_scores.append(answers.count(True))
+
+            # Finish screen: 'back to menu', 'retry test' and (if any answer
+            # is incorrect) 'retry incorrect questions', the first focused.
+            is_last_test = test_number == self._test_count - 1
+            choice = self._rng.random()
+            is_retrying_incorrect = False
+            if not is_last_test and False in answers and choice < 0.4:
+                self._press(DOWN, DOWN, ENTER)
+                is_retrying_incorrect = True
+                question_index = answers.index(False)
+                answers = [None if answer is False else answer for answer in answers]
+            elif not is_last_test and choice < 0.7:
+                self._press(DOWN, ENTER)
+                question_index = 0
+                answers = [None] * question_count
+            else:
+                # Back to the menu, then start a new test (the same questions,
+                # as with a question bank).
+                self._press(ENTER)
+                if not is_last_test:
+                    self._press(ENTER)
+                question_index = 0
+                answers = [None] * question_count
+
+        self._press(CTRL_C)
+        return self.script
+
+    def _take_test(self, answers, question_index):
+        # Answers every question on the way to the end of the test, sometimes
+        # going back to look at an earlier question.
+        while question_index < len(answers):
+            if answers[question_index] is None:
+                # The question is focused.
+                answers[question_index] = self._answer(self.records[question_index])
+                # Now the (next) button is.
+            elif question_index > 0 and self._rng.random() < self._back_probability:
+                # (next) => quit => menu => help => (back)
+                self._press(LEFT, LEFT, LEFT, LEFT, ENTER)
+                question_index -= 1
+                continue
+            # (next) or (finish test).
+            self._press(ENTER)
+            question_index += 1
+
+    def _answer(self, record):
+        is_correct = self._rng.random() < self._correct_probability
+
+        if record.type == QuestionRecordType.MULTIPLE_CHOICE:
+            choice_index = record.correct_choice_index
+            if not is_correct:
+                choice_index = self._rng.choice([
+                    i for i in range(len(record.choices)) if i != record.correct_choice_index])
+            self._press(*[DOWN] * choice_index)
+            self._press(ENTER)
+            return is_correct
+
+        if self._rng.random() < self._invalid_answer_probability:
+            # Shows the error message, which is then deleted.
+            self._type('abc')
+            self._press(ENTER)
+            self._press(*[BACKSPACE] * 3)
+
+        answer = record.correct_answer
+        if not is_correct:
+            # Another valid answer.
+            wrong_answer = answer + str(self._rng.randrange(1, 10))
+            if get_input_error_msg(record.answer_format, wrong_answer) is None:
+                answer = wrong_answer
+            else:
+                is_correct = True
+        # Enter focuses the Ok button, which is then clicked.
+        self._type(answer)
+        self._press(ENTER, ENTER)
+        return is_correct
+
+
+class FrameRecorder:
+    """Output stream of a simulated terminal. The application flushes its
+    output once per frame."""
+
+    encoding = 'utf-8'
+
+    def __init__(self):
+        self.frame_sizes = []
+        self._unflushed_size = 0
+        self._frame_flushed = asyncio.Event()
+
+    def write(self, data):
+        self._unflushed_size += len(data)
+
+    def flush(self):
+        self.frame_sizes.append(self._unflushed_size)
+        self._unflushed_size = 0
+        self._frame_flushed.set()
+
+    def expect_frame(self):
+        self._frame_flushed.clear()
+
+    async def wait_for_frame(self, timeout):
+        """Waits for a frame flushed since expect_frame(). Returns False if the
+        timeout expired first."""
+        try:
+            await asyncio.wait_for(self._frame_flushed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class StudentRun:
+    """Measurements of one simulated student's session."""
+
+    def __init__(self):
+        self.latencies = []
+        self.frame_sizes = []
+        self.timed_out = False
+        self.error = None
+
+
+async def run_student(student, leaderboard, size, frame_timeout):
+    run = StudentRun()
+    pipe_input = create_pipe_input()
+    recorder = FrameRecorder()
+    output = Vt100_Output(recorder, lambda: size, term='xterm')
+    try:
+        with create_app_session(input=pipe_input, output=output):
+            app = quick_maths.build_application(student.records, None, leaderboard)
+            recorder.expect_frame()
+            app_task = asyncio.ensure_future(app.run_async())
+            if not await recorder.wait_for_frame(frame_timeout):
+                run.timed_out = True
+
+            # The last key press quits, which draws no frame.
+            for pause, key in student.script[:-1]:
+                if run.timed_out or app_task.done():
+                    break
+                await asyncio.sleep(pause)
+                recorder.expect_frame()
+                start_time = perf_counter()
+                pipe_input.send_text(key)
+                if not await recorder.wait_for_frame(frame_timeout):
+                    run.timed_out = True
+                    break
+                run.latencies.append(perf_counter() - start_time)
+
+            if not app_task.done():
+                pipe_input.send_text(CTRL_C)
+            try:
+                await asyncio.wait_for(app_task, frame_timeout)
+            except asyncio.TimeoutError:
+                run.timed_out = True
+    except Exception as error:
+        run.error = error
+    finally:
+        pipe_input.close()
+    run.frame_sizes = recorder.frame_sizes
+    return run
+
+
+def get_rss():
+    """Returns the resident memory of this process in bytes, or None if it
+    isn't known (only on Linux)."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+async def run_class(students, leaderboard, size, frame_timeout):
+    gc.collect()
+    baseline_rss = get_rss()
+    peak_rss = baseline_rss
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            await asyncio.sleep(0.1)
+            rss = get_rss()
+            if rss is not None:
+                peak_rss = max(peak_rss, rss)
+
+    sampler = asyncio.ensure_future(sample_rss())
+    start_time = perf_counter()
+    try:
+        runs = await asyncio.gather(*[
+            run_student(student, leaderboard, size, frame_timeout) for student in students])
+    finally:
+        sampler.cancel()
+    return runs, perf_counter() - start_time, baseline_rss, peak_rss
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def make_students(args):
+    question_count = SETTINGS.question_count.value
+    # A few different tests, shared out between the students.
+    tests = [
+        [generate_question(SETTINGS, args.seed, test_index * question_count + i)
+         for i in range(question_count)]
+        for test_index in range(min(args.students, 8))
+    ]
+    return [
+        SimulatedStudent(
+            'student%s' % i, tests[i % len(tests)], Random('%s:%s' % (args.seed, i)),
+            test_count=args.tests, think_time=args.think_time)
+        for i in range(args.students)
+    ]
+
+
+def count_wrong_scores(students, leaderboard):
+    """Returns how many students' finished tests on the leaderboard don't
+    have the scores their key presses should have given (eg. a key press
+    that didn't do what the student expected)."""
+    scores = {}
+    for entry in leaderboard.overall.top(len(leaderboard.overall)):
+        if entry.finished:
+            scores.setdefault(entry.username, []).append(entry.correct_count)
+    return sum(
+        sorted(scores.get(student.name, [])) != sorted(student.expected_scores)
+        for student in students)
+
+
+def summarize(args, students, runs, leaderboard, wall_time, baseline_rss, peak_rss):
+    script_digest = hashlib.sha1()
+    for student in students:
+        script_digest.update(repr(student.script).encode('utf-8'))
+    latencies = sorted(latency for run in runs for latency in run.latencies)
+    frame_sizes = sorted(size for run in runs for size in run.frame_sizes)
+    rss_per_session = None
+    if baseline_rss is not None:
+        rss_per_session = (peak_rss - baseline_rss) / len(runs)
+    return {
+        'students': len(students),
+        'seed': args.seed,
+        'terminal_size': [args.columns, args.rows],
+        'script_digest': script_digest.hexdigest()[:16],
+        'key_presses': len(latencies),
+        'timeouts': sum(run.timed_out for run in runs),
+        'errors': sorted(set(repr(run.error) for run in runs if run.error is not None)),
+        'wrong_scores': count_wrong_scores(students, leaderboard),
+        'wall_time': wall_time,
+        'latency_ms': {
+            name: percentile(latencies, fraction) * 1000
+            for name, fraction in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1)]
+        },
+        'frames': len(frame_sizes),
+        'bytes_per_frame': {
+            'mean': sum(frame_sizes) / len(frame_sizes) if frame_sizes else 0,
+            'p50': percentile(frame_sizes, 0.5),
+            'p99': percentile(frame_sizes, 0.99),
+            'max': percentile(frame_sizes, 1),
+        },
+        'rss_baseline': baseline_rss,
+        'rss_peak': peak_rss,
+        'rss_per_session': rss_per_session,
+    }
+
+
+def print_summary(summary):
+    print('%s students, seed %s, %sx%s terminals, script digest %s' % (
+        summary['students'], summary['seed'], summary['terminal_size'][0],
+        summary['terminal_size'][1], summary['script_digest']))
+    print('%s key presses in %.1f s (%.0f/s), %s timeouts, %s errors, %s wrong scores' % (
+        summary['key_presses'], summary['wall_time'],
+        summary['key_presses'] / summary['wall_time'], summary['timeouts'],
+        len(summary['errors']), summary['wrong_scores']))
+    for error in summary['errors']:
+        print('  %s' % error)
+    print('Key press to frame (ms):  p50 %.2f  p90 %.2f  p99 %.2f  max %.2f' % (
+        summary['latency_ms']['p50'], summary['latency_ms']['p90'],
+        summary['latency_ms']['p99'], summary['latency_ms']['max']))
+    print('Bytes per frame (%s frames):  mean %.0f  p50 %s  p99 %s  max %s' % (
+        summary['frames'], summary['bytes_per_frame']['mean'], summary['bytes_per_frame']['p50'],
+        summary['bytes_per_frame']['p99'], summary['bytes_per_frame']['max']))
+    if summary['rss_per_session'] is None:
+        print('RSS: unknown on this platform')
+    else:
+        print('RSS: baseline %.1f MB, peak %.1f MB, %.0f KB per session' % (
+            summary['rss_baseline'] / 2 ** 20, summary['rss_peak'] / 2 ** 20,
+            summary['rss_per_session'] / 2 ** 10))
+
+
+def main():
+    parser = ArgumentParser(description='Simulate a class of students taking tests at once.')
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tests', type=int, default=2,
+                        help='tests (or retries) taken by each student')
+    parser.add_argument('--think-time', type=float, default=0.05,
+                        help='mean seconds between key presses (0 for none)')
+    parser.add_argument('--columns', type=int, default=80)
+    parser.add_argument('--rows', type=int, default=24)
+    parser.add_argument('--frame-timeout', type=float, default=10,
+                        help='seconds to wait for a frame before giving up on a student')
+    parser.add_argument('--json', action='store_true', help='print the results as json')
+    args = parser.parse_args()
+
+    students = make_students(args)
+    for student in students:
+        student.write_script()
+    # Shared by every session, as in the telnet server.
+    leaderboard = Leaderboard()
+    runs, wall_time, baseline_rss, peak_rss = asyncio.run(run_class(
+        students, leaderboard, Size(rows=args.rows, columns=args.columns), args.frame_timeout))
+
+    summary = summarize(args, students, runs, leaderboard, wall_time, baseline_rss, peak_rss)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# Benchmark of the renderer's screen diff (the terminal output for the changes
+# between the previous frame and the new one) on a full screen 200x60 terminal,
+# for frames like the ones of the quiz: nothing changed, one button restyled
+# (eg. an answer marked correct), the next question shown and the first frame.
+#
+# Usage: python3 benchmarks/screen_diff.py
+
+import io
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_toolkit.data_structures import Point, Size  # noqa: E402
+from prompt_toolkit.layout.containers import HSplit, VSplit, HorizontalAlign  # noqa: E402
+from prompt_toolkit.layout.dimension import Dimension  # noqa: E402
+from prompt_toolkit.layout.mouse_handlers import MouseHandlers  # noqa: E402
+from prompt_toolkit.layout.screen import Screen, WritePosition  # noqa: E402
+from prompt_toolkit.output.color_depth import ColorDepth  # noqa: E402
+from prompt_toolkit.output.vt100 import Vt100_Output  # noqa: E402
+from prompt_toolkit.renderer import _output_screen_diff, _StyleStringToAttrsCache  # noqa: E402
+from prompt_toolkit.styles import DummyStyleTransformation, Style  # noqa: E402
+from prompt_toolkit.widgets import Box, Label, TextArea  # noqa: E402
+
+from button_replacement import Button  # noqa: E402
+
+SIZE = Size(rows=60, columns=200)
+
+STYLE = Style.from_dict({
+    'button': 'bg:#000000 #00ff00',
+    'button.focused': 'bg:#228822',
+    'correct': 'bg:#00aa00',
+    'incorrect': 'bg:#dd0000',
+})
+
+
+class QuestionScreen:
+    """A toolbar, a question and its choices, like the playing screen."""
+
+    def __init__(self):
+        self.choices = [Button('[%s] %s' % (letter, 10 * i)) for i, letter in enumerate('ABCD')]
+        self.question = TextArea(text=make_question(0), read_only=True, focusable=False,
+                                 height=Dimension(preferred=100000, max=100000))
+        toolbar = VSplit(
+            [Label('Q1.', dont_extend_width=True)] + [
+                Button(text) for text in ['(back)', 'help', 'menu', 'quit', '(next)']],
+            align=HorizontalAlign.CENTER, height=1)
+        self.container = HSplit([
+            toolbar,
+            Box(HSplit([self.question] + [
+                VSplit([button], align=HorizontalAlign.CENTER) for button in self.choices
+            ], padding=1), padding=1, style='bg:#88ff88 #000000')
+        ])
+
+    def render(self):
+        screen = Screen()
+        self.container.write_to_screen(
+            screen, MouseHandlers(), WritePosition(xpos=0, ypos=0, width=SIZE.columns, height=SIZE.rows),
+            parent_style='', erase_bg=False, z_index=None)
+        screen.draw_all_floats()
+        return screen
+
+
+def make_question(number):
+    sentence = 'Question %s: what is the length of the hypotenuse of a right angled triangle? ' % number
+    return '\n\n'.join(sentence * 4 for _ in range(4))
+
+
+def make_frames():
+    """Returns (name, previous screen, screen) for every kind of frame."""
+    question_screen = QuestionScreen()
+    first = question_screen.render()
+    unchanged = question_screen.render()
+    question_screen.choices[2].update(question_screen.choices[2].text + ' ✓', class_='correct')
+    restyled = question_screen.render()
+    question_screen.question.text = make_question(1)
+    next_question = question_screen.render()
+    return [
+        ('unchanged', first, unchanged),
+        ('one button restyled', unchanged, restyled),
+        ('next question', restyled, next_question),
+        ('first frame', None, first),
+    ]
+
+
+def benchmark(name, previous_screen, screen):
+    stream = io.BytesIO()
+    stream.encoding = 'utf-8'
+    output = Vt100_Output(stream, lambda: SIZE, term='xterm')
+    attrs_for_style_string = _StyleStringToAttrsCache(
+        STYLE.get_attrs_for_style_str, DummyStyleTransformation())
+    # Only used to find the cursor position.
+    app = SimpleNamespace(layout=SimpleNamespace(current_window=None))
+
+    def diff():
+        _output_screen_diff(
+            app, output, screen, Point(x=0, y=0), ColorDepth.DEPTH_24_BIT,
+            previous_screen, None, is_done=False, full_screen=True,
+            attrs_for_style_string=attrs_for_style_string, size=SIZE,
+            previous_width=SIZE.columns)
+        output.flush()
+
+    diff()
+    stream.seek(0)
+    stream.truncate()
+    number = 100
+    time = min(timeit.repeat(diff, number=number, repeat=5)) / number
+    print('%-22s %8.3f ms per frame   %6s bytes' % (name, time * 1000, len(stream.getvalue()) // (number * 5)))
+
+
+def main():
+    print('%sx%s terminal' % (SIZE.columns, SIZE.rows))
+    for name, previous_screen, screen in make_frames():
+        benchmark(name, previous_screen, screen)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Benchmark of the background fills of a full screen 200x60 terminal: a window
+# erasing its background, its style applied over text and over a solid
+# background, the exit style applied to the whole screen, and a whole `Box`
+# with a background like the ones of the quiz screens.
+#
+# Usage: python3 benchmarks/screen_fill.py
+
+import os
+import sys
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_toolkit.application import Application  # noqa: E402
+from prompt_toolkit.application.current import set_app  # noqa: E402
+from prompt_toolkit.data_structures import Size  # noqa: E402
+from prompt_toolkit.input import DummyInput  # noqa: E402
+from prompt_toolkit.layout.containers import Window  # noqa: E402
+from prompt_toolkit.layout.mouse_handlers import MouseHandlers  # noqa: E402
+from prompt_toolkit.layout.screen import Screen, WritePosition  # noqa: E402
+from prompt_toolkit.output import DummyOutput  # noqa: E402
+from prompt_toolkit.widgets import Box, Label  # noqa: E402
+
+SIZE = Size(rows=60, columns=200)
+FULL_SCREEN = WritePosition(xpos=0, ypos=0, width=SIZE.columns, height=SIZE.rows)
+TEXT = 'What is the length of the hypotenuse of a right angled triangle? ' * 3
+
+
+def make_text_screen():
+    screen = Screen(initial_width=SIZE.columns)
+    Label(TEXT).__pt_container__().write_to_screen(
+        screen, MouseHandlers(), FULL_SCREEN, parent_style='', erase_bg=False, z_index=None)
+    return screen
+
+
+def make_background_screen():
+    screen = Screen(initial_width=SIZE.columns)
+    Window(char=' ')._fill_bg(screen, FULL_SCREEN, erase_bg=True)
+    return screen
+
+
+def write_box(screen):
+    Box(Label(TEXT), padding=1, style='bg:#88ff88 #000000').__pt_container__().write_to_screen(
+        screen, MouseHandlers(), FULL_SCREEN, parent_style='', erase_bg=False, z_index=None)
+
+
+def benchmark(name, make_screen, func, repeat=20):
+    """Times `func` on new screens, so that styles don't pile up."""
+    times = []
+    for _ in range(repeat):
+        screen = make_screen()
+        start = time.perf_counter()
+        func(screen)
+        times.append(time.perf_counter() - start)
+    print('%-22s %8.3f ms' % (name, min(times) * 1000))
+
+
+def main():
+    window = Window(char=' ', style='bg:#88ff88')
+
+    print('%sx%s terminal' % (SIZE.columns, SIZE.rows))
+    with set_app(Application(input=DummyInput(), output=DummyOutput())):
+        make_empty_screen = partial(Screen, initial_width=SIZE.columns)
+        benchmark('erase background', make_empty_screen,
+                  lambda screen: window._fill_bg(screen, FULL_SCREEN, erase_bg=True))
+        benchmark('style over text', make_text_screen,
+                  lambda screen: window._apply_style(screen, FULL_SCREEN, 'class:box'))
+        benchmark('style over background', make_background_screen,
+                  lambda screen: window._apply_style(screen, FULL_SCREEN, 'class:box'))
+        benchmark('exit style', make_text_screen,
+                  lambda screen: screen.append_style_to_content('class:aborting'))
+        benchmark('box', make_empty_screen, write_box)
+
+
+if __name__ == '__main__':
+    main()
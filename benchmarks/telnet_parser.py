@@ -0,0 +1,121 @@
+# Benchmark of the bulk TelnetProtocolParser against the previous parser, which
+# fed every byte through a generator. (tests/test_telnet_protocol.py checks the
+# callbacks of the parser for input split into chunks.)
+#
+# Usage: python3 benchmarks/telnet_parser.py
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_toolkit.contrib.telnet.protocol import (  # noqa: E402
+    AO, AYT, BRK, DM, DO, DONT, EC, EL, GA, IAC, IP, NAWS, NOP, SB, SE, WILL, WONT,
+    TelnetProtocolParser, int2byte
+)
+from prompt_toolkit.contrib.telnet.log import logger  # noqa: E402
+
+# Random input has plenty of malformed NAWS messages, which are logged.
+logger.disabled = True
+
+
+class GeneratorTelnetProtocolParser(TelnetProtocolParser):
+    """The previous parser: one generator `send()` per byte."""
+
+    def __init__(self, data_received_callback, size_received_callback):
+        super().__init__(data_received_callback, size_received_callback)
+        self._parser = self._parse_coroutine()
+        self._parser.send(None)
+
+    def _parse_coroutine(self):
+        while True:
+            d = yield
+
+            if d == int2byte(0):
+                pass  # NOP
+
+            elif d == IAC:
+                d2 = yield
+
+                if d2 == IAC:
+                    self.received_data(d2)
+
+                elif d2 in (NOP, DM, BRK, IP, AO, AYT, EC, EL, GA):
+                    self.command_received(d2, b"")
+
+                elif d2 in (DO, DONT, WILL, WONT):
+                    d3 = yield
+                    self.command_received(d2, d3)
+
+                elif d2 == SB:
+                    data = []
+
+                    while True:
+                        d3 = yield
+
+                        if d3 == IAC:
+                            d4 = yield
+                            if d4 == SE:
+                                break
+                            else:
+                                data.append(d4)
+                        else:
+                            data.append(d3)
+
+                    self.negotiate(b"".join(data))
+            else:
+                self.received_data(d)
+
+    def feed(self, data):
+        for b in data:
+            self._parser.send(int2byte(b))
+
+
+def random_telnet_stream(rng, length):
+    stream = bytearray()
+    while len(stream) < length:
+        kind = rng.random()
+        if kind < 0.6:
+            stream += bytes(rng.randrange(256) for _ in range(rng.randrange(20)))
+        elif kind < 0.7:
+            # NAWS, the payload may contain escaped (or unescaped) IACs.
+            stream += IAC + SB + NAWS + bytes(rng.randrange(256) for _ in range(4)) + IAC + SE
+        elif kind < 0.8:
+            stream += IAC + rng.choice([DO, DONT, WILL, WONT]) + int2byte(rng.randrange(256))
+        elif kind < 0.9:
+            stream += IAC + IAC
+        else:
+            stream += IAC + int2byte(rng.randrange(256))
+    return bytes(stream)
+
+
+def benchmark(name, data, chunk_size):
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+    def run(parser_class):
+        parser = parser_class(lambda data: None, lambda rows, columns: None)
+        for chunk in chunks:
+            parser.feed(chunk)
+
+    number = 5
+    old = min(timeit.repeat(lambda: run(GeneratorTelnetProtocolParser), number=number, repeat=3)) / number
+    new = min(timeit.repeat(lambda: run(TelnetProtocolParser), number=number, repeat=3)) / number
+    print('%-40s generator %8.2f ms   bulk %8.2f ms   %6.1fx' % (
+        name, old * 1000, new * 1000, old / new))
+
+
+def main():
+    # A pasted answer / a load test client typing (plain data).
+    paste = b'12345.678 ' * 10000
+    benchmark('100 KB paste, 4 KB reads', paste, 4096)
+    # Key presses arriving one at a time.
+    benchmark('10000 single byte reads', paste[:10000], 1)
+    # Mostly plain data with some telnet commands (eg. window resizes).
+    rng = random.Random(1)
+    benchmark('100 KB mixed data and commands', random_telnet_stream(rng, 100000), 4096)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@
 from typing import Optional, Callable
 
 from prompt_toolkit.application.current import get_app
+from prompt_toolkit.filters import to_filter
 from prompt_toolkit.formatted_text import (
     StyleAndTextTuples,
 )
@@ -25,6 +26,9 @@ class Button:
     :param handler: `None` or callable. Called when the button is clicked.
     :param width: Width of the button.
     :param stripped: If true display without '<' and '>
+
+    The text, handler, focusability and class can be changed after creation
+    (see `update`), so a screen rendered again can reuse its buttons.
     """
 
     def __init__(
@@ -39,6 +43,9 @@ class Button:
         self.handler = handler
         self.width = width
         self.focusable = focusable
+        self.class_ = class_
+        # Whether the width follows the text.
+        self._auto_width = width is None
 
         if width is None:
             self.width = max(12, len(text)+2)
@@ -50,8 +57,8 @@ class Button:
         )
 
         def get_style() -> str:
-            if class_:
-                return 'class:%s' % (class_)
+            if self.class_:
+                return 'class:%s' % (self.class_)
             if get_app().layout.has_focus(self):
                 return "class:button.focused"
             else:
@@ -68,6 +75,17 @@ class Button:
             always_hide_cursor=True  # Stops curser from showing when selected
         )
 
+    def update(self, text: str, focusable: bool = True, class_=None) -> None:
+        """Changes the text, focusability and class of the button in place."""
+        self.text = text
+        if self._auto_width and max(12, len(text)+2) != self.width:
+            self.width = max(12, len(text)+2)
+            self.window.width = Dimension(preferred=self.width, max=self.width)
+        if focusable != self.focusable:
+            self.focusable = focusable
+            self.control.focusable = to_filter(focusable)
+        self.class_ = class_
+
     def _get_text_fragments(self) -> StyleAndTextTuples:
         text = ("{:^%s}" % (self.width)).format(self.text)
 
@@ -0,0 +1,320 @@
+# Live leaderboard and class statistics of the tests taken, kept up to date as
+# each answer is given and each test finishes instead of rescanning the stored
+# results.
+
+from collections import OrderedDict
+from random import Random
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from results_store import ResultsLogReader
+
+# Enough levels for a skip list of millions of items.
+MAX_LEVELS = 24
+
+# Tests in progress without an answer for this many seconds are dropped from
+# the leaderboard (eg. the user quit or disconnected).
+LIVE_ENTRY_TIMEOUT = 30 * 60
+
+
+class _SkipListNode:
+    __slots__ = ('key', 'value', 'next', 'width')
+
+    def __init__(self, key: Any, value: Any, level_count: int) -> None:
+        self.key = key
+        self.value = value
+        self.next: List[Optional['_SkipListNode']] = [None] * level_count
+        # How many positions each link skips over.
+        self.width = [1] * level_count
+
+
+class IndexableSkipList:
+    """
+    List of (key, value) pairs sorted by key (keys must be unique). Inserting,
+    removing, finding the rank of a key and getting the item at an index are
+    all O(log n): every link also stores how many items it skips, so positions
+    can be counted on the way down.
+    """
+
+    def __init__(self, seed: int = 0) -> None:
+        self._head = _SkipListNode(None, None, MAX_LEVELS)
+        self._length = 0
+        # Levels above this have never had a node, so searches start here.
+        self._level_count = 1
+        self._random = Random(seed)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _random_level_count(self) -> int:
+        # Each level has half the nodes of the level below it.
+        level_count = 1
+        while level_count < MAX_LEVELS and self._random.random() < 0.5:
+            level_count += 1
+        return level_count
+
+    def insert(self, key: Any, value: Any) -> None:
+        new_node = _SkipListNode(key, value, self._random_level_count())
+        if len(new_node.next) > self._level_count:
+            for level in range(self._level_count, len(new_node.next)):
+                self._head.width[level] = self._length + 1
+            self._level_count = len(new_node.next)
+
+        # The last node before the key on each level, and its position.
+        chain = [self._head] * self._level_count
+        positions = [0] * self._level_count
+        node = self._head
+        position = 0
+        for level in reversed(range(self._level_count)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = position
+
+        for level in range(len(new_node.next)):
+            previous = chain[level]
+            skipped = position - positions[level]
+            new_node.next[level] = previous.next[level]
+            new_node.width[level] = previous.width[level] - skipped
+            previous.next[level] = new_node
+            previous.width[level] = skipped + 1
+        for level in range(len(new_node.next), self._level_count):
+            chain[level].width[level] += 1
+        self._length += 1
+
+    def remove(self, key: Any) -> None:
+        chain = [self._head] * self._level_count
+        node = self._head
+        for level in reversed(range(self._level_count)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+
+        removed = node.next[0]
+        if removed is None or removed.key != key:
+            raise KeyError(key)
+        for level in range(len(removed.next)):
+            previous = chain[level]
+            previous.width[level] += removed.width[level] - 1
+            previous.next[level] = removed.next[level]
+        for level in range(len(removed.next), self._level_count):
+            chain[level].width[level] -= 1
+        self._length -= 1
+
+    def rank(self, key: Any) -> int:
+        """Returns the number of items with a smaller key."""
+        node = self._head
+        position = 0
+        for level in reversed(range(self._level_count)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def __getitem__(self, i: int) -> Any:
+        """Returns the value of the item at index i."""
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError('skip list index out of range')
+        node = self._head
+        remaining = i + 1
+        for level in reversed(range(self._level_count)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def __iter__(self) -> Iterator[Any]:
+        node = self._head.next[0]
+        while node is not None:
+            yield node.value
+            node = node.next[0]
+
+
+class LeaderboardEntry:
+    """A test on the leaderboard, finished or still in progress."""
+
+    __slots__ = ('username', 'difficulty', 'content', 'correct_count',
+                 'question_count', 'start_time', 'finish_time', 'finished')
+
+    def __init__(self, username: str, difficulty: str, content: Tuple[str, ...],
+                 correct_count: int, question_count: int, start_time: float,
+                 finish_time: float, finished: bool) -> None:
+        self.username = username
+        self.difficulty = difficulty
+        self.content = content
+        self.correct_count = correct_count
+        self.question_count = question_count
+        self.start_time = start_time
+        # When the test finished, or when the last answer was given if it is
+        # in progress.
+        self.finish_time = finish_time
+        self.finished = finished
+
+    @classmethod
+    def from_result(cls, result: dict) -> 'LeaderboardEntry':
+        """Creates the entry of a finished test from its results store record."""
+        return cls(result['username'], result['difficulty'], tuple(result['content']),
+                   result['correct_count'], result['question_count'],
+                   result['start_time'], result['finish_time'], True)
+
+    @property
+    def identity(self) -> Tuple[str, float]:
+        # A test finished again (or updated by another answer) replaces its
+        # previous entry.
+        return self.username, self.start_time
+
+    @property
+    def score(self) -> float:
+        return self.correct_count / self.question_count if self.question_count else 0.0
+
+    @property
+    def time_taken(self) -> float:
+        return self.finish_time - self.start_time
+
+    @property
+    def sort_key(self) -> tuple:
+        # Best score first, then fastest. The identity makes keys unique.
+        return -self.score, self.time_taken, self.username, self.start_time
+
+
+class Ranking:
+    """Entries ranked by score then time taken, with running totals for the
+    class statistics."""
+
+    def __init__(self) -> None:
+        self._entries = IndexableSkipList()
+        self._score_total = 0.0
+        self._time_total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry: LeaderboardEntry) -> None:
+        self._entries.insert(entry.sort_key, entry)
+        self._score_total += entry.score
+        self._time_total += entry.time_taken
+
+    def remove(self, entry: LeaderboardEntry) -> None:
+        self._entries.remove(entry.sort_key)
+        self._score_total -= entry.score
+        self._time_total -= entry.time_taken
+
+    def top(self, count: int) -> List[LeaderboardEntry]:
+        return [self._entries[i] for i in range(min(count, len(self._entries)))]
+
+    def rank(self, entry: LeaderboardEntry) -> int:
+        """Returns the 1-based position of the entry."""
+        return self._entries.rank(entry.sort_key) + 1
+
+    @property
+    def mean_score(self) -> Optional[float]:
+        return self._score_total / len(self) if len(self) else None
+
+    @property
+    def median_score(self) -> Optional[float]:
+        count = len(self)
+        if not count:
+            return None
+        # Ranked best first, so scores are in descending order.
+        if count % 2:
+            return self._entries[count // 2].score
+        return (self._entries[count // 2 - 1].score + self._entries[count // 2].score) / 2
+
+    @property
+    def mean_time_taken(self) -> Optional[float]:
+        return self._time_total / len(self) if len(self) else None
+
+
+# Returned for the difficulties and content areas without tests (never changed).
+_EMPTY_RANKING = Ranking()
+
+
+class Leaderboard:
+    """
+    Rankings of every test, of the tests of each difficulty and of the tests
+    including each content area. Each update is O(log n).
+
+    :param results_path: `None` or the results log to load finished tests
+        from (see `catch_up`).
+    """
+
+    def __init__(self, results_path: Optional[str] = None) -> None:
+        self.overall = Ranking()
+        # Keyed by difficulty name and content area name, as in results store
+        # records (eg. 'hard', 'number_theory').
+        self.by_difficulty: Dict[str, Ranking] = {}
+        self.by_content: Dict[str, Ranking] = {}
+        self._entries: Dict[Tuple[str, float], LeaderboardEntry] = {}
+        # Tests in progress, least recently answered first.
+        self._live_entries: 'OrderedDict[Tuple[str, float], LeaderboardEntry]' = OrderedDict()
+        self._results_reader = ResultsLogReader(results_path) if results_path else None
+
+    def _rankings(self, entry: LeaderboardEntry) -> Iterator[Ranking]:
+        yield self.overall
+        yield self.by_difficulty.setdefault(entry.difficulty, Ranking())
+        for content in entry.content:
+            yield self.by_content.setdefault(content, Ranking())
+
+    def difficulty_ranking(self, difficulty: str) -> Ranking:
+        """Returns the ranking of the tests of a difficulty (without adding one
+        if there are none yet)."""
+        return self.by_difficulty.get(difficulty, _EMPTY_RANKING)
+
+    def content_ranking(self, content: str) -> Ranking:
+        """Returns the ranking of the tests including a content area (without
+        adding one if there are none yet)."""
+        return self.by_content.get(content, _EMPTY_RANKING)
+
+    def get(self, username: str, start_time: float) -> Optional[LeaderboardEntry]:
+        return self._entries.get((username, start_time))
+
+    def update(self, entry: LeaderboardEntry) -> None:
+        """Adds the entry, replacing the previous entry of the same test."""
+        old_entry = self._entries.get(entry.identity)
+        if old_entry is not None:
+            if old_entry.finished and not entry.finished:
+                # Retrying the incorrect questions of a finished test, the
+                # finished result stands until it is finished again.
+                return
+            self._remove(old_entry)
+
+        self._entries[entry.identity] = entry
+        for ranking in self._rankings(entry):
+            ranking.add(entry)
+        if not entry.finished:
+            self._live_entries[entry.identity] = entry
+
+    def discard_live(self, username: str, start_time: float) -> None:
+        """Removes a test that was left unfinished."""
+        entry = self._live_entries.get((username, start_time))
+        if entry is not None:
+            self._remove(entry)
+
+    def _remove(self, entry: LeaderboardEntry) -> None:
+        del self._entries[entry.identity]
+        self._live_entries.pop(entry.identity, None)
+        for ranking in self._rankings(entry):
+            ranking.remove(entry)
+
+    def prune_live(self, now: float) -> None:
+        """Removes the tests in progress that haven't been answered in
+        LIVE_ENTRY_TIMEOUT seconds."""
+        while self._live_entries:
+            entry = next(iter(self._live_entries.values()))
+            if now - entry.finish_time < LIVE_ENTRY_TIMEOUT:
+                break
+            self._remove(entry)
+
+    def catch_up(self) -> None:
+        """Adds the finished tests written to the results log since the last
+        call (including those of other processes)."""
+        if self._results_reader is None:
+            return
+        for result in self._results_reader.read_new():
+            try:
+                entry = LeaderboardEntry.from_result(result)
+            except (KeyError, TypeError):
+                continue
+            self.update(entry)
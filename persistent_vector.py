@@ -0,0 +1,97 @@
+# Immutable list where changing an item returns a new list sharing almost all of
+# its memory with the old one, so every version can be kept cheaply.
+
+from typing import Iterable, Iterator, List, Sequence
+
+# Items per node. Each level of the tree indexes BITS bits of the item index.
+BITS = 5
+BRANCH_FACTOR = 1 << BITS
+MASK = BRANCH_FACTOR - 1
+
+
+class PersistentVector:
+    """
+    Persistent vector backed by a tree of BRANCH_FACTOR-way nodes (a trie on
+    the item index). Getting an item and `set` are O(log n): `set` only copies
+    the nodes on the path from the root to the item (path copying), all the
+    other nodes are shared with the original vector.
+
+    Create vectors with `PersistentVector.from_iterable`.
+    """
+
+    __slots__ = ('_root', '_length', '_shift')
+
+    def __init__(self, root: Sequence, length: int, shift: int) -> None:
+        # Leaves are lists of items, other nodes are lists of child nodes.
+        self._root = root
+        self._length = length
+        # Bit shift of the index at the root (0 if the root is a leaf).
+        self._shift = shift
+
+    @classmethod
+    def from_iterable(cls, items: Iterable) -> 'PersistentVector':
+        nodes: List[list] = []
+        leaf: list = []
+        for item in items:
+            leaf.append(item)
+            if len(leaf) == BRANCH_FACTOR:
+                nodes.append(leaf)
+                leaf = []
+        length = len(nodes) * BRANCH_FACTOR + len(leaf)
+        if leaf or not nodes:
+            nodes.append(leaf)
+
+        # Group the nodes into parents until there is a single root.
+        shift = 0
+        while len(nodes) > 1:
+            nodes = [nodes[i:i + BRANCH_FACTOR] for i in range(0, len(nodes), BRANCH_FACTOR)]
+            shift += BITS
+        return cls(nodes[0], length, shift)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _check_index(self, i: int) -> int:
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError('persistent vector index out of range')
+        return i
+
+    def __getitem__(self, i: int):
+        i = self._check_index(i)
+        node = self._root
+        shift = self._shift
+        while shift > 0:
+            node = node[(i >> shift) & MASK]
+            shift -= BITS
+        return node[i & MASK]
+
+    def set(self, i: int, value) -> 'PersistentVector':
+        """Returns a new vector with item i replaced by value (this vector is
+        unchanged)."""
+        i = self._check_index(i)
+
+        def set_in_node(node, shift):
+            new_node = list(node)
+            if shift == 0:
+                new_node[i & MASK] = value
+            else:
+                child_index = (i >> shift) & MASK
+                new_node[child_index] = set_in_node(node[child_index], shift - BITS)
+            return new_node
+
+        return PersistentVector(set_in_node(self._root, self._shift), self._length, self._shift)
+
+    def _iter_node(self, node, shift) -> Iterator:
+        if shift == 0:
+            yield from node
+        else:
+            for child in node:
+                yield from self._iter_node(child, shift - BITS)
+
+    def __iter__(self) -> Iterator:
+        return self._iter_node(self._root, self._shift)
+
+    def __repr__(self) -> str:
+        return 'PersistentVector(%r)' % list(self)
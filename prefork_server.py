@@ -0,0 +1,239 @@
+# Pre-forked pool of telnet server processes, so the quiz can use every core of
+# the machine. Each worker runs its own QuizTelnetServer (one event loop) on the
+# same port with SO_REUSEPORT, and the kernel spreads new connections between
+# them.
+#
+# Signals sent to the supervisor:
+#   SIGTERM / SIGINT: drain every worker (let the running tests finish), then exit.
+#   SIGHUP: rolling restart, start new workers then drain the old ones.
+#   SIGUSR1: print the session counters of every worker.
+
+import asyncio
+import gc
+import mmap
+import os
+import signal
+import time
+from typing import Callable, Dict, Optional
+
+from telnet_server import DEFAULT_PORT, QuizTelnetServer
+
+_supervisor_signals = {signal.SIGCHLD, signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1}
+
+
+class WorkerStats:
+    """
+    Session counters of each worker slot, in an anonymous shared memory map so
+    the forked workers can update them and the supervisor can read them. Each
+    slot is only ever written by one worker, so no locking is needed.
+    """
+
+    # Active sessions, total sessions.
+    _FIELD_COUNT = 2
+
+    def __init__(self, slot_count: int) -> None:
+        self._map = mmap.mmap(-1, slot_count * self._FIELD_COUNT * 8)
+        self._counters = memoryview(self._map).cast('Q')
+
+    def reset(self, slot: int) -> None:
+        self._counters[slot * self._FIELD_COUNT] = 0
+        self._counters[slot * self._FIELD_COUNT + 1] = 0
+
+    def session_started(self, slot: int) -> None:
+        self._counters[slot * self._FIELD_COUNT] += 1
+        self._counters[slot * self._FIELD_COUNT + 1] += 1
+
+    def session_ended(self, slot: int) -> None:
+        self._counters[slot * self._FIELD_COUNT] -= 1
+
+    def active_sessions(self, slot: int) -> int:
+        return self._counters[slot * self._FIELD_COUNT]
+
+    def total_sessions(self, slot: int) -> int:
+        return self._counters[slot * self._FIELD_COUNT + 1]
+
+
+class _Worker:
+    def __init__(self, pid: int, slot: int) -> None:
+        self.pid = pid
+        self.slot = slot
+        self.start_time = time.monotonic()
+        # When the worker is killed if it hasn't finished draining, or None if
+        # it isn't draining.
+        self.drain_deadline: Optional[float] = None
+
+
+class PreforkSupervisor:
+    """
+    Forks and supervises `worker_count` telnet server worker processes,
+    replacing any that crash.
+
+    :param build_application: Called in the workers for every connection to
+        create the application for that session.
+    :param warm: `None` or callable, called once before forking (eg. to build
+        caches) so every worker shares the memory copy-on-write.
+    :param drain_timeout: How many seconds a stopping worker waits for its
+        sessions to finish before closing them.
+    :param stats_interval: How often (in seconds) to print the session
+        counters, or 0 to only print them on SIGUSR1.
+    :param on_worker_exit: `None` or callable, called in each worker once it
+        has drained (eg. to flush files before the worker exits).
+    """
+
+    def __init__(self, build_application: Callable, worker_count: int,
+                 host: str = '0.0.0.0', port: int = DEFAULT_PORT,
+                 warm: Optional[Callable[[], None]] = None,
+                 drain_timeout: float = 600, stats_interval: float = 0,
+                 on_worker_exit: Optional[Callable[[], None]] = None) -> None:
+        self.build_application = build_application
+        self.worker_count = worker_count
+        self.host = host
+        self.port = port
+        self.warm = warm
+        self.drain_timeout = drain_timeout
+        self.stats_interval = stats_interval
+        self.on_worker_exit = on_worker_exit
+
+        # Twice the slots so old workers can drain during a rolling restart.
+        self._stats = WorkerStats(2 * worker_count)
+        self._free_slots = list(range(2 * worker_count))
+        self._workers: Dict[int, _Worker] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        """Runs the worker pool until SIGTERM or SIGINT and every worker has
+        exited."""
+        if self.warm:
+            self.warm()
+        # Move everything allocated so far out of the garbage collector's
+        # tracking, so collections in the workers don't touch (and therefore
+        # copy) the shared pages.
+        gc.freeze()
+
+        # Signals are handled synchronously below rather than by handlers.
+        signal.pthread_sigmask(signal.SIG_BLOCK, _supervisor_signals)
+        for _ in range(self.worker_count):
+            self._spawn()
+        print('Listening for telnet connections on %s port %s with %s workers' % (
+            self.host, self.port, self.worker_count))
+
+        next_stats_time = time.monotonic() + self.stats_interval
+        while self._workers:
+            info = signal.sigtimedwait(_supervisor_signals, 1)
+            if info is not None:
+                if info.si_signo in (signal.SIGTERM, signal.SIGINT):
+                    self._stop()
+                elif info.si_signo == signal.SIGHUP:
+                    self._restart()
+                elif info.si_signo == signal.SIGUSR1:
+                    self.print_stats()
+            self._reap()
+            self._kill_overdue_workers()
+
+            if self.stats_interval and time.monotonic() >= next_stats_time:
+                self.print_stats()
+                next_stats_time = time.monotonic() + self.stats_interval
+
+    def print_stats(self) -> None:
+        for worker in sorted(self._workers.values(), key=lambda worker: worker.slot):
+            print('worker %s: %s active sessions, %s total%s' % (
+                worker.pid, self._stats.active_sessions(worker.slot),
+                self._stats.total_sessions(worker.slot),
+                ' (draining)' if worker.drain_deadline is not None else ''))
+
+    def _spawn(self) -> None:
+        slot = self._free_slots.pop()
+        self._stats.reset(slot)
+        pid = os.fork()
+        if pid == 0:
+            # Never return into the supervisor's code in the child.
+            exit_code = 1
+            try:
+                self._run_worker(slot)
+                exit_code = 0
+            finally:
+                os._exit(exit_code)
+        self._workers[pid] = _Worker(pid, slot)
+
+    def _drain(self, worker: _Worker) -> None:
+        if worker.drain_deadline is None:
+            # Give the worker a little longer than its own drain timeout.
+            worker.drain_deadline = time.monotonic() + self.drain_timeout + 10
+            os.kill(worker.pid, signal.SIGTERM)
+
+    def _stop(self) -> None:
+        self._stopping = True
+        for worker in self._workers.values():
+            self._drain(worker)
+
+    def _restart(self) -> None:
+        if self._stopping:
+            return
+        if any(worker.drain_deadline is not None for worker in self._workers.values()):
+            print('previous restart is still draining, ignoring SIGHUP')
+            return
+        old_workers = [worker for worker in self._workers.values()
+                       if worker.drain_deadline is None]
+        # Start the new workers first, so connections are never refused.
+        for _ in old_workers:
+            self._spawn()
+        for worker in old_workers:
+            self._drain(worker)
+
+    def _reap(self) -> None:
+        while self._workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            worker = self._workers.pop(pid, None)
+            if worker is None:
+                continue
+            self._free_slots.append(worker.slot)
+            if worker.drain_deadline is None and not self._stopping:
+                print('worker %s exited unexpectedly (status %s), restarting' % (pid, status))
+                if time.monotonic() - worker.start_time < 1:
+                    # Don't fork in a tight loop if workers fail on startup
+                    # (eg. the port is in use).
+                    time.sleep(1)
+                self._spawn()
+
+    def _kill_overdue_workers(self) -> None:
+        now = time.monotonic()
+        for worker in self._workers.values():
+            if worker.drain_deadline is not None and now > worker.drain_deadline:
+                os.kill(worker.pid, signal.SIGKILL)
+
+    def _run_worker(self, slot: int) -> None:
+        # The supervisor decides when workers stop: ctrl-c in the terminal
+        # reaches the whole process group, but the worker should drain instead.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _supervisor_signals)
+
+        server = QuizTelnetServer(
+            self.build_application, host=self.host, port=self.port, reuse_port=True,
+            on_session_start=lambda: self._stats.session_started(slot),
+            on_session_end=lambda: self._stats.session_ended(slot))
+
+        async def run() -> None:
+            stop_event = asyncio.Event()
+            asyncio.get_event_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+            server.start()
+            await stop_event.wait()
+            await server.drain(self.drain_timeout)
+
+        asyncio.run(run())
+        if self.on_worker_exit:
+            self.on_worker_exit()
+
+
+def serve_prefork(build_application: Callable, worker_count: int,
+                  host: str = '0.0.0.0', port: int = DEFAULT_PORT,
+                  warm: Optional[Callable[[], None]] = None,
+                  drain_timeout: float = 600, stats_interval: float = 0,
+                  on_worker_exit: Optional[Callable[[], None]] = None) -> None:
+    """Runs a pre-forked pool of telnet server workers until SIGTERM/SIGINT."""
+    PreforkSupervisor(build_application, worker_count, host=host, port=port, warm=warm,
+                      drain_timeout=drain_timeout, stats_interval=stats_interval,
+                      on_worker_exit=on_worker_exit).run()
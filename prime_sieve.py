@@ -0,0 +1,89 @@
+# Smallest prime factor sieve used to quickly list the divisors of a number.
+
+from array import array
+from functools import lru_cache
+from threading import Lock
+from typing import List, Tuple
+
+# Numbers below this can extend the sieve, larger numbers are factorised by
+# trial division instead (the sieve would use too much memory).
+MAX_SIEVE_SIZE = 1 << 22
+
+
+class SmallestPrimeFactorTable:
+    """
+    Table of the smallest prime factor of every number below `size`, which
+    factorises any number in the table in O(log n). The table is only built
+    the first time it's used, and grows when a larger number is factorised.
+
+    :param size: The initial size of the table (eg. the largest value the
+        question generators can produce).
+    """
+
+    def __init__(self, size: int) -> None:
+        self._initial_size = size
+        # _table[n] is the smallest prime factor of n (0 and 1 map to 0 and 1).
+        self._table = array('I')
+        self._lock = Lock()
+
+    def _extend(self, size: int) -> None:
+        with self._lock:
+            if len(self._table) >= size:
+                return
+            table = array('I', range(size))
+            for i in range(2, int(size ** 0.5) + 1):
+                if table[i] == i:
+                    # i is prime, mark it as the smallest prime factor of its
+                    # multiples that don't have a smaller one.
+                    for multiple in range(i * i, size, i):
+                        if table[multiple] == multiple:
+                            table[multiple] = i
+            self._table = table
+
+    def warm(self) -> None:
+        """Builds the table now instead of on first use."""
+        if len(self._table) < self._initial_size:
+            self._extend(self._initial_size)
+
+    def smallest_prime_factor(self, n: int) -> int:
+        table = self._table
+        if n < len(table):
+            return table[n]
+        if n < MAX_SIEVE_SIZE:
+            # Double the table so growing it one value at a time isn't slow.
+            self._extend(min(max(n + 1, 2 * len(table), self._initial_size), MAX_SIEVE_SIZE))
+            return self._table[n]
+        i = 2
+        while i * i <= n:
+            if n % i == 0:
+                return i
+            i += 1
+        return n
+
+    def prime_factors(self, n: int) -> List[Tuple[int, int]]:
+        """Returns the prime factors of n > 0 and their exponents, eg.
+        12 => [(2, 2), (3, 1)]."""
+        prime_factors = []
+        while n > 1:
+            prime = self.smallest_prime_factor(n)
+            exponent = 0
+            while n % prime == 0:
+                n //= prime
+                exponent += 1
+            prime_factors.append((prime, exponent))
+        return prime_factors
+
+
+# Big enough for every value of a BODMAS question (at most 100000).
+smallest_prime_factor_table = SmallestPrimeFactorTable(100001)
+
+
+@lru_cache(maxsize=4096)
+def get_divisors(n: int) -> Tuple[int, ...]:
+    """Returns all the positive divisors of n > 0 in ascending order."""
+    divisors = [1]
+    for prime, exponent in smallest_prime_factor_table.prime_factors(n):
+        divisors = [divisor * prime ** power
+                    for divisor in divisors
+                    for power in range(exponent + 1)]
+    return tuple(sorted(divisors))
@@ -15,6 +15,7 @@ from asyncio import (
     set_event_loop,
     sleep,
 )
+from itertools import count
 from subprocess import Popen
 from traceback import format_tb
 from typing import (
@@ -28,6 +29,7 @@ from typing import (
     Iterable,
     List,
     Optional,
+    Set,
     Tuple,
     Type,
     TypeVar,
@@ -103,6 +105,9 @@ E = KeyPressEvent
 _AppResult = TypeVar("_AppResult")
 ApplicationEventHandler = Callable[["Application[_AppResult]"], None]
 
+# Source of `Application.dimensions_generation`.
+_dimensions_generations = count()
+
 
 class Application(Generic[_AppResult]):
     """
@@ -316,8 +321,18 @@ class Application(Generic[_AppResult]):
         #: rendering.
         self.render_counter = 0
 
+        #: Generation of the dimensions of the layout, changed every time the
+        #: application is invalidated. The containers cache their dimensions
+        #: for one generation. (Generations are unique across applications, so
+        #: each application only invalidates its own dimensions.)
+        self.dimensions_generation = next(_dimensions_generations)
+
         # Invalidate flag. When 'True', a repaint has been scheduled.
         self._invalidated = False
+
+        # When only some windows have to be drawn again for the scheduled
+        # repaint. (See `invalidate_window`.)
+        self._dirty_windows: Optional[Set[Window]] = None
         self._invalidate_events: List[
             Event[object]
         ] = []  # Collection of 'invalidate' Event objects.
@@ -409,6 +424,9 @@ class Application(Generic[_AppResult]):
 
         self.exit_style = ""
 
+        # Anything can have changed since the last run.
+        self._invalidate_dimensions()
+
         self.background_tasks: List[Task[None]] = []
 
         self.renderer.reset()
@@ -434,6 +452,38 @@ class Application(Generic[_AppResult]):
         """
         Thread safe way of sending a repaint trigger to the input event loop.
         """
+        # Everything has to be drawn again.
+        self._dirty_windows = None
+        self._invalidate_dimensions()
+        self._invalidate()
+
+    def invalidate_window(self, window: Window) -> None:
+        """
+        Like `invalidate`, when only the content of this window changed: it is
+        drawn again over the previous screen, without the rest of the layout.
+        (Everything is drawn again anyway when `invalidate` is called before
+        the repaint, or when the window changed size.)
+        """
+        # (The window can have changed size.)
+        self._invalidate_dimensions()
+
+        if self._invalidated:
+            if self._dirty_windows is not None:
+                self._dirty_windows.add(window)
+            return
+
+        self._dirty_windows = {window}
+        self._invalidate()
+
+    def _invalidate_dimensions(self) -> None:
+        """
+        Make the containers compute their dimensions again. Apart from the
+        available size, these only change when the application is invalidated
+        (e.g. the content of the controls, the filters or the focus changed).
+        """
+        self.dimensions_generation = next(_dimensions_generations)
+
+    def _invalidate(self) -> None:
         if not self._is_running:
             # Don't schedule a redraw if we're not running.
             # Otherwise, `get_event_loop()` in `call_soon_threadsafe` can fail.
@@ -453,7 +503,8 @@ class Application(Generic[_AppResult]):
 
         def redraw() -> None:
             self._invalidated = False
-            self._redraw()
+            dirty_windows, self._dirty_windows = self._dirty_windows, None
+            self._redraw(dirty_windows=dirty_windows)
 
         def schedule_redraw() -> None:
             call_soon_threadsafe(
@@ -481,12 +532,15 @@ class Application(Generic[_AppResult]):
         " True when a redraw operation has been scheduled. "
         return self._invalidated
 
-    def _redraw(self, render_as_done: bool = False) -> None:
+    def _redraw(
+        self, render_as_done: bool = False, dirty_windows: Optional[Set[Window]] = None
+    ) -> None:
         """
         Render the command line again. (Not thread safe!) (From other threads,
         or if unsure, use :meth:`.Application.invalidate`.)
 
         :param render_as_done: make sure to put the cursor after the UI.
+        :param dirty_windows: `None` or the only windows to draw again.
         """
 
         def run_in_context() -> None:
@@ -506,7 +560,9 @@ class Application(Generic[_AppResult]):
                         # Draw in 'done' state and reset renderer.
                         self.renderer.render(self, self.layout, is_done=render_as_done)
                 else:
-                    self.renderer.render(self, self.layout)
+                    self.renderer.render(
+                        self, self.layout, dirty_windows=dirty_windows
+                    )
 
                 self.layout.update_parents_relations()
 
@@ -848,8 +904,23 @@ class Application(Generic[_AppResult]):
         """
         task = get_event_loop().create_task(coroutine)
         self.background_tasks.append(task)
+        task.add_done_callback(self._on_background_task_done)
         return task
 
+    def _on_background_task_done(self, task: "asyncio.Task[None]") -> None:
+        """
+        Forget background tasks once they are done, so that long running
+        applications don't keep every one of them (two are created for every
+        key press). Tasks that raised are kept, so that the exception is
+        propagated by `cancel_and_wait_for_background_tasks`.
+        """
+        if task.cancelled() or task.exception() is None:
+            try:
+                self.background_tasks.remove(task)
+            except ValueError:
+                # `reset` was called in the meantime.
+                pass
+
     async def cancel_and_wait_for_background_tasks(self) -> None:
         """
         Cancel all background tasks, and wait for the cancellation to be done.
@@ -5,7 +5,7 @@ specification, but sufficient for a command line interface.)
 Inspired by `Twisted.conch.telnet`.
 """
 import struct
-from typing import Callable, Generator
+from typing import Callable, List
 
 from .log import logger
 
@@ -45,6 +45,13 @@ EC = int2byte(247)
 EL = int2byte(248)
 GA = int2byte(249)
 
+# Parser states.
+_STATE_DATA = 0
+_STATE_IAC = 1  # After IAC.
+_STATE_COMMAND_ARGUMENT = 2  # After IAC-[DO/DONT/WILL/WONT].
+_STATE_SUBNEGOTIATION = 3  # After IAC-SB.
+_STATE_SUBNEGOTIATION_IAC = 4  # After IAC in a subnegotiation.
+
 
 class TelnetProtocolParser:
     """
@@ -70,8 +77,13 @@ class TelnetProtocolParser:
         self.data_received_callback = data_received_callback
         self.size_received_callback = size_received_callback
 
-        self._parser = self._parse_coroutine()
-        self._parser.send(None)  # type: ignore
+        # Parser state, kept between `feed` calls because commands can be
+        # split across chunks.
+        self._state = _STATE_DATA
+        # The DO/DONT/WILL/WONT command waiting for its argument.
+        self._command_name = b""
+        # Data of the current subnegotiation.
+        self._subnegotiation: List[bytes] = []
 
     def received_data(self, data: bytes) -> None:
         self.data_received_callback(data)
@@ -132,57 +144,97 @@ class TelnetProtocolParser:
         else:
             logger.info("Negotiate (%r got bytes)", len(data))
 
-    def _parse_coroutine(self) -> Generator[None, bytes, None]:
+    def _command(self, command: bytes) -> None:
         """
-        Parser state machine.
-        Every 'yield' expression returns the next byte.
+        Handle the byte following an IAC.
         """
-        while True:
-            d = yield
-
-            if d == int2byte(0):
-                pass  # NOP
-
-            # Go to state escaped.
-            elif d == IAC:
-                d2 = yield
-
-                if d2 == IAC:
-                    self.received_data(d2)
+        if command == IAC:
+            self.received_data(command)
 
-                # Handle simple commands.
-                elif d2 in (NOP, DM, BRK, IP, AO, AYT, EC, EL, GA):
-                    self.command_received(d2, b"")
+        # Handle simple commands.
+        elif command in (NOP, DM, BRK, IP, AO, AYT, EC, EL, GA):
+            self.command_received(command, b"")
 
-                # Handle IAC-[DO/DONT/WILL/WONT] commands.
-                elif d2 in (DO, DONT, WILL, WONT):
-                    d3 = yield
-                    self.command_received(d2, d3)
+        # IAC-[DO/DONT/WILL/WONT] commands take the next byte as argument.
+        elif command in (DO, DONT, WILL, WONT):
+            self._command_name = command
+            self._state = _STATE_COMMAND_ARGUMENT
+            return
 
-                # Subnegotiation
-                elif d2 == SB:
-                    # Consume everything until next IAC-SE
-                    data = []
+        # Subnegotiation: consume everything until the next IAC-SE.
+        elif command == SB:
+            self._subnegotiation = []
+            self._state = _STATE_SUBNEGOTIATION
+            return
 
-                    while True:
-                        d3 = yield
-
-                        if d3 == IAC:
-                            d4 = yield
-                            if d4 == SE:
-                                break
-                            else:
-                                data.append(d4)
-                        else:
-                            data.append(d3)
-
-                    self.negotiate(b"".join(data))
-            else:
-                self.received_data(d)
+        self._state = _STATE_DATA
 
     def feed(self, data: bytes) -> None:
         """
         Feed data to the parser.
+
+        Runs of plain data (and of subnegotiation data) are found with
+        `bytes.find` and handled at once, only the bytes of telnet commands are
+        handled one at a time.
         """
-        for b in data:
-            self._parser.send(int2byte(b))
+        # Fast paths: only plain data (eg. key presses).
+        if self._state == _STATE_DATA:
+            if len(data) == 1:
+                # A single byte, read as soon as it was typed. (Comparing is
+                # much cheaper than `in` for a single byte.)
+                if data != IAC and data != NOP:
+                    self.received_data(data)
+                    return
+            elif IAC not in data and NOP not in data:
+                if data:
+                    self.received_data(data)
+                return
+
+        i = 0
+        length = len(data)
+
+        while i < length:
+            state = self._state
+
+            if state == _STATE_DATA:
+                end = data.find(IAC, i)
+                if end == -1:
+                    end = length
+                if end > i:
+                    # NUL bytes are NOPs.
+                    chunk = data[i:end].replace(NOP, b"")
+                    if chunk:
+                        self.received_data(chunk)
+                if end < length:
+                    self._state = _STATE_IAC
+                i = end + 1
+
+            elif state == _STATE_IAC:
+                self._command(data[i : i + 1])
+                i += 1
+
+            elif state == _STATE_COMMAND_ARGUMENT:
+                self._state = _STATE_DATA
+                self.command_received(self._command_name, data[i : i + 1])
+                i += 1
+
+            elif state == _STATE_SUBNEGOTIATION:
+                end = data.find(IAC, i)
+                if end == -1:
+                    end = length
+                if end > i:
+                    self._subnegotiation.append(data[i:end])
+                if end < length:
+                    self._state = _STATE_SUBNEGOTIATION_IAC
+                i = end + 1
+
+            else:  # _STATE_SUBNEGOTIATION_IAC
+                d = data[i : i + 1]
+                i += 1
+                if d == SE:
+                    self._state = _STATE_DATA
+                    self.negotiate(b"".join(self._subnegotiation))
+                else:
+                    # Escaped byte (eg. IAC-IAC) in the subnegotiation data.
+                    self._subnegotiation.append(d)
+                    self._state = _STATE_SUBNEGOTIATION
@@ -4,7 +4,7 @@ Telnet server.
 import asyncio
 import contextvars  # Requires Python3.7!
 import socket
-from asyncio import get_event_loop
+from asyncio import CancelledError, get_event_loop
 from typing import Awaitable, Callable, List, Optional, Set, TextIO, Tuple, cast
 
 from prompt_toolkit.application.current import create_app_session, get_app
@@ -40,50 +40,95 @@ def int2byte(number: int) -> bytes:
     return bytes((number,))
 
 
-def _initialize_telnet(connection: socket.socket) -> None:
+# Limits of the per-connection output buffer. Above the high watermark new
+# frames are skipped, and once the client catches up (below the low watermark)
+# the screen is repainted once instead.
+WRITE_BUFFER_HIGH_WATERMARK = 64 * 1024
+WRITE_BUFFER_LOW_WATERMARK = 16 * 1024
+
+
+def _initialize_telnet(transport: asyncio.WriteTransport) -> None:
     logger.info("Initializing telnet connection")
 
     # Iac Do Linemode
-    connection.send(IAC + DO + LINEMODE)
+    transport.write(IAC + DO + LINEMODE)
 
     # Suppress Go Ahead. (This seems important for Putty to do correct echoing.)
     # This will allow bi-directional operation.
-    connection.send(IAC + WILL + SUPPRESS_GO_AHEAD)
+    transport.write(IAC + WILL + SUPPRESS_GO_AHEAD)
 
     # Iac sb
-    connection.send(IAC + SB + LINEMODE + MODE + int2byte(0) + IAC + SE)
+    transport.write(IAC + SB + LINEMODE + MODE + int2byte(0) + IAC + SE)
 
     # IAC Will Echo
-    connection.send(IAC + WILL + ECHO)
+    transport.write(IAC + WILL + ECHO)
 
     # Negotiate window size
-    connection.send(IAC + DO + NAWS)
+    transport.write(IAC + DO + NAWS)
 
 
 class _ConnectionStdout:
     """
-    Wrapper around socket which provides `write` and `flush` methods for the
-    Vt100_Output output.
+    Wrapper around the connection's transport which provides `write` and
+    `flush` methods for the Vt100_Output output.
+
+    Writes never block: they are buffered by the transport. While the
+    transport's buffer is above its high watermark (a slow or stalled client)
+    the frames of the running application are skipped rather than buffered,
+    then `on_resume` is called to repaint the screen. Anything else (e.g.
+    restoring the terminal when the application is done) is always written.
+
+    :param is_frame: Called on `flush`, returns whether the output is a frame
+        that the repaint replaces.
     """
 
-    def __init__(self, connection: socket.socket, encoding: str) -> None:
+    def __init__(
+        self,
+        encoding: str,
+        is_frame: Callable[[], bool],
+        on_resume: Callable[[], None],
+    ) -> None:
         self._encoding = encoding
-        self._connection = connection
         self._errors = "strict"
         self._buffer: List[bytes] = []
+        self._is_frame = is_frame
+        self._on_resume = on_resume
+        self._transport: Optional[asyncio.WriteTransport] = None
+        self._paused = False
+        self._frames_skipped = False
+
+    def set_transport(self, transport: asyncio.WriteTransport) -> None:
+        self._transport = transport
+
+    def pause_writing(self) -> None:
+        " Called when the transport's buffer goes over the high watermark. "
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        " Called when the transport's buffer drains to the low watermark. "
+        self._paused = False
+        if self._frames_skipped:
+            self._frames_skipped = False
+            self._on_resume()
 
     def write(self, data: str) -> None:
         self._buffer.append(data.encode(self._encoding, errors=self._errors))
-        self.flush()
 
     def flush(self) -> None:
-        try:
-            self._connection.send(b"".join(self._buffer))
-        except socket.error as e:
-            logger.warning("Couldn't send data over socket: %s" % e)
+        if not self._buffer:
+            return
 
+        data = b"".join(self._buffer)
         self._buffer = []
 
+        if self._transport is None or self._transport.is_closing():
+            return
+        if self._paused and self._is_frame():
+            # The client can't keep up, skip this frame.
+            self._frames_skipped = True
+            return
+        self._transport.write(data)
+
     @property
     def encoding(self) -> str:
         return self._encoding
@@ -93,6 +138,33 @@ class _ConnectionStdout:
         return self._errors
 
 
+class _TelnetProtocol(asyncio.Protocol):
+    """
+    Protocol of the connection's transport, passing the incoming data and the
+    flow control events to the `TelnetConnection`.
+    """
+
+    def __init__(self, connection: "TelnetConnection") -> None:
+        self.connection = connection
+
+    def data_received(self, data: bytes) -> None:
+        self.connection.feed(data)
+
+    def eof_received(self) -> None:
+        # Connection closed by client.
+        logger.info("Connection closed by client. %r %r" % self.connection.addr)
+        self.connection.close()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.connection.close()
+
+    def pause_writing(self) -> None:
+        self.connection.stdout.pause_writing()
+
+    def resume_writing(self) -> None:
+        self.connection.stdout.resume_writing()
+
+
 class TelnetConnection:
     """
     Class that represents one Telnet connection.
@@ -119,8 +191,8 @@ class TelnetConnection:
         # Create "Output" object.
         self.size = Size(rows=40, columns=79)
 
-        # Initialize.
-        _initialize_telnet(conn)
+        # Created in `run_application`.
+        self.transport: Optional[asyncio.Transport] = None
 
         # Create input.
         self.vt100_input = PosixPipeInput()
@@ -129,8 +201,12 @@ class TelnetConnection:
         def get_size() -> Size:
             return self.size
 
-        self.stdout = cast(TextIO, _ConnectionStdout(conn, encoding=encoding))
-        self.vt100_output = Vt100_Output(self.stdout, get_size, write_binary=False)
+        self.stdout = _ConnectionStdout(
+            encoding=encoding, is_frame=self._is_frame, on_resume=self._repaint
+        )
+        self.vt100_output = Vt100_Output(
+            cast(TextIO, self.stdout), get_size, write_binary=False
+        )
 
         def data_received(data: bytes) -> None:
             """ TelnetProtocolParser 'data_received' callback """
@@ -144,27 +220,40 @@ class TelnetConnection:
         self.parser = TelnetProtocolParser(data_received, size_received)
         self.context: Optional[contextvars.Context] = None
 
+        # Task running `interact`, cancelled when the client disconnects.
+        self._interact_task: Optional["asyncio.Task[None]"] = None
+
     async def run_application(self) -> None:
         """
         Run application.
         """
 
-        def handle_incoming_data() -> None:
-            data = self.conn.recv(1024)
-            if data:
-                self.feed(data)
-            else:
-                # Connection closed by client.
-                logger.info("Connection closed by client. %r %r" % self.addr)
-                self.close()
-
         async def run() -> None:
-            # Add reader.
+            # Let the event loop read and write the socket (without blocking).
             loop = get_event_loop()
-            loop.add_reader(self.conn, handle_incoming_data)
-
+            transport, _ = await loop.connect_accepted_socket(
+                lambda: _TelnetProtocol(self), sock=self.conn
+            )
+            self.transport = cast(asyncio.Transport, transport)
+            self.transport.set_write_buffer_limits(
+                high=WRITE_BUFFER_HIGH_WATERMARK, low=WRITE_BUFFER_LOW_WATERMARK
+            )
+            self.stdout.set_transport(self.transport)
+
+            # Initialize.
+            _initialize_telnet(self.transport)
+
+            # Run the interaction in its own task, so that `close` can end it
+            # when the client disconnects (the application doesn't notice by
+            # itself, it would keep waiting for input).
+            self._interact_task = loop.create_task(self.interact(self))
             try:
-                await self.interact(self)
+                await self._interact_task
+            except CancelledError:
+                # The client disconnected, unless it's this task that was
+                # cancelled (e.g. by `TelnetServer.stop`).
+                if not self._closed:
+                    raise
             except Exception as e:
                 print("Got %s" % type(e).__name__, e)
                 import traceback
@@ -173,6 +262,8 @@ class TelnetConnection:
                 raise
             finally:
                 self.close()
+                # Only now that the application is done with it.
+                self.vt100_input.close()
 
         with create_app_session(input=self.vt100_input, output=self.vt100_output):
             self.context = contextvars.copy_context()
@@ -191,9 +282,41 @@ class TelnetConnection:
         if not self._closed:
             self._closed = True
 
-            self.vt100_input.close()
-            get_event_loop().remove_reader(self.conn)
-            self.conn.close()
+            if self._interact_task is not None and not self._interact_task.done():
+                self._interact_task.cancel()
+            if self.transport is not None:
+                self.transport.close()
+            else:
+                self.conn.close()
+
+    def _is_frame(self) -> bool:
+        """
+        Whether the output being flushed is a frame of the running application.
+        (The output is flushed by the application, so in its context.) Once the
+        application is done, its final frame and the output restoring the
+        terminal have to be written.
+        """
+        app = get_app()
+        return app.is_running and not app.is_done
+
+    def _repaint(self) -> None:
+        """
+        Repaint the whole screen, after frames were skipped because the client
+        couldn't keep up.
+        """
+
+        def repaint() -> None:
+            app = get_app()
+            if not app.is_running or app.is_done:
+                # Nothing to repaint anymore.
+                return
+            # Clear, because the client's screen no longer matches what the
+            # renderer thinks was drawn.
+            app.renderer.clear()
+            app.invalidate()
+
+        if self.context:
+            self.context.run(repaint)
 
     def send(self, formatted_text: AnyFormattedText) -> None:
         """
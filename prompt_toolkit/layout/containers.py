@@ -7,6 +7,7 @@ from enum import Enum
 from functools import partial
 from typing import (
     TYPE_CHECKING,
+    Any,
     Callable,
     Dict,
     List,
@@ -55,7 +56,7 @@ from .dimension import (
 )
 from .margins import Margin
 from .mouse_handlers import MouseHandlers
-from .screen import _CHAR_CACHE, Screen, WritePosition
+from .screen import _CHAR_TABLE, Screen, WritePosition
 from .utils import explode_text_fragments
 
 if TYPE_CHECKING:
@@ -227,9 +228,52 @@ class _Split(Container):
         self.key_bindings = key_bindings
         self.style = style
 
+        # Dimensions and sizes computed since the application was last
+        # invalidated. (See `_cached`.)
+        self._dimensions_cache: SimpleCache[Tuple[Any, ...], Any] = SimpleCache(
+            maxsize=16
+        )
+
+        # Sizes of the children, for the available size and the dimensions of
+        # the children. (See `_get_sizes`.)
+        self._sizes_cache: SimpleCache[
+            Tuple[int, bool, Tuple[Tuple[int, int, int, int], ...]],
+            Optional[List[int]],
+        ] = SimpleCache(maxsize=8)
+
     def is_modal(self) -> bool:
         return self.modal
 
+    def _cached(self, key: Tuple[Any, ...], get_value: Callable[[], Any]) -> Any:
+        """
+        Return the result of `get_value`, computed once for this key until the
+        application is invalidated. (The dimensions of a split are queried
+        several times per frame, and again by every split around it.)
+        """
+        app = get_app()
+        return self._dimensions_cache.get(
+            (app.dimensions_generation, app.is_done) + key, get_value
+        )
+
+    def _get_sizes(
+        self,
+        available_size: int,
+        dimensions: List[Dimension],
+        divide: Callable[[int, List[Dimension]], Optional[List[int]]],
+    ) -> Optional[List[int]]:
+        """
+        Return the result of `divide`, dividing the available size between the
+        children. That only depends on the size and on the dimensions of the
+        children, which usually stay the same even when the dimensions were
+        invalidated.
+        """
+        key = (
+            available_size,
+            get_app().is_done,
+            tuple((d.min, d.max, d.preferred, d.weight) for d in dimensions),
+        )
+        return self._sizes_cache.get(key, lambda: divide(available_size, dimensions))
+
     def get_key_bindings(self) -> Optional[KeyBindingsBase]:
         return self.key_bindings
 
@@ -312,21 +356,28 @@ class HSplit(_Split):
         if self.width is not None:
             return to_dimension(self.width)
 
-        if self.children:
-            dimensions = [c.preferred_width(
-                max_available_width) for c in self.children]
-            return max_layout_dimensions(dimensions)
-        else:
-            return Dimension()
+        def get() -> Dimension:
+            if self.children:
+                dimensions = [c.preferred_width(
+                    max_available_width) for c in self.children]
+                return max_layout_dimensions(dimensions)
+            else:
+                return Dimension()
+
+        return self._cached(("preferred_width", max_available_width), get)
 
     def preferred_height(self, width: int, max_available_height: int) -> Dimension:
         if self.height is not None:
             return to_dimension(self.height)
 
-        dimensions = [
-            c.preferred_height(width, max_available_height) for c in self._all_children
-        ]
-        return sum_layout_dimensions(dimensions)
+        def get() -> Dimension:
+            dimensions = [
+                c.preferred_height(width, max_available_height)
+                for c in self._all_children
+            ]
+            return sum_layout_dimensions(dimensions)
+
+        return self._cached(("preferred_height", width, max_available_height), get)
 
     def reset(self) -> None:
         for c in self.children:
@@ -433,10 +484,18 @@ class HSplit(_Split):
         width = write_position.width
         height = write_position.height
 
-        # Calculate heights.
-        dimensions = [c.preferred_height(width, height)
-                      for c in self._all_children]
+        def get() -> Optional[List[int]]:
+            # Calculate heights.
+            dimensions = [c.preferred_height(width, height)
+                          for c in self._all_children]
 
+            return self._get_sizes(height, dimensions, self._distribute_heights)
+
+        return self._cached(("divide_heights", width, height), get)
+
+    def _distribute_heights(
+        self, height: int, dimensions: List[Dimension]
+    ) -> Optional[List[int]]:
         # Sum dimensions
         sum_dimensions = sum_layout_dimensions(dimensions)
 
@@ -551,11 +610,14 @@ class VSplit(_Split):
         if self.width is not None:
             return to_dimension(self.width)
 
-        dimensions = [
-            c.preferred_width(max_available_width) for c in self._all_children
-        ]
+        def get() -> Dimension:
+            dimensions = [
+                c.preferred_width(max_available_width) for c in self._all_children
+            ]
+
+            return sum_layout_dimensions(dimensions)
 
-        return sum_layout_dimensions(dimensions)
+        return self._cached(("preferred_width", max_available_width), get)
 
     def preferred_height(self, width: int, max_available_height: int) -> Dimension:
         if self.height is not None:
@@ -569,17 +631,20 @@ class VSplit(_Split):
         # height was more than required. (we had a `BufferControl` which did
         # wrap lines because of the smaller width returned by `_divide_widths`.
 
-        sizes = self._divide_widths(width)
-        children = self._all_children
+        def get() -> Dimension:
+            sizes = self._divide_widths(width)
+            children = self._all_children
 
-        if sizes is None:
-            return Dimension()
-        else:
-            dimensions = [
-                c.preferred_height(s, max_available_height)
-                for s, c in zip(sizes, children)
-            ]
-            return max_layout_dimensions(dimensions)
+            if sizes is None:
+                return Dimension()
+            else:
+                dimensions = [
+                    c.preferred_height(s, max_available_height)
+                    for s, c in zip(sizes, children)
+                ]
+                return max_layout_dimensions(dimensions)
+
+        return self._cached(("preferred_height", width, max_available_height), get)
 
     def reset(self) -> None:
         for c in self.children:
@@ -628,8 +693,17 @@ class VSplit(_Split):
         if not children:
             return []
 
-        # Calculate widths.
-        dimensions = [c.preferred_width(width) for c in children]
+        def get() -> Optional[List[int]]:
+            # Calculate widths.
+            dimensions = [c.preferred_width(width) for c in children]
+
+            return self._get_sizes(width, dimensions, self._distribute_widths)
+
+        return self._cached(("divide_widths", width), get)
+
+    def _distribute_widths(
+        self, width: int, dimensions: List[Dimension]
+    ) -> Optional[List[int]]:
         preferred_dimensions = [d.preferred for d in dimensions]
 
         # Sum dimensions
@@ -701,10 +775,15 @@ class VSplit(_Split):
 
         # Calculate heights, take the largest possible, but not larger than
         # write_position.height.
-        heights = [
-            child.preferred_height(width, write_position.height).preferred
-            for width, child in zip(sizes, children)
-        ]
+        def get_heights() -> List[int]:
+            return [
+                child.preferred_height(width, write_position.height).preferred
+                for width, child in zip(sizes, children)
+            ]
+
+        heights = self._cached(
+            ("heights", write_position.width, write_position.height), get_heights
+        )
         height = max(write_position.height, min(
             write_position.height, max(heights)))
 
@@ -1004,14 +1083,14 @@ class FloatContainer(Container):
         (For floats that should not hide content underneath.)
         """
         wp = write_position
+        chars = _CHAR_TABLE.chars
 
-        for y in range(wp.ypos, wp.ypos + wp.height):
-            if y in screen.data_buffer:
+        for y in range(max(wp.ypos, 0), wp.ypos + wp.height):
+            if y < len(screen.data_buffer):
                 row = screen.data_buffer[y]
 
-                for x in range(wp.xpos, wp.xpos + wp.width):
-                    c = row[x]
-                    if c.char != " ":
+                for x in range(max(wp.xpos, 0), min(wp.xpos + wp.width, len(row))):
+                    if chars[row[x]].char != " ":
                         return False
 
         return True
@@ -1402,6 +1481,15 @@ class WindowAlign(Enum):
     CENTER = "CENTER"
 
 
+def _same_dimension(dimension1: Dimension, dimension2: Dimension) -> bool:
+    return (
+        dimension1.min == dimension2.min
+        and dimension1.max == dimension2.max
+        and dimension1.preferred == dimension2.preferred
+        and dimension1.weight == dimension2.weight
+    )
+
+
 class Window(Container):
     """
     Container that holds a control.
@@ -1527,6 +1615,11 @@ class Window(Container):
             maxsize=1
         )
 
+        # The last preferred width and height, with the arguments they were
+        # calculated for. (See `preferred_size_changed`.)
+        self._last_preferred_width: Optional[Tuple[int, Dimension]] = None
+        self._last_preferred_height: Optional[Tuple[int, int, Dimension]] = None
+
         self.reset()
 
     def __repr__(self) -> str:
@@ -1596,11 +1689,13 @@ class Window(Container):
             return preferred_width
 
         # Merge.
-        return self._merge_dimensions(
+        result = self._merge_dimensions(
             dimension=to_dimension(self.width),
             get_preferred=preferred_content_width,
             dont_extend=self.dont_extend_width(),
         )
+        self._last_preferred_width = (max_available_width, result)
+        return result
 
     def preferred_height(self, width: int, max_available_height: int) -> Dimension:
         """
@@ -1623,11 +1718,33 @@ class Window(Container):
                 self.get_line_prefix,
             )
 
-        return self._merge_dimensions(
+        result = self._merge_dimensions(
             dimension=to_dimension(self.height),
             get_preferred=preferred_content_height,
             dont_extend=self.dont_extend_height(),
         )
+        self._last_preferred_height = (width, max_available_height, result)
+        return result
+
+    def preferred_size_changed(self) -> bool:
+        """
+        True when the preferred width or height of this window is not what it
+        was during the last layout. (The containers around it would divide
+        the space otherwise.)
+        """
+        if self._last_preferred_width is not None:
+            max_available_width, width = self._last_preferred_width
+            if not _same_dimension(self.preferred_width(max_available_width), width):
+                return True
+
+        if self._last_preferred_height is not None:
+            available_width, max_available_height, height = self._last_preferred_height
+            if not _same_dimension(
+                self.preferred_height(available_width, max_available_height), height
+            ):
+                return True
+
+        return False
 
     @staticmethod
     def _merge_dimensions(
@@ -1744,6 +1861,8 @@ class Window(Container):
         if write_position.height <= 0 or write_position.width <= 0:
             return
 
+        screen.drawn_windows[self] = (write_position, parent_style, erase_bg)
+
         # Calculate margin sizes.
         left_margin_widths = [self._get_margin_width(
             m) for m in self.left_margins]
@@ -1763,6 +1882,9 @@ class Window(Container):
             ui_content, write_position.width - total_margin_width, write_position.height
         )
 
+        # Make room for this window in the rows of the screen.
+        screen.reserve_width(write_position.xpos + write_position.width)
+
         # Erase background and fill with `char`.
         self._fill_bg(screen, write_position, erase_bg)
 
@@ -1935,8 +2057,11 @@ class Window(Container):
         xpos = write_position.xpos + move_x
         ypos = write_position.ypos
         line_count = ui_content.line_count
-        new_buffer = new_screen.data_buffer
-        empty_char = _CHAR_CACHE["", ""]
+        get_row = new_screen.get_row
+        char_table = _CHAR_TABLE
+        chars = char_table.chars
+        char_widths = char_table.widths
+        empty_char = char_table["", ""]
 
         # Map visible line number to (row, col) of input.
         # 'col' will always be zero if line wrapping is off.
@@ -1994,7 +2119,7 @@ class Window(Container):
             col = 0
             wrap_count = 0
             for style, text, *_ in line:
-                new_buffer_row = new_buffer[y + ypos]
+                new_buffer_row = get_row(y + ypos)
 
                 # Remember raw VT escape sequences. (E.g. FinalTerm's
                 # escape sequences.)
@@ -2003,8 +2128,8 @@ class Window(Container):
                     continue
 
                 for c in text:
-                    char = _CHAR_CACHE[c, style]
-                    char_width = char.width
+                    char = char_table[c, style]
+                    char_width = char_widths[char]
 
                     # Wrap when the line width is exceeded.
                     if wrap_lines and x + char_width > width:
@@ -2024,14 +2149,16 @@ class Window(Container):
                             x, y = copy_line(
                                 prompt, lineno, x, y, is_input=False)
 
-                        new_buffer_row = new_buffer[y + ypos]
+                        new_buffer_row = get_row(y + ypos)
 
                         if y >= write_position.height:
                             return x, y  # Break out of all for loops.
 
                     # Set character in screen and shift 'x'.
                     if x >= 0 and y >= 0 and x < write_position.width:
-                        new_buffer_row[x + xpos] = char
+                        # (Floats can be partially left of the screen.)
+                        if x + xpos >= 0:
+                            new_buffer_row[x + xpos] = char
 
                         # When we print a multi width character, make sure
                         # to erase the neighbours positions in the screen.
@@ -2039,7 +2166,8 @@ class Window(Container):
                         # so next redraw this cell will repaint anyway.)
                         if char_width > 1:
                             for i in range(1, char_width):
-                                new_buffer_row[x + xpos + i] = empty_char
+                                if 0 <= x + xpos + i < len(new_buffer_row):
+                                    new_buffer_row[x + xpos + i] = empty_char
 
                         # If this is a zero width characters, then it's
                         # probably part of a decomposed unicode character.
@@ -2052,10 +2180,12 @@ class Window(Container):
                             for pw in [2, 1]:  # Previous character width.
                                 if (
                                     x - pw >= 0
-                                    and new_buffer_row[x + xpos - pw].width == pw
+                                    and x + xpos - pw >= 0
+                                    and char_widths[new_buffer_row[x + xpos - pw]]
+                                    == pw
                                 ):
-                                    prev_char = new_buffer_row[x + xpos - pw]
-                                    char2 = _CHAR_CACHE[
+                                    prev_char = chars[new_buffer_row[x + xpos - pw]]
+                                    char2 = char_table[
                                         prev_char.char + c, prev_char.style
                                     ]
                                     new_buffer_row[x + xpos - pw] = char2
@@ -2166,13 +2296,7 @@ class Window(Container):
             char = self.char
 
         if erase_bg or char:
-            wp = write_position
-            char_obj = _CHAR_CACHE[char or " ", ""]
-
-            for y in range(wp.ypos, wp.ypos + wp.height):
-                row = screen.data_buffer[y]
-                for x in range(wp.xpos, wp.xpos + wp.width):
-                    row[x] = char_obj
+            screen.fill_with_char(write_position, char or " ")
 
     def _apply_style(
         self, new_screen: Screen, write_position: WritePosition, parent_style: str
@@ -2201,7 +2325,7 @@ class Window(Container):
         digraph_char = self._get_digraph_char()
         if digraph_char:
             cpos = new_screen.get_cursor_position(self)
-            new_screen.data_buffer[cpos.y][cpos.x] = _CHAR_CACHE[
+            new_screen.get_row(cpos.y)[cpos.x] = _CHAR_TABLE[
                 digraph_char, "class:digraph"
             ]
 
@@ -2224,7 +2348,7 @@ class Window(Container):
             # Display only if this is a 1 cell width character.
             if get_cwidth(data) == 1:
                 cpos = new_screen.get_cursor_position(self)
-                new_screen.data_buffer[cpos.y][cpos.x] = _CHAR_CACHE[
+                new_screen.get_row(cpos.y)[cpos.x] = _CHAR_TABLE[
                     data, "class:partial-key-binding"
                 ]
 
@@ -2237,23 +2361,25 @@ class Window(Container):
         cursor_line_style = " class:cursor-line "
         cursor_column_style = " class:cursor-column "
 
-        data_buffer = new_screen.data_buffer
+        get_row = new_screen.get_row
+        char_table = _CHAR_TABLE
+        chars = char_table.chars
 
         # Highlight cursor line.
         if self.cursorline():
-            row = data_buffer[cpos.y]
-            for x in range(x, x + width):
-                original_char = row[x]
-                row[x] = _CHAR_CACHE[
+            row = get_row(cpos.y)
+            for x in range(max(x, 0), x + width):
+                original_char = chars[row[x]]
+                row[x] = char_table[
                     original_char.char, original_char.style + cursor_line_style
                 ]
 
         # Highlight cursor column.
         if self.cursorcolumn():
             for y2 in range(y, y + height):
-                row = data_buffer[y2]
-                original_char = row[cpos.x]
-                row[cpos.x] = _CHAR_CACHE[
+                row = get_row(y2)
+                original_char = chars[row[cpos.x]]
+                row[cpos.x] = char_table[
                     original_char.char, original_char.style + cursor_column_style
                 ]
 
@@ -2270,9 +2396,11 @@ class Window(Container):
                 color_column_style = " " + cc.style
 
                 for y2 in range(y, y + height):
-                    row = data_buffer[y2]
-                    original_char = row[column + x]
-                    row[column + x] = _CHAR_CACHE[
+                    row = get_row(y2)
+                    if column + x >= len(row):
+                        break
+                    original_char = chars[row[column + x]]
+                    row[column + x] = char_table[
                         original_char.char, original_char.style + color_column_style
                     ]
 
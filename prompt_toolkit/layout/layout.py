@@ -22,6 +22,11 @@ __all__ = [
 
 FocusableElement = Union[str, Buffer, UIControl, AnyContainer]
 
+# Number of previously focused windows to remember. (Windows that were
+# focused are kept alive by the focus history, together with everything they
+# reference, so it shouldn't grow for as long as the application runs.)
+FOCUS_HISTORY_SIZE = 10
+
 
 class Layout:
     """
@@ -219,7 +224,11 @@ class Layout:
     @current_window.setter
     def current_window(self, value: Window):
         " Set the :class:`.Window` object to be currently focused. "
+        # Only remember the most recent time a window was focused.
+        if value in self._stack:
+            self._stack.remove(value)
         self._stack.append(value)
+        del self._stack[:-FOCUS_HISTORY_SIZE]
 
     @property
     def is_searching(self) -> bool:
@@ -1,7 +1,8 @@
+import threading
+from array import array
 from collections import defaultdict
 from typing import TYPE_CHECKING, Callable, DefaultDict, Dict, List, Optional, Tuple
 
-from prompt_toolkit.cache import FastDictCache
 from prompt_toolkit.data_structures import Point
 from prompt_toolkit.utils import get_cwidth
 
@@ -131,15 +132,90 @@ class Char:
         return "%s(%r, %r)" % (self.__class__.__name__, self.char, self.style)
 
 
-_CHAR_CACHE: FastDictCache[Tuple[str, str], Char] = FastDictCache(
-    Char, size=1000 * 1000
-)
 Transparent = "[transparent]"
 
 
+class _CharTable(Dict[Tuple[str, str], int]):
+    """
+    Interned characters: maps (char, style) tuples to the integer ids that a
+    :class:`.Screen` stores in its cells. `chars` and `widths` map the ids back
+    to the :class:`.Char` instances and their widths.
+
+    Id 0 is the transparent space of the empty cells.
+
+    :param size: Number of characters above which `reset_if_full` clears the
+        table.
+    """
+
+    def __init__(self, size: int) -> None:
+        super().__init__()
+        self.size = size
+        self.chars: List[Char] = []
+        self.widths: List[int] = []
+
+        #: Incremented when the table is cleared. The ids of the screens
+        #: created before can't be compared with the new ones.
+        self.generation = 0
+
+        self._lock = threading.Lock()
+        self[" ", Transparent]
+
+    def __missing__(self, key: Tuple[str, str]) -> int:
+        char = Char(*key)
+
+        with self._lock:
+            # Control characters are displayed otherwise, give them the id of
+            # the equal `Char`.
+            char_id = self.get((char.char, char.style))
+            if char_id is None:
+                char_id = len(self.chars)
+                self.chars.append(char)
+                self.widths.append(char.width)
+                self[char.char, char.style] = char_id
+
+            self[key] = char_id
+        return char_id
+
+    def reset_if_full(self) -> None:
+        """
+        Clear the table when it has more than `size` characters. This has to
+        be called between frames, when no screen is being written.
+        """
+        if len(self.chars) > self.size:
+            with self._lock:
+                self.clear()
+                self.chars = []
+                self.widths = []
+                self.generation += 1
+            self[" ", Transparent]
+
+
+_CHAR_TABLE = _CharTable(size=1000 * 1000)
+
+
+def _row_length(row: "array[int]", default_char_id: int) -> int:
+    """
+    Number of cells in this row, up to the last one that isn't the default
+    character.
+    """
+    if default_char_id == 0:
+        # Strip the trailing zero bytes in C, then round up to whole cells.
+        itemsize = row.itemsize
+        return (len(row.tobytes().rstrip(b"\0")) + itemsize - 1) // itemsize
+
+    length = len(row)
+    while length and row[length - 1] == default_char_id:
+        length -= 1
+    return length
+
+
 class Screen:
     """
-    Two dimensional buffer of :class:`.Char` instances.
+    Two dimensional buffer of :class:`.Char` instances. Each row is an array
+    of the ids of its characters in `_CHAR_TABLE`.
+
+    :param initial_width: Width of the rows. (They are extended when something
+        is written further to the right, see `reserve_width`.)
     """
 
     def __init__(
@@ -150,13 +226,15 @@ class Screen:
     ) -> None:
 
         if default_char is None:
-            default_char2 = _CHAR_CACHE[" ", Transparent]
+            self.default_char_id = 0
         else:
-            default_char2 = default_char
+            self.default_char_id = _CHAR_TABLE[default_char.char, default_char.style]
 
-        self.data_buffer: DefaultDict[int, DefaultDict[int, Char]] = defaultdict(
-            lambda: defaultdict(lambda: default_char2)
-        )
+        self.char_table_generation = _CHAR_TABLE.generation
+
+        #: Rows of character ids. (Added by `get_row`.)
+        self.data_buffer: List["array[int]"] = []
+        self._empty_row = array("I", [self.default_char_id]) * (initial_width or 0)
 
         #: Escape sequences to be injected.
         self.zero_width_escapes: DefaultDict[int, DefaultDict[int, str]] = defaultdict(
@@ -179,8 +257,8 @@ class Screen:
             "Window", Point
         ] = {}  # Map `Window` objects to `Point` objects.
 
-        #: Currently used width/height of the screen. This will increase when
-        #: data is written to the screen.
+        #: Currently used width/height of the screen. The width increases in
+        #: `reserve_width`, the height when data is written to the screen.
         self.width = initial_width or 0
         self.height = initial_height or 0
 
@@ -188,9 +266,69 @@ class Screen:
         # this list.)
         self.visible_windows: List["Window"] = []
 
+        #: The write position, parent style and `erase_bg` of each drawn
+        #: `Window`, in drawing order. (To draw a window again, see
+        #: `Application.invalidate_window`.)
+        self.drawn_windows: Dict["Window", Tuple["WritePosition", str, bool]] = {}
+
         # List of (z_index, draw_func)
         self._draw_float_functions: List[Tuple[int, Callable[[], None]]] = []
 
+    def get_row(self, y: int) -> "array[int]":
+        """
+        Return the character ids of row `y`, adding the rows up to it when
+        needed. (For a negative `y`, above the screen, a row that isn't part
+        of the screen is returned.)
+        """
+        if y < 0:
+            return array("I", self._empty_row)
+
+        rows = self.data_buffer
+        while len(rows) <= y:
+            rows.append(array("I", self._empty_row))
+        return rows[y]
+
+    def get_char(self, x: int, y: int) -> Char:
+        """
+        Return the :class:`.Char` at this position.
+        """
+        if 0 <= y < len(self.data_buffer) and 0 <= x < self.width:
+            return _CHAR_TABLE.chars[self.data_buffer[y][x]]
+        return _CHAR_TABLE.chars[self.default_char_id]
+
+    def reserve_width(self, width: int) -> None:
+        """
+        Extend the rows, so that they are at least `width` cells wide.
+        """
+        if width > self.width:
+            padding = array("I", [self.default_char_id]) * (width - self.width)
+            for row in self.data_buffer:
+                row.extend(padding)
+            self._empty_row.extend(padding)
+            self.width = width
+
+    def copy(self) -> "Screen":
+        """
+        Return a copy of this screen, to draw over.
+        """
+        screen = Screen()
+        screen.default_char_id = self.default_char_id
+        screen.char_table_generation = self.char_table_generation
+        screen.data_buffer = [array("I", row) for row in self.data_buffer]
+        screen._empty_row = array("I", self._empty_row)
+
+        for y, escapes_row in self.zero_width_escapes.items():
+            screen.zero_width_escapes[y].update(escapes_row)
+
+        screen.cursor_positions = dict(self.cursor_positions)
+        screen.show_cursor = self.show_cursor
+        screen.menu_positions = dict(self.menu_positions)
+        screen.width = self.width
+        screen.height = self.height
+        screen.visible_windows = list(self.visible_windows)
+        screen.drawn_windows = dict(self.drawn_windows)
+        return screen
+
     def set_cursor_position(self, window: "Window", position: Point) -> None:
         """
         Set the cursor position for a given window.
@@ -248,19 +386,55 @@ class Screen:
             self._draw_float_functions = functions[1:]
             functions[0][1]()
 
+    def fill_with_char(
+        self, write_position: "WritePosition", char: str = " ", style: str = ""
+    ) -> None:
+        """
+        Replace the content of this area by the given character.
+        """
+        self._fill(write_position, _CHAR_TABLE[char, style])
+
+    def clear_area(self, write_position: "WritePosition") -> None:
+        """
+        Make this area empty again, including its escape sequences.
+        """
+        self._fill(write_position, self.default_char_id)
+
+        xmin = write_position.xpos
+        xmax = write_position.xpos + write_position.width
+
+        for y in range(
+            write_position.ypos, write_position.ypos + write_position.height
+        ):
+            escapes_row = self.zero_width_escapes.get(y)
+            if escapes_row:
+                for x in [x for x in escapes_row if xmin <= x < xmax]:
+                    del escapes_row[x]
+
+    def _fill(self, write_position: "WritePosition", char_id: int) -> None:
+        xmin = max(write_position.xpos, 0)
+        xmax = write_position.xpos + write_position.width
+        if xmax <= xmin:
+            return
+
+        self.reserve_width(xmax)
+        span = array("I", [char_id]) * (xmax - xmin)
+
+        for y in range(
+            max(write_position.ypos, 0), write_position.ypos + write_position.height
+        ):
+            self.get_row(y)[xmin:xmax] = span
+
     def append_style_to_content(self, style_str: str) -> None:
         """
         For all the characters in the screen.
         Set the style string to the given `style_str`.
         """
-        b = self.data_buffer
-        char_cache = _CHAR_CACHE
+        restyled = _RestyledChars("", " " + style_str)
+        # Empty cells stay transparent.
+        restyled[self.default_char_id] = self.default_char_id
 
-        append_style = " " + style_str
-
-        for y, row in b.items():
-            for x, char in row.items():
-                b[y][x] = char_cache[char.char, char.style + append_style]
+        self._restyle(range(len(self.data_buffer)), 0, self.width, restyled)
 
     def fill_area(
         self, write_position: "WritePosition", style: str = "", after: bool = False
@@ -272,27 +446,72 @@ class Screen:
         if not style.strip():
             return
 
-        xmin = write_position.xpos
+        xmin = max(write_position.xpos, 0)
         xmax = write_position.xpos + write_position.width
-        char_cache = _CHAR_CACHE
-        data_buffer = self.data_buffer
+        self.reserve_width(xmax)
 
         if after:
-            append_style = " " + style
-            prepend_style = ""
+            restyled = _RestyledChars("", " " + style)
         else:
-            append_style = ""
-            prepend_style = style + " "
+            restyled = _RestyledChars(style + " ", "")
+
+        self._restyle(
+            range(
+                max(write_position.ypos, 0),
+                write_position.ypos + write_position.height,
+            ),
+            xmin,
+            xmax,
+            restyled,
+        )
 
-        for y in range(
-            write_position.ypos, write_position.ypos + write_position.height
-        ):
-            row = data_buffer[y]
-            for x in range(xmin, xmax):
-                cell = row[x]
-                row[x] = char_cache[
-                    cell.char, prepend_style + cell.style + append_style
-                ]
+    def _restyle(
+        self, ys: range, xmin: int, xmax: int, restyled: "_RestyledChars"
+    ) -> None:
+        """
+        Replace the characters between `xmin` and `xmax` of these rows by
+        their `restyled` version, a whole span at a time.
+        """
+        if xmax <= xmin:
+            return
+
+        # Areas are mostly backgrounds, where consecutive rows are the same.
+        previous_span: Optional["array[int]"] = None
+        new_span = array("I")
+
+        for y in ys:
+            row = self.get_row(y)
+            span = row[xmin:xmax]
+
+            if span != previous_span:
+                first = span[0]
+                if span.count(first) == len(span):
+                    new_span = array("I", [restyled[first]]) * len(span)
+                else:
+                    new_span = array("I", map(restyled.__getitem__, span))
+                previous_span = span
+
+            row[xmin:xmax] = new_span
+
+
+class _RestyledChars(Dict[int, int]):
+    """
+    Maps character ids to the ids of the same characters with a style
+    prepended and appended to theirs.
+    """
+
+    def __init__(self, prepend_style: str, append_style: str) -> None:
+        super().__init__()
+        self.prepend_style = prepend_style
+        self.append_style = append_style
+
+    def __missing__(self, char_id: int) -> int:
+        char = _CHAR_TABLE.chars[char_id]
+        new_char_id = _CHAR_TABLE[
+            char.char, self.prepend_style + char.style + self.append_style
+        ]
+        self[char_id] = new_char_id
+        return new_char_id
 
 
 class WritePosition:
@@ -2,10 +2,21 @@
 Renders the command line on the console.
 (Redraws parts of the input line that were changed.)
 """
+from array import array
 from asyncio import FIRST_COMPLETED, Future, sleep, wait
 from collections import deque
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.data_structures import Point, Size
@@ -13,7 +24,13 @@ from prompt_toolkit.filters import FilterOrBool, to_filter
 from prompt_toolkit.formatted_text import AnyFormattedText, to_formatted_text
 from prompt_toolkit.input.base import Input
 from prompt_toolkit.layout.mouse_handlers import MouseHandlers
-from prompt_toolkit.layout.screen import Char, Screen, WritePosition
+from prompt_toolkit.layout.screen import (
+    _CHAR_TABLE,
+    Char,
+    Screen,
+    WritePosition,
+    _row_length,
+)
 from prompt_toolkit.output import ColorDepth, Output
 from prompt_toolkit.styles import (
     Attrs,
@@ -25,6 +42,7 @@ from prompt_toolkit.utils import is_windows
 
 if TYPE_CHECKING:
     from prompt_toolkit.application import Application
+    from prompt_toolkit.layout.containers import Window
     from prompt_toolkit.layout.layout import Layout
 
 
@@ -152,14 +170,18 @@ def _output_screen_diff(
 
     # When the previous screen has a different size, redraw everything anyway.
     # Also when we are done. (We might take up less rows, so clearing is important.)
+    # (And when the character ids of the screens can't be compared.)
     if (
-        is_done or not previous_screen or previous_width != width
+        is_done
+        or not previous_screen
+        or previous_width != width
+        or previous_screen.char_table_generation != screen.char_table_generation
     ):  # XXX: also consider height??
         current_pos = move_cursor(Point(x=0, y=0))
         reset_attributes()
         output.erase_down()
 
-        previous_screen = Screen()
+        previous_screen = Screen(initial_width=width)
 
     # Get height of the screen.
     # (height changes as we loop over data_buffer, so remember the current value.)
@@ -169,35 +191,51 @@ def _output_screen_diff(
     # Loop over the rows.
     row_count = min(max(screen.height, previous_screen.height), height)
     c = 0  # Column counter.
+    chars = _CHAR_TABLE.chars
+    char_widths = _CHAR_TABLE.widths
 
     for y in range(row_count):
-        new_row = screen.data_buffer[y]
-        previous_row = previous_screen.data_buffer[y]
-        zero_width_escapes_row = screen.zero_width_escapes[y]
+        new_row = screen.get_row(y)
+        previous_row = previous_screen.get_row(y)
+
+        # Skip rows that didn't change, without looping over their columns.
+        # (Usually most of them. The rows are arrays of character ids,
+        # compared in C. The contents have to be compared: a full render
+        # writes every row of a new screen, so nothing can tell which rows
+        # are still the same as in the previous screen.)
+        if new_row == previous_row:
+            continue
+
+        zero_width_escapes_row = screen.zero_width_escapes.get(y)
 
-        new_max_line_len = min(width - 1, max(new_row.keys()) if new_row else 0)
+        new_max_line_len = min(
+            width - 1, _row_length(new_row, screen.default_char_id) - 1
+        )
         previous_max_line_len = min(
-            width - 1, max(previous_row.keys()) if previous_row else 0
+            width - 1, _row_length(previous_row, previous_screen.default_char_id) - 1
         )
+        if len(previous_row) <= new_max_line_len:
+            # (The previous screen was narrower.)
+            previous_row = previous_row + array(
+                "I", [previous_screen.default_char_id]
+            ) * (new_max_line_len + 1 - len(previous_row))
 
         # Loop over the columns.
         c = 0
         while c < new_max_line_len + 1:
             new_char = new_row[c]
-            old_char = previous_row[c]
-            char_width = new_char.width or 1
+            char_width = char_widths[new_char] or 1
 
             # When the old and new character at this position are different,
-            # draw the output. (Because of the performance, we don't call
-            # `Char.__ne__`, but inline the same expression.)
-            if new_char.char != old_char.char or new_char.style != old_char.style:
+            # draw the output. (Interned characters have a single id.)
+            if new_char != previous_row[c]:
                 current_pos = move_cursor(Point(x=c, y=y))
 
                 # Send injected escape sequences to output.
-                if c in zero_width_escapes_row:
+                if zero_width_escapes_row and c in zero_width_escapes_row:
                     write_raw(zero_width_escapes_row[c])
 
-                output_char(new_char)
+                output_char(chars[new_char])
                 current_pos = Point(x=current_pos.x + char_width, y=current_pos.y)
 
             c += char_width
@@ -243,6 +281,16 @@ def _output_screen_diff(
     return current_pos, last_style
 
 
+def _overlap(write_position: WritePosition, other: WritePosition) -> bool:
+    " True when the two areas have cells in common. "
+    return (
+        write_position.xpos < other.xpos + other.width
+        and other.xpos < write_position.xpos + write_position.width
+        and write_position.ypos < other.ypos + other.height
+        and other.ypos < write_position.ypos + write_position.height
+    )
+
+
 class HeightIsUnknownError(Exception):
     " Information unavailable. Did not yet receive the CPR response. "
 
@@ -337,6 +385,8 @@ class Renderer:
         self._last_screen: Optional[Screen] = None
         self._last_size: Optional[Size] = None
         self._last_style: Optional[str] = None
+        self._last_height = 0
+        self._last_current_window: Optional["Window"] = None
 
         # Default MouseHandlers. (Just empty.)
         self.mouse_handlers = MouseHandlers()
@@ -514,13 +564,20 @@ class Renderer:
         await wait(coroutines, return_when=FIRST_COMPLETED)
 
     def render(
-        self, app: "Application[Any]", layout: "Layout", is_done: bool = False
+        self,
+        app: "Application[Any]",
+        layout: "Layout",
+        is_done: bool = False,
+        dirty_windows: Optional[Set["Window"]] = None,
     ) -> None:
         """
         Render the current interface to the output.
 
         :param is_done: When True, put the cursor at the end of the interface. We
                 won't print any changes to this part.
+        :param dirty_windows: When given, only these windows changed: they are
+            drawn again over the previous screen, if they can be. (See
+            `Application.invalidate_window`.)
         """
         output = self.output
 
@@ -547,10 +604,7 @@ class Renderer:
 
         # Create screen and write layout to it.
         size = output.get_size()
-        screen = Screen()
-        screen.show_cursor = False  # Hide cursor by default, unless one of the
-        # containers decides to display it.
-        mouse_handlers = MouseHandlers()
+        _CHAR_TABLE.reset_if_full()
 
         # Calculate height.
         if self.full_screen:
@@ -595,19 +649,31 @@ class Renderer:
         self._last_transformation_hash = app.style_transformation.invalidation_hash()
         self._last_color_depth = app.color_depth
 
-        layout.container.write_to_screen(
-            screen,
-            mouse_handlers,
-            WritePosition(xpos=0, ypos=0, width=size.columns, height=height,),
-            parent_style="",
-            erase_bg=False,
-            z_index=None,
-        )
-        screen.draw_all_floats()
+        screen: Optional[Screen] = None
+        if dirty_windows is not None and not is_done and not app.exit_style:
+            screen = self._redraw_windows(layout, dirty_windows, height)
+
+        if screen is None:
+            screen = Screen(initial_width=size.columns)
+            screen.show_cursor = False  # Hide cursor by default, unless one of the
+            # containers decides to display it.
+            mouse_handlers = MouseHandlers()
+
+            layout.container.write_to_screen(
+                screen,
+                mouse_handlers,
+                WritePosition(xpos=0, ypos=0, width=size.columns, height=height,),
+                parent_style="",
+                erase_bg=False,
+                z_index=None,
+            )
+            screen.draw_all_floats()
+
+            # When grayed. Replace all styles in the new screen.
+            if app.exit_style:
+                screen.append_style_to_content(app.exit_style)
 
-        # When grayed. Replace all styles in the new screen.
-        if app.exit_style:
-            screen.append_style_to_content(app.exit_style)
+            self.mouse_handlers = mouse_handlers
 
         # Process diff and write to output.
         self._cursor_pos, self._last_style = _output_screen_diff(
@@ -626,7 +692,8 @@ class Renderer:
         )
         self._last_screen = screen
         self._last_size = size
-        self.mouse_handlers = mouse_handlers
+        self._last_height = height
+        self._last_current_window = layout.current_window
 
         output.flush()
 
@@ -636,6 +703,54 @@ class Renderer:
         if is_done:
             self.reset()
 
+    def _redraw_windows(
+        self, layout: "Layout", windows: Set["Window"], height: int
+    ) -> Optional[Screen]:
+        """
+        Draw these windows again over a copy of the last screen.
+
+        Return `None` when everything has to be drawn again: when a window is
+        not on the last screen, overlaps other windows, or has another
+        preferred size (then the layout changes), and when the focus or the
+        height changed.
+        """
+        last_screen = self._last_screen
+
+        if (
+            last_screen is None
+            or last_screen.char_table_generation != _CHAR_TABLE.generation
+            or height != self._last_height
+            or layout.current_window is not self._last_current_window
+        ):
+            return None
+
+        drawn_windows = last_screen.drawn_windows
+
+        for window in windows:
+            if window not in drawn_windows or window.preferred_size_changed():
+                return None
+
+            # What is drawn under or over the window would be lost.
+            write_position = drawn_windows[window][0]
+            for other_window, (other_write_position, _, _) in drawn_windows.items():
+                if other_window is not window and _overlap(
+                    write_position, other_write_position
+                ):
+                    return None
+
+        screen = last_screen.copy()
+
+        for window in windows:
+            write_position, parent_style, erase_bg = drawn_windows[window]
+            screen.clear_area(write_position)
+            window._write_to_screen_at_index(
+                screen, self.mouse_handlers, write_position, parent_style, erase_bg
+            )
+
+        # (The windows add themselves again.)
+        screen.visible_windows = list(last_screen.visible_windows)
+        return screen
+
     def erase(self, leave_alternate_screen: bool = True) -> None:
         """
         Hide all output and put the cursor back at the first line. This is for
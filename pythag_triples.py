@@ -0,0 +1,118 @@
+# Lazily built store of pythagorean triples (a, b, c) sorted by hypotenuse.
+
+import os
+import struct
+from array import array
+from math import gcd, isqrt
+from threading import Lock
+from typing import Optional, Tuple
+
+# Header of the cache file: magic, format version, max leg length, triple count.
+_CACHE_MAGIC = b'PYTH'
+_CACHE_VERSION = 1
+_CACHE_HEADER = struct.Struct('<4sIII')
+
+
+def euclid_triples(max_leg: int):
+    """
+    Yields every pythagorean triple (a, b, c) with a <= b <= max_leg using
+    Euclid's formula: a = k(m²-n²), b = k(2mn), c = k(m²+n²) for coprime m > n
+    of opposite parity. The triples are yielded in no particular order.
+    """
+    # If m is any larger, then there is no n where both legs are <= max_leg.
+    max_m = isqrt(2 * max_leg) + 1
+    for m in range(2, max_m + 1):
+        # Only m - n odd (opposite parity) gives primitive triples.
+        for n in range(1 + m % 2, m, 2):
+            if gcd(m, n) != 1:
+                continue
+            a = m * m - n * n
+            b = 2 * m * n
+            c = m * m + n * n
+            if a > b:
+                a, b = b, a
+            # Multiples of a primitive triple are also triples.
+            for k in range(1, max_leg // b + 1):
+                yield k * a, k * b, k * c
+
+
+class PythagTripleStore:
+    """
+    Array backed list of every pythagorean triple with legs <= `max_leg`,
+    sorted by hypotenuse (then shortest leg). The triples are only generated
+    the first time the store is accessed, so creating the store is free.
+
+    :param max_leg: The maximum length of the non-hypotenuse sides.
+    :param cache_path: If given, the triples are loaded from (and saved to)
+        this file instead of being generated every time the program starts.
+    """
+
+    def __init__(self, max_leg: int, cache_path: Optional[str] = None) -> None:
+        self.max_leg = max_leg
+        self.cache_path = cache_path
+        # Flattened (a, b, c) triples, None until first access.
+        self._data: Optional[array] = None
+        self._lock = Lock()
+
+    def _get_data(self) -> array:
+        data = self._data
+        if data is None:
+            # Questions may be generated from multiple threads at once.
+            with self._lock:
+                if self._data is None:
+                    self._data = self._load_cache() or self._build()
+                data = self._data
+        return data
+
+    def _build(self) -> array:
+        triples = sorted(euclid_triples(self.max_leg), key=lambda t: (t[2], t[0]))
+        data = array('I')
+        for triple in triples:
+            data.extend(triple)
+        self._save_cache(data)
+        return data
+
+    def _load_cache(self) -> Optional[array]:
+        if self.cache_path is None:
+            return None
+        try:
+            with open(self.cache_path, 'rb') as file:
+                header = file.read(_CACHE_HEADER.size)
+                magic, version, max_leg, count = _CACHE_HEADER.unpack(header)
+                if (magic, version, max_leg) != (_CACHE_MAGIC, _CACHE_VERSION, self.max_leg):
+                    return None
+                data = array('I')
+                data.fromfile(file, count * 3)
+                return data
+        except (OSError, EOFError, struct.error):
+            # Missing or corrupt cache, regenerate it.
+            return None
+
+    def _save_cache(self, data: array) -> None:
+        if self.cache_path is None:
+            return
+        # Write to a temporary file first so other processes never read a half
+        # written cache.
+        tmp_path = '%s.%s.tmp' % (self.cache_path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as file:
+                file.write(_CACHE_HEADER.pack(
+                    _CACHE_MAGIC, _CACHE_VERSION, self.max_leg, len(data) // 3))
+                data.tofile(file)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # The cache is only an optimisation.
+            pass
+
+    def warm(self) -> None:
+        """Generates (or loads) the triples now instead of on first access."""
+        self._get_data()
+
+    def __len__(self) -> int:
+        return len(self._get_data()) // 3
+
+    def __getitem__(self, i: int) -> Tuple[int, int, int]:
+        data = self._get_data()
+        if i < 0:
+            i += len(data) // 3
+        return data[3 * i], data[3 * i + 1], data[3 * i + 2]
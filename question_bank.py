@@ -0,0 +1,210 @@
+# Binary question bank files, so identical pre-generated tests can be handed
+# out without generating questions in every session.
+#
+# File layout (little endian):
+#   header: magic, version, test length, difficulty, content, record count,
+#           index offset (the difficulty and content the questions were
+#           generated with, see _difficulty_ids and _content_area_bits)
+#   records: one after the other (see _encode_record)
+#   index: record count + 1 offsets, record i is between offsets i and i + 1
+
+import mmap
+import struct
+from array import array
+from sys import byteorder
+
+from question_generation import (
+    TestSettings,
+    TestDifficultySetting,
+    TestContentArea,
+    TestQuestionCountSetting,
+    QuestionRecordType,
+    MultipleChoiceQuestionRecord,
+    InputAnswerFormat,
+    InputQuestionRecord
+)
+
+QUESTION_BANK_MAGIC = b'QMQB'
+QUESTION_BANK_VERSION = 2
+
+_header_struct = struct.Struct('<4sHHBBQQ')
+_offset_struct = struct.Struct('<Q')
+_u8_struct = struct.Struct('<B')
+_str_length_struct = struct.Struct('<I')
+
+# The numbers stored in the file, which must never change (unlike the enum
+# values).
+_record_type_ids = {
+    QuestionRecordType.MULTIPLE_CHOICE: 1,
+    QuestionRecordType.INPUT: 2
+}
+_answer_format_ids = {
+    InputAnswerFormat.INTEGER: 1,
+    InputAnswerFormat.NON_NEGATIVE_NUMBER: 2
+}
+_difficulty_ids = {
+    TestDifficultySetting.NORMAL: 1,
+    TestDifficultySetting.HARD: 2
+}
+# The content field has the bits of the content areas in the test set.
+_content_area_bits = {
+    TestContentArea.NUMBER_THEORY: 1,
+    TestContentArea.ALGEBRA: 2,
+    TestContentArea.GEOMETRY: 4
+}
+_record_types = {type_id: record_type for (record_type, type_id) in _record_type_ids.items()}
+_difficulties = {difficulty_id: difficulty for (difficulty, difficulty_id) in _difficulty_ids.items()}
+_answer_formats = {format_id: answer_format for (answer_format, format_id) in _answer_format_ids.items()}
+
+
+class QuestionBankError(Exception):
+    """Raised when a file isn't a valid question bank."""
+
+
+def _encode_str(text):
+    data = text.encode('utf-8')
+    return _str_length_struct.pack(len(data)) + data
+
+
+def _encode_record(record):
+    if record.type == QuestionRecordType.MULTIPLE_CHOICE:
+        # type, correct choice index, choice count, question, choices...
+        return b''.join([
+            _u8_struct.pack(_record_type_ids[record.type]),
+            _u8_struct.pack(record.correct_choice_index),
+            _u8_struct.pack(len(record.choices)),
+            _encode_str(record.question)
+        ] + [_encode_str(choice) for choice in record.choices])
+    # type, answer format, question, correct answer.
+    return b''.join([
+        _u8_struct.pack(_record_type_ids[record.type]),
+        _u8_struct.pack(_answer_format_ids[record.answer_format]),
+        _encode_str(record.question),
+        _encode_str(record.correct_answer)
+    ])
+
+
+def write_question_bank(path, records, settings):
+    """
+    Writes the question records to a question bank file, streaming them so
+    banks of any size can be written.
+
+    :param records: Iterable of question records.
+    :param settings: The TestSettings the questions were generated with. The
+        bank is made of back-to-back tests of `settings.question_count`
+        questions.
+    """
+    test_length = settings.question_count.value
+    difficulty_id = _difficulty_ids[settings.difficulty]
+    content_bits = sum(_content_area_bits[content] for content in settings.content)
+    with open(path, 'wb') as file:
+        # Written again at the end, once the record count is known.
+        file.write(_header_struct.pack(QUESTION_BANK_MAGIC, QUESTION_BANK_VERSION, test_length,
+                                       difficulty_id, content_bits, 0, 0))
+        offsets = array('Q', [_header_struct.size])
+        for record in records:
+            file.write(_encode_record(record))
+            offsets.append(file.tell())
+        index_offset = file.tell()
+        if byteorder == 'big':
+            offsets.byteswap()
+        offsets.tofile(file)
+        file.seek(0)
+        file.write(_header_struct.pack(QUESTION_BANK_MAGIC, QUESTION_BANK_VERSION, test_length,
+                                       difficulty_id, content_bits, len(offsets) - 1, index_offset))
+
+
+class QuestionBank:
+    """
+    Read only question bank, memory mapped so opening is instant however big the
+    bank is, and the pages are shared between every process using the bank.
+    Records are only decoded when they are accessed.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file.
+                raise QuestionBankError('%s is not a question bank' % path)
+        if len(self._map) < _header_struct.size:
+            raise QuestionBankError('%s is not a question bank' % path)
+        (magic, version, self.test_length, difficulty_id, content_bits, self._record_count,
+         self._index_offset) = _header_struct.unpack_from(self._map)
+        if magic != QUESTION_BANK_MAGIC:
+            raise QuestionBankError('%s is not a question bank' % path)
+        if version != QUESTION_BANK_VERSION:
+            raise QuestionBankError('%s has unsupported version %s' % (path, version))
+        try:
+            # The settings the questions were generated with.
+            self.settings = TestSettings(
+                difficulty=_difficulties[difficulty_id],
+                content={content for (content, bit) in _content_area_bits.items()
+                         if content_bits & bit},
+                question_count=TestQuestionCountSetting(self.test_length)
+            )
+        except (KeyError, ValueError):
+            raise QuestionBankError('%s has invalid settings' % path)
+        if self._index_offset + (self._record_count + 1) * _offset_struct.size > len(self._map):
+            raise QuestionBankError('%s is truncated' % path)
+
+    def __len__(self):
+        return self._record_count
+
+    def _read_str(self, offset):
+        (length,) = _str_length_struct.unpack_from(self._map, offset)
+        start = offset + _str_length_struct.size
+        return self._map[start:start + length].decode('utf-8'), start + length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._record_count
+        if not 0 <= i < self._record_count:
+            raise IndexError('question bank index out of range')
+        (offset,) = _offset_struct.unpack_from(self._map, self._index_offset + i * _offset_struct.size)
+        record_type = _record_types[self._map[offset]]
+
+        if record_type == QuestionRecordType.MULTIPLE_CHOICE:
+            correct_choice_index = self._map[offset + 1]
+            choice_count = self._map[offset + 2]
+            (question, offset) = self._read_str(offset + 3)
+            choices = []
+            for _ in range(choice_count):
+                (choice, offset) = self._read_str(offset)
+                choices.append(choice)
+            return MultipleChoiceQuestionRecord(question, choices, correct_choice_index)
+
+        answer_format = _answer_formats[self._map[offset + 1]]
+        (question, offset) = self._read_str(offset + 2)
+        (correct_answer, _) = self._read_str(offset)
+        return InputQuestionRecord(question, answer_format, correct_answer)
+
+    @property
+    def test_count(self):
+        return self._record_count // self.test_length
+
+    def get_test(self, test_index):
+        """Returns the records of a test in the bank (without decoding them)."""
+        if not 0 <= test_index < self.test_count:
+            raise IndexError('question bank has no test %s' % test_index)
+        start = test_index * self.test_length
+        return QuestionBankSlice(self, start, start + self.test_length)
+
+
+class QuestionBankSlice:
+    """Sequence of consecutive records of a question bank."""
+
+    def __init__(self, question_bank, start, stop):
+        self._question_bank = question_bank
+        self.settings = question_bank.settings
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError('question bank slice index out of range')
+        return self._question_bank[self._start + i]
@@ -0,0 +1,1001 @@
+# Generates test questions as plain records (no prompt_toolkit widgets), so
+# questions can be generated reproducibly from a seed, in bulk and in other
+# processes.
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum, auto
+from itertools import combinations
+from math import pi, sqrt
+from os import cpu_count
+from random import Random
+from string import ascii_lowercase
+
+from prime_sieve import get_divisors, smallest_prime_factor_table
+from pythag_triples import PythagTripleStore
+
+
+class TestSettings:
+    def __init__(self, difficulty, content, question_count):
+        # Either normal or god mode.
+        self.difficulty = difficulty
+        # A set containing the content in the test.
+        self.content = content
+        # The number of questions in the test.
+        self.question_count = question_count
+
+
+class TestDifficultySetting(Enum):
+    NORMAL = auto()
+    HARD = auto()
+
+
+class TestContentArea(Enum):
+    NUMBER_THEORY = auto()
+    ALGEBRA = auto()
+    GEOMETRY = auto()
+
+
+class TestQuestionCountSetting(Enum):
+    SHORT = 15 # 15 Questions.
+    NORMAL = 30 # 30 Questions.
+    LONG = 60 # 60 Questions.
+
+
+class QuestionRecordType(Enum):
+    MULTIPLE_CHOICE = auto()
+    INPUT = auto()
+
+
+class MultipleChoiceQuestionRecord:
+    type = QuestionRecordType.MULTIPLE_CHOICE
+
+    def __init__(self, question, choices, correct_choice_index):
+        # The question text.
+        self.question = question
+        # List of answer texts.
+        self.choices = choices
+        # The index of the correct answer in choices.
+        self.correct_choice_index = correct_choice_index
+
+
+class InputAnswerFormat(Enum):
+    INTEGER = auto()  # eg. -5 or 16.
+    NON_NEGATIVE_NUMBER = auto()  # eg. 0, 2.456 or 123.
+
+
+class InputQuestionRecord:
+    type = QuestionRecordType.INPUT
+
+    def __init__(self, question, answer_format, correct_answer):
+        # The question text.
+        self.question = question
+        # What the user is allowed to enter.
+        self.answer_format = answer_format
+        # The correct answer, exactly as the user has to enter it.
+        self.correct_answer = correct_answer
+
+
+def question_record_to_dict(record):
+    """Converts a question record into a json serializable dict."""
+    if record.type == QuestionRecordType.MULTIPLE_CHOICE:
+        return {
+            'type': 'multiple_choice',
+            'question': record.question,
+            'choices': record.choices,
+            'correct_choice_index': record.correct_choice_index
+        }
+    return {
+        'type': 'input',
+        'question': record.question,
+        'answer_format': record.answer_format.name.lower(),
+        'correct_answer': record.correct_answer
+    }
+
+
+def get_integer_error_msg(text):
+    try:
+        int(text)
+        return None
+    except ValueError:
+        return 'Please enter an integer.'
+
+
+def get_float_error_msg(text):
+    try:
+        float(text)
+        return None
+    except ValueError:
+        return 'Please enter a valid number.'
+
+
+def get_non_negative_number_error_msg(text):
+    float_err = get_float_error_msg(text)
+    if float_err is not None:
+        return float_err
+    num = float(text)
+    if num < 0:
+        return 'Please enter a positive integer.'
+    return None
+
+
+def get_input_error_msg(answer_format, text):
+    """Returns the error message to show if the text isn't a valid answer, or
+    None if it is valid."""
+    if answer_format == InputAnswerFormat.INTEGER:
+        return get_integer_error_msg(text)
+    return get_non_negative_number_error_msg(text)
+
+
+def get_test_progress(settings, question_index):
+    """Maps the test progress to a float between 0 and 1"""
+    question_count = settings.question_count.value
+    # Between 0 and 1.
+    return question_index / (question_count - 1)
+
+
+# https://stackoverflow.com/questions/1969240/mapping-a-range-of-values-to-another
+def map_range(value, leftMin, leftMax, rightMin, rightMax):
+    # Figure out how 'wide' each range is
+    leftSpan = leftMax - leftMin
+    rightSpan = rightMax - rightMin
+
+    # Convert the left range into a 0-1 range (float)
+    valueScaled = float(value - leftMin) / float(leftSpan)
+
+    # Convert the 0-1 range into a value in the right range.
+    return rightMin + (valueScaled * rightSpan)
+
+
+def iter_random_indices(rng, population_size):
+    """Yields the integers from 0 to population_size-1 in random order, with a
+    lazy Fisher-Yates shuffle. Taking k of them takes O(k) time and memory no
+    matter how large the population is."""
+    # Index => integer swapped into it, for the indices swapped so far.
+    swapped = {}
+    for j in range(population_size - 1, -1, -1):
+        i = rng.randrange(j + 1)
+        yield swapped.get(i, i)
+        swapped[i] = swapped.pop(j, j)
+
+
+def make_choices(rng, correct_answer, candidate_count, get_candidate, plausible_answers=(), plausible_count=1,
+                 distractor_count=3):
+    """
+    Returns the shuffled multiple choice answers and the index of the correct
+    answer. Every answer is a string, and no two answers are the same. There
+    are `distractor_count` fake answers, unless there are fewer different
+    answers among the plausible answers and candidates.
+
+    :param candidate_count: The number of candidate fake answers.
+    :param get_candidate: Function which returns the candidate fake answer at
+        an index (from 0 to candidate_count-1). Usually only a few
+        candidates are generated, so there can be any number of them.
+    :param plausible_answers: Fake answers from common mistakes (eg. the wrong
+        sign). Up to `plausible_count` of them are used.
+    """
+    used_answers = {correct_answer}
+    fake_answers = []
+
+    def add_fake_answer(answer):
+        if answer not in used_answers:
+            used_answers.add(answer)
+            fake_answers.append(answer)
+
+    plausible_answers = list(plausible_answers)
+    rng.shuffle(plausible_answers)
+    for answer in plausible_answers:
+        if len(fake_answers) == plausible_count:
+            break
+        add_fake_answer(answer)
+
+    # Different candidates can be the same answer (or an answer already used),
+    # so keep drawing until there are enough fake answers or every candidate
+    # has been tried.
+    for i in iter_random_indices(rng, candidate_count):
+        if len(fake_answers) == distractor_count:
+            break
+        add_fake_answer(get_candidate(i))
+
+    choices = [correct_answer] + fake_answers
+    rng.shuffle(choices)
+    return choices, choices.index(correct_answer)
+
+
+class ExprNodeType(Enum):
+    NUMBER = auto()  # eg. 8
+    ADD = auto()  # eg. 8 + 4
+    SUBTRACT = auto()  # eg. 8 - 4
+    MULTIPLY = auto()  # eg. 8 × 4
+    DIVIDE = auto()  # eg. 8 ÷ 4
+    POWER = auto()  # eg. 8²
+    NEGATE = auto()  # eg. -8
+    PARENS = auto()  # eg. (8 - 4)
+
+
+class ExprNode:
+    # eg. ExprNode(ExprNodeType.ADD, 12, [ExprNode(ExprNodeType.NUMBER, 8),
+    #     ExprNode(ExprNodeType.NUMBER, 4)]) ==> 8 + 4.
+    def __init__(self, type, value, children=()):
+        self.type = type
+        # The exact (integer) value of the expression.
+        self.value = value
+        # The operands. The divisor of DIVIDE and the exponent of POWER are
+        # NUMBER nodes.
+        self.children = children
+
+
+def number_node(number):
+    return ExprNode(ExprNodeType.NUMBER, number)
+
+
+def add_parens(str):
+    """8+4 => (8+4)"""
+    return '(%s)' % str
+
+
+superscript = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+
+
+def expr_to_str(node):
+    """Returns the text of the expression and whether it is grouped (can be
+    used as an operand of ×, ÷ and - without adding parentheses)."""
+    node_type = node.type
+
+    if node_type == ExprNodeType.NUMBER:
+        return str(node.value), node.value >= 0
+
+    if node_type == ExprNodeType.NEGATE or node_type == ExprNodeType.PARENS:
+        (expr_str, is_expr_grouped) = expr_to_str(node.children[0])
+        if node_type == ExprNodeType.PARENS:
+            return add_parens(expr_str), True
+        return '-%s' % (expr_str if is_expr_grouped else add_parens(expr_str)), False
+
+    (lhs, rhs) = node.children
+    (lhs_str, is_lhs_grouped) = expr_to_str(lhs)
+
+    if node_type == ExprNodeType.DIVIDE:
+        return '%s ÷ %s' % (lhs_str if is_lhs_grouped else add_parens(lhs_str), rhs.value), True
+
+    if node_type == ExprNodeType.POWER:
+        # The base is a number or is already in parentheses, eg. 3² or (1 + 2)².
+        # (Not a power: 2²³ would read as 2 to the power of 23.)
+        is_base_grouped = lhs.type == ExprNodeType.NUMBER or lhs.type == ExprNodeType.PARENS
+        return '%s%s' % (lhs_str if is_base_grouped else add_parens(lhs_str),
+                         str(rhs.value).translate(superscript)), True
+
+    (rhs_str, is_rhs_grouped) = expr_to_str(rhs)
+
+    if node_type == ExprNodeType.ADD:
+        return '%s + %s' % (lhs_str, add_parens(rhs_str) if rhs_str[0] == '-' else rhs_str), False
+
+    if node_type == ExprNodeType.SUBTRACT:
+        return '%s - %s' % (lhs_str, rhs_str if is_rhs_grouped else add_parens(rhs_str)), False
+
+    return '%s × %s' % (lhs_str if is_lhs_grouped else add_parens(lhs_str),
+                        rhs_str if is_rhs_grouped else add_parens(rhs_str)), True
+
+
+# How likely each operation is to be chosen. Half of the operations combine the
+# expression with a random number (+, -, ×) and half only use the expression.
+bodmas_op_weights = [
+    (ExprNodeType.ADD, 4),
+    (ExprNodeType.SUBTRACT, 4),
+    (ExprNodeType.MULTIPLY, 4),
+    (ExprNodeType.DIVIDE, 3),
+    (ExprNodeType.POWER, 3),
+    (ExprNodeType.NEGATE, 3),
+    (ExprNodeType.PARENS, 3),
+]
+
+
+def is_bodmas_op_valid(op_type, expr):
+    if op_type == ExprNodeType.POWER:
+        # Only small non-negative bases, eg. no 57³ or (-2)⁵.
+        return 0 <= expr.value <= 20
+    if op_type == ExprNodeType.PARENS:
+        # No pointless parentheses around a number, eg. (8).
+        return expr.type != ExprNodeType.NUMBER or expr.value < 0
+    return True
+
+
+def apply_bodmas_op(rng, op_type, expr, max_value):
+    """Applies the operation to the expression, keeping the new value between
+    -max_value and max_value (assuming the expression's value already is)."""
+    value = expr.value
+
+    if op_type == ExprNodeType.NEGATE or op_type == ExprNodeType.PARENS:
+        return ExprNode(op_type, -value if op_type == ExprNodeType.NEGATE else value, [expr])
+
+    if op_type == ExprNodeType.DIVIDE:
+        if value == 0:
+            divisor = rng.randint(1, 10)
+        else:
+            divisor = rng.choice(get_divisors(abs(value)))
+        return ExprNode(op_type, value // divisor, [expr, number_node(divisor)])
+
+    if op_type == ExprNodeType.POWER:
+        max_exponent = 5 if value <= 2 else 3 if value <= 4 else 2
+        while max_exponent > 1 and value ** max_exponent > max_value:
+            max_exponent -= 1
+        exponent = rng.randint(1, max_exponent)
+        return ExprNode(op_type, value ** exponent, [expr, number_node(exponent)])
+
+    # Choose a random number between -10 and 10 which keeps the result in range
+    # (there always is one, eg. 0).
+    if op_type == ExprNodeType.ADD:
+        number = rng.randint(max(-10, -max_value - value), min(10, max_value - value))
+    elif op_type == ExprNodeType.SUBTRACT:
+        # Same range for expr - number and number - expr.
+        number = rng.randint(max(-10, value - max_value), min(10, value + max_value))
+    else:
+        max_multiplier = min(10, max_value // max(abs(value), 1))
+        number = rng.randint(-max_multiplier, max_multiplier)
+
+    # The random number can either be on the left or the right.
+    (lhs, rhs) = (expr, number_node(number)) if rng.randint(0, 1) == 0 else (number_node(number), expr)
+    if op_type == ExprNodeType.ADD:
+        new_value = lhs.value + rhs.value
+    elif op_type == ExprNodeType.SUBTRACT:
+        new_value = lhs.value - rhs.value
+    else:
+        new_value = lhs.value * rhs.value
+    return ExprNode(op_type, new_value, [lhs, rhs])
+
+
+def make_bodmas_expr(rng, iterations, max_value):
+    """Generates a random BODMAS expression tree (eg. 4+(6×8)÷2²) with exactly
+    `iterations` operations. Only operations which are valid for the current
+    expression are chosen from, so no work is thrown away."""
+    expr = number_node(rng.randint(-10, 10))
+    previous_op_type = None
+
+    for _ in range(iterations):
+        op_types = []
+        op_weights = []
+        for (op_type, weight) in bodmas_op_weights:
+            # Don't do the same operation twice in a row.
+            if op_type != previous_op_type and is_bodmas_op_valid(op_type, expr):
+                op_types.append(op_type)
+                op_weights.append(weight)
+        op_type = rng.choices(op_types, op_weights)[0]
+        expr = apply_bodmas_op(rng, op_type, expr, max_value)
+        previous_op_type = op_type
+
+    return expr
+
+
+def q_bodmas(rng, settings, test_progress):
+    difficulty = settings.difficulty
+
+    if difficulty == TestDifficultySetting.NORMAL:
+        difficulty_progression_factor = round(
+            map_range(test_progress, 0, 1, 0, 4))
+        iterations = rng.randint(2 + difficulty_progression_factor,
+                                 4 + difficulty_progression_factor)
+        max_value = 1000
+    else:
+        difficulty_progression_factor = round(
+            map_range(test_progress, 0, 1, 0, 15))
+        iterations = rng.randint(5 + difficulty_progression_factor,
+                                 10 + difficulty_progression_factor)
+        max_value = 100000
+
+    expr = make_bodmas_expr(rng, iterations, max_value)
+    (expr_str, _) = expr_to_str(expr)
+    expr_value = expr.value
+    question = 'Evaluate %s' % (expr_str)
+
+    if rng.randint(0, 1) == 0:
+        return InputQuestionRecord(
+            question=question,
+            answer_format=InputAnswerFormat.INTEGER,
+            correct_answer=str(expr_value)
+        )
+
+    # Fake answers are integers between -fake_answer_range and
+    # fake_answer_range, or common mistakes (wrong sign or off by one).
+    fake_answer_range = abs(expr_value) + 15
+    choices, correct_choice_index = make_choices(
+        rng,
+        correct_answer=str(expr_value),
+        candidate_count=2 * fake_answer_range + 1,
+        get_candidate=lambda i: str(i - fake_answer_range),
+        plausible_answers=[str(-expr_value), str(expr_value + 1), str(expr_value - 1)]
+    )
+
+    return MultipleChoiceQuestionRecord(question, choices, correct_choice_index)
+
+
+def q_factorise_quadratic(rng, settings, test_progress):
+    # The algorithm to generate the quadratic is that we generate random numbers
+    # k, a, and b. The quadratic will be of form k*(x+a)*(a+b), which is
+    # expanded as k*x^2 + k*(a+b)*x + k*a*b, and hence we derive the question
+    # expression.
+
+    difficulty = settings.difficulty
+
+    if difficulty == TestDifficultySetting.NORMAL:
+        max_val = round(map_range(test_progress, 0, 1, 8, 20))
+        k = 1
+    else:
+        max_val = round(map_range(test_progress, 0, 1, 25, 100))
+        k = rng.randint(1, max_val)
+    a = rng.randint(-max_val, max_val)
+    b = rng.randint(-max_val, max_val)
+    x2_coeff = k
+    x1_coeff = k * (a + b)
+    x0_coeff = k * (a * b)
+    poly = ('' if x2_coeff == 1 else str(x2_coeff)) + 'x²'
+    if x1_coeff != 0:
+        poly += (' + ' if x1_coeff > 0 else ' - ') + \
+                ('' if abs(x1_coeff) == 1 else str(abs(x1_coeff))) + 'x'
+    if x0_coeff != 0:
+        poly += (' + ' if x0_coeff > 0 else ' - ') + str(abs(x0_coeff))
+    question = f'Factorise {poly} fully.'
+
+    def make_factored_poly(a, b):
+        # a,b ==> k(x+a)(x+b).
+        # Always in the same order, so eg. (x+2)(x-3) can't be a fake answer
+        # for (x-3)(x+2).
+        a, b = sorted((a, b))
+
+        def make_term(n):
+            if n == 0:
+                return 'x'
+            return '(x' + ('+' if n > 0 else '-') + str(abs(n)) + ')'
+
+        a_term = make_term(a)
+        b_term = make_term(b)
+        return str('' if k == 1 else str(k)) + (
+            a_term + '²' if a_term == b_term else b_term + a_term if b_term == 'x' else a_term + b_term)
+
+    correct_ans = make_factored_poly(a, b)
+    # Fake answers add an error between -wrong_ans_error_range and
+    # wrong_ans_error_range to a and b, or get the signs wrong.
+    wrong_ans_error_range = (abs(a) + abs(b)) // 2 + 4
+    errors_per_term = 2 * wrong_ans_error_range + 1
+
+    def get_wrong_ans(i):
+        (a_error, b_error) = divmod(i, errors_per_term)
+        return make_factored_poly(a + a_error - wrong_ans_error_range, b + b_error - wrong_ans_error_range)
+
+    choices, correct_choice_index = make_choices(
+        rng,
+        correct_answer=correct_ans,
+        candidate_count=errors_per_term ** 2,
+        get_candidate=get_wrong_ans,
+        plausible_answers=[make_factored_poly(-a, -b), make_factored_poly(-a, b), make_factored_poly(a, -b)]
+    )
+
+    return MultipleChoiceQuestionRecord(question, choices, correct_choice_index)
+
+
+class PolyTerm:
+    # eg. PolyTerm('x', 3, 5) ==> 3x^5.
+    def __init__(self, variable, coeff, power):
+        self.variable = variable
+        self.coeff = coeff
+        self.power = power  # Integer >= 0.
+
+
+def poly_to_str(terms):
+    """Returns algebraic expression of the sum of all the list of PolyTerm's."""
+    poly_str = ''
+    for term in terms:
+        if term.coeff == 0:
+            continue
+        if term.coeff < 0:
+            if poly_str == '':
+                poly_str += '-'
+            else:
+                poly_str += ' - '
+        elif poly_str != '':
+            poly_str += ' + '
+        if abs(term.coeff) != 1:
+            poly_str += str(abs(term.coeff))
+        if term.power == 0:
+            continue
+        if term.power == 1:
+            poly_str += term.variable
+        else:
+            poly_str += term.variable + '^' + str(term.power)
+    return poly_str
+
+
+def q_simplify_linear(rng, settings, test_progress):
+    # 1. Generate random algebraic variable names (eg. 'x', 'a', 'e', 'z').
+    # 2. Generate a random number of integer coefficients for each variable.
+    # 3. Create question expression from coefficients eg. 2x+4y-2x+9x.
+    # 4. Create answer expression by summing variable coefficients.
+    #    eg. 9x+4y
+
+    difficulty = settings.difficulty
+    if difficulty == TestDifficultySetting.NORMAL:
+        variables = rng.sample(population=['x', 'y'], k=rng.randint(1, 2))
+        coeff_range = round(map_range(test_progress, 0, 1, 12, 50))
+        max_terms_per_var = round(map_range(test_progress, 0, 1, 2, 6))
+    else:
+        variables = rng.sample(population=list(
+            ascii_lowercase), k=rng.randint(3, 8))
+        coeff_range = round(map_range(test_progress, 0, 1, 1000, 3000))
+        max_terms_per_var = round(map_range(test_progress, 0, 1, 5, 12))
+    variable_coeffs = [
+        [coeff * rng.choice((-1, 1)) for coeff in rng.sample(population=range(1, coeff_range), k=rng.randint(
+            2, max_terms_per_var))] for _ in variables]
+    poly_q_terms = [PolyTerm(variable=variable, coeff=coeff, power=1) for (
+        variable, coeffs) in zip(variables, variable_coeffs) for coeff in coeffs]
+    rng.shuffle(poly_q_terms)
+    poly_q = poly_to_str(poly_q_terms)
+    poly_ans_coeffs = [sum(coeffs) for coeffs in variable_coeffs]
+    poly_ans_terms = [PolyTerm(variable=variable, coeff=coeff, power=1) for (
+        variable, coeff) in zip(variables, poly_ans_coeffs)]
+    correct_ans = poly_to_str(poly_ans_terms)
+
+    # Fake answers add an error to each coefficient between -wrong_range and
+    # wrong_range.
+    wrong_ranges = [(abs(term.coeff) // 2) + 10 for term in poly_ans_terms]
+
+    def get_wrong_ans(i):
+        wrong_terms = []
+        for (term, wrong_range) in zip(poly_ans_terms, wrong_ranges):
+            # Treat i as a number where each digit is a coefficient's error.
+            (i, error) = divmod(i, 2 * wrong_range + 1)
+            wrong_terms.append(PolyTerm(variable=term.variable, coeff=term.coeff + error - wrong_range,
+                                        power=term.power))
+        return poly_to_str(wrong_terms)
+
+    wrong_ans_count = 1
+    for wrong_range in wrong_ranges:
+        wrong_ans_count *= 2 * wrong_range + 1
+
+    # Common mistake: ignoring the minus signs.
+    ignored_signs_terms = [PolyTerm(variable=variable, coeff=sum(abs(coeff) for coeff in coeffs), power=1) for (
+        variable, coeffs) in zip(variables, variable_coeffs)]
+
+    choices, correct_choice_index = make_choices(
+        rng,
+        correct_answer=correct_ans,
+        candidate_count=wrong_ans_count,
+        get_candidate=get_wrong_ans,
+        plausible_answers=[poly_to_str(ignored_signs_terms)]
+    )
+    question = f'Simplify %s' % (poly_q)
+    return MultipleChoiceQuestionRecord(question, choices, correct_choice_index)
+
+
+# Pythagorean triples with legs up to 2000, sorted by hypotenuse. The triples are
+# generated the first time a question needs them (not when the program starts).
+pythag_triple_store = PythagTripleStore(max_leg=2000)
+units = ['mm', 'cm', 'm', 'km', ' miles', ' yoctometers', ' planck lengths']
+
+
+def q_find_hypot(rng, settings, test_progress):
+    difficulty = settings.difficulty
+    if difficulty == TestDifficultySetting.NORMAL:
+        upper_bound = round(map_range(test_progress, 0, 1, 15, 50))
+    else:
+        upper_bound = round(map_range(test_progress, 0, 1,
+                                      500, len(pythag_triple_store) - 1))
+    i = rng.randint(0, upper_bound)
+    # Get pythag triple satisfying a^2+b^2=c^2.
+    a, b, c = pythag_triple_store[i]
+    unit = rng.choice(units)
+    question = f'What is the length of the hypotenuse in a right angled triangle with non-hypotenuse sides of length {a}{unit} and {b}{unit}?'
+    # Fake answers are the adjacent pythag triple d^2+e^2=f^2 or adding the
+    # sides, otherwise lengths between c/2 and 2c.
+    d, e, f = pythag_triple_store[1 if i == 0 else i - 1]
+    choices, correct_choice_index = make_choices(
+        rng,
+        correct_answer=str(c) + unit,
+        candidate_count=2 * c - c // 2,
+        get_candidate=lambda i: str(c // 2 + 1 + i) + unit,
+        plausible_answers=[str(d) + unit, str(e) + unit, str(f) + unit, str(a + b) + unit],
+        plausible_count=3
+    )
+    return MultipleChoiceQuestionRecord(question, choices, correct_choice_index)
+
+
+def rand_progressive(rng, settings, test_progress, min_upper, max_upper):
+    """Random integer which gets larger as the test progresses."""
+    difficulty_factor = 1 if settings.difficulty == TestDifficultySetting.NORMAL else 100
+    return rng.randint(min_upper, round(
+        map_range(test_progress, 0, 1, min_upper + (max_upper - min_upper) / 5, max_upper * difficulty_factor)))
+
+
+def circle_area_from_radius(rng, settings, test_progress, unit):
+    radius = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the area of a circle with radius {radius}{unit}', pi * radius ** 2
+
+
+def circle_area_from_diameter(rng, settings, test_progress, unit):
+    diameter = rand_progressive(rng, settings, test_progress, 5, 200)
+    return f'What is the area of a circle with diameter {diameter}{unit}', pi * (diameter / 2) ** 2
+
+
+def circle_area_from_circumference(rng, settings, test_progress, unit):
+    circumference = rand_progressive(rng, settings, test_progress, 5, 600)
+    radius = circumference / 2 / pi
+    return f'What is the area of a circle with circumference {circumference}{unit}', pi * radius ** 2
+
+
+def circle_circumference_from_radius(rng, settings, test_progress, unit):
+    radius = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the circumference of a circle with radius {radius}{unit}', 2 * pi * radius
+
+
+def circle_circumference_from_diameter(rng, settings, test_progress, unit):
+    diameter = rand_progressive(rng, settings, test_progress, 5, 200)
+    return f'What is the circumference of a circle with diameter {diameter}{unit}', 2 * pi * (diameter / 2)
+
+
+def circle_circumference_from_area(rng, settings, test_progress, unit):
+    area = rand_progressive(rng, settings, test_progress, 5, 10000)
+    radius = sqrt(area / pi)
+    return f'What is the circumference of a circle with area {area}{unit}', 2 * pi * radius
+
+
+def circle_radius_from_diameter(rng, settings, test_progress, unit):
+    diameter = rand_progressive(rng, settings, test_progress, 5, 200)
+    return f'What is the radius of a circle with diameter {diameter}{unit}', diameter / 2
+
+
+def circle_radius_from_circumference(rng, settings, test_progress, unit):
+    circumference = rand_progressive(rng, settings, test_progress, 5, 600)
+    return f'What is the radius of a circle with circumference {circumference}{unit}', circumference / 2 / pi
+
+
+def circle_radius_from_area(rng, settings, test_progress, unit):
+    area = rand_progressive(rng, settings, test_progress, 5, 10000)
+    return f'What is the radius of a circle with area {area}{unit}', sqrt(area / pi)
+
+
+def circle_diameter_from_radius(rng, settings, test_progress, unit):
+    radius = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the diameter of a circle with radius {radius}{unit}', radius * 2
+
+
+def circle_diameter_from_circumference(rng, settings, test_progress, unit):
+    circumference = rand_progressive(rng, settings, test_progress, 5, 600)
+    return f'What is the diameter of a circle with circumference {circumference}{unit}', circumference / pi
+
+
+def circle_diameter_from_area(rng, settings, test_progress, unit):
+    area = rand_progressive(rng, settings, test_progress, 5, 10000)
+    return f'What is the diameter of a circle with area {area}{unit}', sqrt(area / pi) * 2
+
+
+def square_perimeter_from_side_length(rng, settings, test_progress, unit):
+    side_length = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the perimeter of a square with side length {side_length}{unit}', side_length * 4
+
+
+def square_perimeter_from_area(rng, settings, test_progress, unit):
+    area = rand_progressive(rng, settings, test_progress, 5, 10000)
+    return f'What is the perimeter of a square with area {area}{unit}', sqrt(area) * 4
+
+
+def square_side_length_from_perimeter(rng, settings, test_progress, unit):
+    perimeter = rand_progressive(rng, settings, test_progress, 5, 400)
+    return f'What is the side length of a square with perimeter {perimeter}{unit}', perimeter / 4
+
+
+def square_side_length_from_area(rng, settings, test_progress, unit):
+    area = rand_progressive(rng, settings, test_progress, 5, 100000)
+    return f'What is the side length of a square with area {area}{unit}', sqrt(area)
+
+
+def square_area_from_side_length(rng, settings, test_progress, unit):
+    side_length = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the area of a square with side length {side_length}{unit}', side_length ** 2
+
+
+def square_area_from_perimeter(rng, settings, test_progress, unit):
+    perimeter = rand_progressive(rng, settings, test_progress, 5, 400)
+    return f'What is the area of a square with perimeter {perimeter}{unit}', (perimeter / 4) ** 2
+
+
+def rectangle_area_from_side_lengths(rng, settings, test_progress, unit):
+    a = rand_progressive(rng, settings, test_progress, 5, 100)
+    b = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the area of a rectangle with side lengths {a}{unit} and {b}{unit}', a * b
+
+
+def rectangle_perimeter_from_side_lengths(rng, settings, test_progress, unit):
+    a = rand_progressive(rng, settings, test_progress, 5, 100)
+    b = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the perimeter of a rectangle with side lengths {a}{unit} and {b}{unit}', 2 * (a + b)
+
+
+def triangle_area_from_base_height(rng, settings, test_progress, unit):
+    base = rand_progressive(rng, settings, test_progress, 5, 100)
+    height = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the area of a triangle with base {base}{unit} and height {height}{unit}', base * height / 2
+
+
+def trapezoid_area_from_top_bottom_height(rng, settings, test_progress, unit):
+    top = rand_progressive(rng, settings, test_progress, 5, 100)
+    bottom = rand_progressive(rng, settings, test_progress, 5, 100)
+    height = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the area of a trapezoid with bottom side {bottom}{unit}, top side {top}{unit} and height {height}{unit}', (
+        bottom + top) / 2 * height
+
+
+def rhombus_area_from_diagonals(rng, settings, test_progress, unit):
+    p = rand_progressive(rng, settings, test_progress, 5, 100)
+    q = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the area of a rhombus with diagonals {p}{unit} and {q}{unit}', p * q / 2
+
+
+def kite_area_from_diagonals(rng, settings, test_progress, unit):
+    p = rand_progressive(rng, settings, test_progress, 5, 100)
+    q = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the area of a kite with diagonals {p}{unit} and {q}{unit}', p * q / 2
+
+
+def hypot_from_ab(rng, settings, test_progress, unit):
+    a = rand_progressive(rng, settings, test_progress, 5, 100)
+    b = rand_progressive(rng, settings, test_progress, 5, 100)
+    return f'What is the length of the hypotenuse in a right angled triangle with non-hypotenuse sides of length {a}{unit} and {b}{unit}', sqrt(
+        a ** 2 + b ** 2)
+
+
+def b_from_hypot_a(rng, settings, test_progress, unit):
+    a = rand_progressive(rng, settings, test_progress, 5, 100)
+    hypot = rand_progressive(rng, settings, test_progress, a + 1, a * 2)
+    return f'What is the length of the other non-hypotenuse side in a right angled triangle with hypotenuse of length {hypot}{unit} and non-hypotenuse side of length {a}{unit}', sqrt(
+        hypot ** 2 - a ** 2)
+
+
+# The types of general geometry questions.
+geometry_question_factories = [
+    circle_area_from_radius,
+    circle_area_from_diameter,
+    circle_area_from_circumference,
+    circle_circumference_from_radius,
+    circle_circumference_from_diameter,
+    circle_circumference_from_area,
+    circle_radius_from_diameter,
+    circle_radius_from_circumference,
+    circle_radius_from_area,
+    circle_diameter_from_radius,
+    circle_diameter_from_circumference,
+    circle_diameter_from_area,
+    square_perimeter_from_side_length,
+    square_perimeter_from_area,
+    square_side_length_from_perimeter,
+    square_side_length_from_area,
+    square_area_from_side_length,
+    square_area_from_perimeter,
+    rectangle_area_from_side_lengths,
+    rectangle_perimeter_from_side_lengths,
+    triangle_area_from_base_height,
+    trapezoid_area_from_top_bottom_height,
+    rhombus_area_from_diagonals,
+    kite_area_from_diagonals,
+    hypot_from_ab,
+    b_from_hypot_a
+]
+
+
+# https://stackoverflow.com/questions/20457038/how-to-round-to-2-decimals-with-python
+def roundTraditional(val, digits):
+    # round() function is not sufficient, (eg. sometimes rounds 5 down).
+    return round(val + 10 ** (-len(str(val)) - 1), digits)
+
+
+def num_to_str(dp, num):
+    return '%.*f' % (dp, num)
+
+
+def q_general_geometry(rng, settings, test_progress):
+    # Choose random type of question.
+    q_factory = rng.choice(geometry_question_factories)
+    unit = rng.choice(units)
+    (question, exact_ans) = q_factory(rng, settings, test_progress, unit)
+    # Get how many decimal points to round to.
+    dp = 0 if float(exact_ans).is_integer() else rng.randint(0, 4)
+
+    correct_ans = float(roundTraditional(exact_ans, dp))
+    question += f' to the nearest {unit.lstrip().rstrip("s")}?' if dp == 0 else f' to {dp} decimal place{"" if dp == 1 else "s"}?'
+
+    if rng.randint(0, 1) == 0:
+        return InputQuestionRecord(
+            question=question,
+            answer_format=InputAnswerFormat.NON_NEGATIVE_NUMBER,
+            correct_answer=num_to_str(dp, correct_ans)
+        )
+
+    # Fake answers are between a third of and three times the correct answer,
+    # or mixing up eg. the radius and diameter (double or half the answer).
+    fake_answer_min = round(correct_ans / 3) + 1
+    fake_answer_max = round(correct_ans * 3) + 1
+    if correct_ans.is_integer():
+        fake_answer_dp = 0
+    else:
+        # Ensure rounding is same (eg. 0.2000 correct ans => 0.6000 fake
+        # answer instead of 0.6429 as otherwise the correct ans is too
+        # obvious).
+        rounded_correct_ans = num_to_str(dp, correct_ans)
+        num_zeros = len(rounded_correct_ans) - \
+            len(rounded_correct_ans.rstrip('0'))
+        fake_answer_dp = dp - num_zeros
+    # The fake answers are multiples of 1/steps_per_unit (eg. 0.01).
+    steps_per_unit = 10 ** fake_answer_dp
+    # At least 4 candidates so there are always 3 fake answers, even when the
+    # correct answer is tiny (eg. 0 or 1).
+    candidate_count = max((fake_answer_max - fake_answer_min) * steps_per_unit + 1, 4)
+
+    def get_fake_answer(i):
+        return num_to_str(dp, fake_answer_min + i / steps_per_unit) + unit
+
+    choices, correct_choice_index = make_choices(
+        rng,
+        correct_answer=num_to_str(dp, correct_ans) + unit,
+        candidate_count=candidate_count,
+        get_candidate=get_fake_answer,
+        plausible_answers=[num_to_str(dp, correct_ans * 2) + unit, num_to_str(dp, correct_ans / 2) + unit]
+    )
+
+    return MultipleChoiceQuestionRecord(question, choices, correct_choice_index)
+
+
+class AliasSampler:
+    """
+    Chooses a random item in O(1) time, where each item is chosen with a
+    probability proportional to its weight (Vose's alias method).
+
+    :param items: List of the items to choose from.
+    :param weights: List of the (non-negative) weights of each item.
+    """
+
+    def __init__(self, items, weights):
+        item_count = len(items)
+        total_weight = sum(weights)
+        # Weights scaled so the average weight is 1.
+        scaled_weights = [weight * item_count / total_weight for weight in weights]
+        self._items = items
+        # Item i is chosen with probability _probabilities[i], otherwise the
+        # item at _aliases[i] is chosen instead.
+        self._probabilities = [1.0] * item_count
+        self._aliases = list(range(item_count))
+
+        small = [i for (i, weight) in enumerate(scaled_weights) if weight < 1]
+        large = [i for (i, weight) in enumerate(scaled_weights) if weight >= 1]
+        while small and large:
+            small_i = small.pop()
+            large_i = large.pop()
+            # Fill the rest of the small item's slot with the large item.
+            self._probabilities[small_i] = scaled_weights[small_i]
+            self._aliases[small_i] = large_i
+            scaled_weights[large_i] -= 1 - scaled_weights[small_i]
+            if scaled_weights[large_i] < 1:
+                small.append(large_i)
+            else:
+                large.append(large_i)
+
+    def sample(self, rng):
+        i = rng.randrange(len(self._items))
+        if rng.random() < self._probabilities[i]:
+            return self._items[i]
+        return self._items[self._aliases[i]]
+
+
+class QuestionTemplate:
+    def __init__(self, generate, content_area, weights):
+        # Function taking (rng, settings, test_progress) and returning a
+        # question record.
+        self.generate = generate
+        # The content area the question is in.
+        self.content_area = content_area
+        # How likely the question is to be chosen for each difficulty,
+        # relative to the other questions in the test.
+        self.weights = weights
+
+
+question_templates = [
+    QuestionTemplate(
+        q_bodmas,
+        TestContentArea.NUMBER_THEORY,
+        weights={TestDifficultySetting.NORMAL: 1, TestDifficultySetting.HARD: 1}
+    ),
+    QuestionTemplate(
+        q_factorise_quadratic,
+        TestContentArea.ALGEBRA,
+        weights={TestDifficultySetting.NORMAL: 1, TestDifficultySetting.HARD: 1}
+    ),
+    QuestionTemplate(
+        q_simplify_linear,
+        TestContentArea.ALGEBRA,
+        weights={TestDifficultySetting.NORMAL: 1, TestDifficultySetting.HARD: 1}
+    ),
+    QuestionTemplate(
+        q_find_hypot,
+        TestContentArea.GEOMETRY,
+        weights={TestDifficultySetting.NORMAL: 1, TestDifficultySetting.HARD: 1}
+    ),
+    QuestionTemplate(
+        q_general_geometry,
+        TestContentArea.GEOMETRY,
+        # There are many more types of general geometry questions.
+        weights={TestDifficultySetting.NORMAL: 4, TestDifficultySetting.HARD: 4}
+    ),
+]
+
+# (content areas, difficulty) => AliasSampler of question generators.
+question_generator_samplers = {}
+
+
+def get_question_generator_sampler(settings):
+    """Returns the sampler choosing the question generators for the chosen
+    content areas and difficulty."""
+    key = (frozenset(settings.content), settings.difficulty)
+    sampler = question_generator_samplers.get(key)
+    if sampler is None:
+        templates = [template for template in question_templates
+                     if template.content_area in settings.content]
+        sampler = AliasSampler(
+            [template.generate for template in templates],
+            [template.weights[settings.difficulty] for template in templates]
+        )
+        question_generator_samplers[key] = sampler
+    return sampler
+
+
+def generate_question(settings, seed, question_index):
+    """Generates the question record at the given index of a test. The same
+    settings, seed and index always give the same question."""
+    # Seeding with a string is deterministic across processes (unlike hash()),
+    # and gives every question its own independent random stream.
+    rng = Random('%s:%s' % (seed, question_index))
+    question_generator = get_question_generator_sampler(settings).sample(rng)
+    test_progress = get_test_progress(
+        settings, question_index % settings.question_count.value)
+    return question_generator(rng, settings, test_progress)
+
+
+def warm_question_caches():
+    """Builds the lazily built tables and question samplers now instead of
+    during the first test, eg. before forking worker processes so they all
+    share the same memory."""
+    pythag_triple_store.warm()
+    smallest_prime_factor_table.warm()
+    content_areas = list(TestContentArea)
+    for difficulty in TestDifficultySetting:
+        for content_count in range(1, len(content_areas) + 1):
+            for content in combinations(content_areas, content_count):
+                get_question_generator_sampler(TestSettings(
+                    difficulty, set(content), TestQuestionCountSetting.NORMAL))
+
+
+def _generate_question_chunk(settings, seed, start_index, stop_index):
+    # Runs in a worker process.
+    return [generate_question(settings, seed, question_index)
+            for question_index in range(start_index, stop_index)]
+
+
+def generate_question_bank(settings, seed, question_count, processes=None, chunk_size=1000):
+    """
+    Yields `question_count` question records, generated in chunks across worker
+    processes. The bank is made of back-to-back tests (the difficulty restarts
+    every `settings.question_count` questions), and is the same for the same
+    seed no matter how many processes are used.
+
+    :param processes: The number of worker processes (defaults to the number
+        of cpus).
+    :param chunk_size: The number of questions generated per task.
+    """
+    processes = processes or cpu_count() or 1
+    # Only keep a few chunks in flight so memory use doesn't grow with the
+    # size of the bank.
+    max_pending_chunks = processes * 4
+    with ProcessPoolExecutor(processes) as executor:
+        pending_chunks = deque()
+        for start_index in range(0, question_count, chunk_size):
+            stop_index = min(start_index + chunk_size, question_count)
+            pending_chunks.append(executor.submit(
+                _generate_question_chunk, settings, seed, start_index, stop_index))
+            if len(pending_chunks) >= max_pending_chunks:
+                yield from pending_chunks.popleft().result()
+        while pending_chunks:
+            yield from pending_chunks.popleft().result()
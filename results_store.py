@@ -0,0 +1,158 @@
+# Durable log of finished tests, one json object per line.
+#
+# Results are written by a background thread so recording one never waits for
+# the disk. The thread writes everything queued since its last write in one go
+# and fsyncs once per batch (group commit): when lots of tests finish at once,
+# they share the same fsync instead of waiting for one each.
+
+import json
+import os
+from collections import deque
+from threading import Condition, Thread
+from typing import Iterator, Optional
+
+
+class ResultsStore:
+    """
+    Append-only results log. The file is opened with O_APPEND and every batch
+    is written with a single write, so several processes (eg. the telnet
+    server workers) can share the same log.
+
+    :param path: The file to append results to (created if missing).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._condition = Condition()
+        # Encoded results waiting to be written.
+        self._pending = deque()
+        # Number of results recorded, and written to disk, by this process.
+        self._recorded_count = 0
+        self._written_count = 0
+        self._closed = False
+        # The writer thread is only started when the first result is recorded,
+        # so the store can be created before forking worker processes.
+        self._writer_pid: Optional[int] = None
+
+    def record(self, result: dict) -> None:
+        """Queues a result to be written (returns immediately)."""
+        line = (json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._condition:
+            if self._closed:
+                raise ValueError('results store is closed')
+            if self._writer_pid != os.getpid():
+                self._start_writer()
+            self._pending.append(line)
+            self._recorded_count += 1
+            self._condition.notify_all()
+
+    def _start_writer(self) -> None:
+        self._writer_pid = os.getpid()
+        # Results recorded by the parent process before forking are its own to
+        # write.
+        self._pending.clear()
+        self._recorded_count = self._written_count = 0
+        Thread(target=self._write_loop, name='results-writer', daemon=True).start()
+
+    def _write_loop(self) -> None:
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while True:
+                with self._condition:
+                    while not self._pending and not self._closed:
+                        self._condition.wait()
+                    if not self._pending:
+                        return
+                    batch = list(self._pending)
+                    self._pending.clear()
+
+                # Results recorded while this batch is written and synced are
+                # queued for the next batch.
+                data = b''.join(batch)
+                while data:
+                    data = data[os.write(fd, data):]
+                os.fsync(fd)
+
+                with self._condition:
+                    self._written_count += len(batch)
+                    self._condition.notify_all()
+        finally:
+            os.close(fd)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every result recorded so far is on disk. Returns False if
+        the timeout expired first."""
+        with self._condition:
+            if self._writer_pid != os.getpid():
+                return True
+            target = self._recorded_count
+            return self._condition.wait_for(lambda: self._written_count >= target, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Writes the queued results and stops the writer thread."""
+        flushed = self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        return flushed
+
+
+class ResultsLogReader:
+    """
+    Reads the results appended to a results log since the last read, eg. to
+    pick up the results written by other processes.
+
+    :param path: The results log to read (it doesn't need to exist yet).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # Where to read from next.
+        self._offset = 0
+        # The start of a line that is still being written (or that was cut
+        # short), kept until its newline is written.
+        self._partial_line = b''
+
+    def read_new(self) -> Iterator[dict]:
+        """Yields the results written since the last call, oldest first. A line
+        that is still being written is left for the next call, a line cut short
+        (eg. by a crash while writing) is skipped."""
+        try:
+            file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with file:
+            file.seek(self._offset)
+            for line in file:
+                self._offset += len(line)
+                if not line.endswith(b'\n'):
+                    self._partial_line += line
+                    return
+                if self._partial_line:
+                    line = self._partial_line + line
+                    self._partial_line = b''
+                result = _parse_result(line)
+                if result is not None:
+                    yield result
+
+
+def _parse_result(line: bytes) -> Optional[dict]:
+    """Returns the result of a line of the log, or None if there isn't one."""
+    try:
+        return json.loads(line)
+    except ValueError:
+        pass
+    # A line cut short is followed by the next line written (without a newline
+    # in between): resynchronise at the start of that line's result.
+    start = line.find(b'{"', 1)
+    while start != -1:
+        try:
+            return json.loads(line[start:])
+        except ValueError:
+            start = line.find(b'{"', start + 1)
+    return None
+
+
+def read_results(path: str) -> Iterator[dict]:
+    """Yields the results in a results log, oldest first."""
+    return ResultsLogReader(path).read_new()
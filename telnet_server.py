@@ -0,0 +1,115 @@
+# Telnet server mode, so a whole classroom can take tests from one running copy
+# of the program (eg. `telnet <host> 2323`).
+
+import asyncio
+import socket
+from typing import Callable, Optional
+
+from prompt_toolkit.application import Application
+from prompt_toolkit.contrib.telnet.server import TelnetConnection, TelnetServer
+
+DEFAULT_PORT = 2323
+
+# Connections waiting to be accepted. TelnetServer only allows 4, which drops
+# connections when a whole class connects at once.
+LISTEN_BACKLOG = 512
+
+
+class QuizTelnetServer(TelnetServer):
+    """
+    Telnet server running a separate application for every connection, all
+    sharing one event loop.
+
+    :param build_application: Called for every connection to create the
+        application for that session.
+    :param reuse_port: Bind with SO_REUSEPORT so several processes can each
+        listen on the same port (the kernel spreads connections between them).
+    :param on_session_start: `None` or callable, called when a session starts.
+    :param on_session_end: `None` or callable, called when a session ends.
+    """
+
+    def __init__(self, build_application: Callable[[], Application],
+                 host: str = '0.0.0.0', port: int = DEFAULT_PORT,
+                 reuse_port: bool = False,
+                 on_session_start: Optional[Callable[[], None]] = None,
+                 on_session_end: Optional[Callable[[], None]] = None) -> None:
+        self.build_application = build_application
+        self.reuse_port = reuse_port
+        self.on_session_start = on_session_start
+        self.on_session_end = on_session_end
+        super().__init__(host=host, port=port, interact=self._interact)
+
+    def _create_socket(self, host: str, port: int) -> socket.socket:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        s.bind((host, port))
+        s.listen(LISTEN_BACKLOG)
+        # So drain() can accept whatever is left in the backlog without
+        # blocking (accepted connections are still blocking).
+        s.setblocking(False)
+        return s
+
+    def _accept(self) -> None:
+        try:
+            super()._accept()
+        except BlockingIOError:
+            # Another process sharing the port accepted the connection first.
+            pass
+
+    async def _interact(self, connection: TelnetConnection) -> None:
+        if self.on_session_start:
+            self.on_session_start()
+        try:
+            # The connection's input and output are the current app session
+            # here, so the application draws to the telnet client.
+            await self.build_application().run_async()
+        finally:
+            if self.on_session_end:
+                self.on_session_end()
+
+    async def drain(self, timeout: float) -> None:
+        """Stops accepting connections, then waits up to `timeout` seconds for
+        the running sessions to finish before closing them."""
+        if self._listen_socket:
+            asyncio.get_event_loop().remove_reader(self._listen_socket)
+            # Closing the socket resets the connections waiting in its backlog,
+            # so accept them first.
+            while True:
+                try:
+                    super()._accept()
+                except BlockingIOError:
+                    break
+            self._listen_socket.close()
+            self._listen_socket = None
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while self._application_tasks and loop.time() < deadline:
+            await asyncio.sleep(0.5)
+
+        tasks = list(self._application_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def serve(build_application: Callable[[], Application],
+          host: str = '0.0.0.0', port: int = DEFAULT_PORT) -> None:
+    """Runs the telnet server until interrupted (ctrl-c)."""
+    server = QuizTelnetServer(build_application, host=host, port=port)
+
+    async def run() -> None:
+        server.start()
+        print('Listening for telnet connections on %s port %s' % (host, port))
+        try:
+            # Serve until cancelled.
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,82 @@
+"""Tests of the live leaderboard."""
+import bisect
+import os
+import sys
+from random import Random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import IndexableSkipList, Leaderboard, LeaderboardEntry  # noqa: E402
+
+
+def check_skip_list(skip_list, keys):
+    """Checks the skip list against the sorted list of its keys (the value of
+    every item is its key as a string)."""
+    assert len(skip_list) == len(keys)
+    assert list(skip_list) == [str(key) for key in keys]
+    assert [skip_list[i] for i in range(len(keys))] == [str(key) for key in keys]
+    if keys:
+        assert skip_list[-1] == str(keys[-1])
+    for key in keys:
+        assert skip_list.rank(key) == bisect.bisect_left(keys, key)
+    # Keys that aren't in the list.
+    for key in [-1, 0.5, 10 ** 6]:
+        assert skip_list.rank(key) == bisect.bisect_left(keys, key)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_skip_list_against_sorted_list(seed):
+    rng = Random(seed)
+    skip_list = IndexableSkipList(seed)
+    keys = []
+    for _ in range(600):
+        if keys and rng.random() < 0.4:
+            key = rng.choice(keys)
+            skip_list.remove(key)
+            keys.remove(key)
+        else:
+            key = rng.randrange(10 ** 5)
+            if key in keys:
+                continue
+            skip_list.insert(key, str(key))
+            bisect.insort(keys, key)
+        if rng.random() < 0.05:
+            check_skip_list(skip_list, keys)
+    check_skip_list(skip_list, keys)
+
+    # Empty it.
+    for key in list(keys):
+        skip_list.remove(key)
+        keys.remove(key)
+    check_skip_list(skip_list, keys)
+
+
+def test_skip_list_missing_items():
+    skip_list = IndexableSkipList()
+    skip_list.insert(1, 'a')
+    with pytest.raises(KeyError):
+        skip_list.remove(2)
+    with pytest.raises(IndexError):
+        skip_list[1]
+    with pytest.raises(IndexError):
+        skip_list[-2]
+
+
+def test_rankings_of_kinds_without_tests():
+    """Getting the ranking of a difficulty or content area without tests
+    doesn't add one to the leaderboard."""
+    leaderboard = Leaderboard()
+    assert len(leaderboard.difficulty_ranking('hard')) == 0
+    assert len(leaderboard.content_ranking('geometry')) == 0
+    assert leaderboard.by_difficulty == {}
+    assert leaderboard.by_content == {}
+
+    entry = LeaderboardEntry('bob', 'hard', ('algebra',), 3, 5, 10, 20, True)
+    leaderboard.update(entry)
+    assert leaderboard.difficulty_ranking('hard').top(1) == [entry]
+    assert leaderboard.content_ranking('algebra').rank(entry) == 1
+    assert len(leaderboard.difficulty_ranking('normal')) == 0
+    assert len(leaderboard.content_ranking('geometry')) == 0
+    assert sorted(leaderboard.by_content) == ['algebra']
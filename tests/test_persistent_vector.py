@@ -0,0 +1,52 @@
+"""Tests of the persistent vector the test questions are kept in."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistent_vector import BRANCH_FACTOR, PersistentVector  # noqa: E402
+
+# Enough items for a tree of three levels.
+LENGTHS = [0, 1, BRANCH_FACTOR, BRANCH_FACTOR + 1, BRANCH_FACTOR ** 2 + 3]
+
+
+@pytest.mark.parametrize('length', LENGTHS)
+def test_from_iterable(length):
+    items = list(range(length))
+    vector = PersistentVector.from_iterable(items)
+    assert len(vector) == length
+    assert list(vector) == items
+    assert [vector[i] for i in range(length)] == items
+    if length:
+        assert vector[-1] == items[-1]
+
+
+@pytest.mark.parametrize('length', LENGTHS[1:])
+def test_set_keeps_old_versions(length):
+    items = list(range(length))
+    versions = [PersistentVector.from_iterable(items)]
+    expected = [list(items)]
+    for i in sorted({0, length // 2, length - 1}):
+        versions.append(versions[-1].set(i, 'changed %s' % i))
+        expected.append(list(expected[-1]))
+        expected[-1][i] = 'changed %s' % i
+
+    for vector, items in zip(versions, expected):
+        assert list(vector) == items
+        assert [vector[i] for i in range(length)] == items
+
+
+def test_set_negative_index():
+    vector = PersistentVector.from_iterable('abc').set(-1, 'z')
+    assert list(vector) == ['a', 'b', 'z']
+
+
+@pytest.mark.parametrize('index', [3, -4])
+def test_index_out_of_range(index):
+    vector = PersistentVector.from_iterable('abc')
+    with pytest.raises(IndexError):
+        vector[index]
+    with pytest.raises(IndexError):
+        vector.set(index, 'z')
@@ -0,0 +1,46 @@
+"""Tests of the telnet server's session counters."""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prefork_server import WorkerStats  # noqa: E402
+from prompt_toolkit.application import Application  # noqa: E402
+from telnet_server import QuizTelnetServer  # noqa: E402
+
+
+async def wait_for(condition, timeout=5):
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, 'timed out'
+        await asyncio.sleep(0.01)
+
+
+def test_disconnect_ends_session():
+    """
+    A client that disconnects ends its session, so it's no longer counted as
+    active (and a draining worker doesn't wait for it).
+    """
+    stats = WorkerStats(1)
+
+    async def run():
+        server = QuizTelnetServer(
+            Application, host='127.0.0.1', port=0,
+            on_session_start=lambda: stats.session_started(0),
+            on_session_end=lambda: stats.session_ended(0))
+        server.start()
+        port = server._listen_socket.getsockname()[1]
+
+        _, writer = await asyncio.open_connection('127.0.0.1', port)
+        await wait_for(lambda: stats.active_sessions(0) == 1)
+
+        writer.close()
+        await wait_for(lambda: stats.active_sessions(0) == 0)
+        assert stats.total_sessions(0) == 1
+        await wait_for(lambda: not server._application_tasks)
+
+        await server.drain(0)
+
+    asyncio.run(run())
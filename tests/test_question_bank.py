@@ -0,0 +1,74 @@
+"""Tests of the binary question bank files."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import question_bank as qb  # noqa: E402
+import question_generation as qg  # noqa: E402
+
+SETTINGS = qg.TestSettings(
+    difficulty=qg.TestDifficultySetting.HARD,
+    content={qg.TestContentArea.NUMBER_THEORY, qg.TestContentArea.GEOMETRY},
+    question_count=qg.TestQuestionCountSetting.SHORT
+)
+
+
+def make_records(settings, test_count):
+    return [qg.generate_question(settings, 7, i)
+            for i in range(test_count * settings.question_count.value)]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'bank.qmb')
+    records = make_records(SETTINGS, 3)
+    qb.write_question_bank(path, iter(records), SETTINGS)
+
+    bank = qb.QuestionBank(path)
+    assert len(bank) == len(records)
+    assert [qg.question_record_to_dict(record) for record in bank] == \
+        [qg.question_record_to_dict(record) for record in records]
+    assert qg.question_record_to_dict(bank[-1]) == qg.question_record_to_dict(records[-1])
+    with pytest.raises(IndexError):
+        bank[len(records)]
+
+    assert bank.test_length == SETTINGS.question_count.value
+    assert bank.test_count == 3
+    test = bank.get_test(1)
+    assert len(test) == SETTINGS.question_count.value
+    assert [qg.question_record_to_dict(record) for record in test] == \
+        [qg.question_record_to_dict(record) for record in records[len(test):2 * len(test)]]
+    with pytest.raises(IndexError):
+        bank.get_test(3)
+
+
+def test_settings(tmp_path):
+    path = str(tmp_path / 'bank.qmb')
+    qb.write_question_bank(path, make_records(SETTINGS, 1), SETTINGS)
+
+    # Hard is difficulty 2, number theory and geometry are content bits 1 | 4.
+    with open(path, 'rb') as file:
+        header = qb._header_struct.unpack(file.read(qb._header_struct.size))
+    assert header[:5] == (qb.QUESTION_BANK_MAGIC, 2, SETTINGS.question_count.value, 2, 5)
+
+    bank = qb.QuestionBank(path)
+    for settings in [bank.settings, bank.get_test(0).settings]:
+        assert settings.difficulty == SETTINGS.difficulty
+        assert settings.content == SETTINGS.content
+        assert settings.question_count == SETTINGS.question_count
+
+
+def test_invalid_files(tmp_path):
+    path = str(tmp_path / 'bank.qmb')
+    qb.write_question_bank(path, make_records(SETTINGS, 1), SETTINGS)
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    for invalid_data in [b'', b'QMQB', b'XXXX' + data[4:], data[:-1],
+                         data[:8] + bytes([3]) + data[9:]]:
+        with open(path, 'wb') as file:
+            file.write(invalid_data)
+        with pytest.raises(qb.QuestionBankError):
+            qb.QuestionBank(path)
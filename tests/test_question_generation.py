@@ -0,0 +1,27 @@
+"""Tests of the text of generated expressions."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_generation import ExprNode, ExprNodeType, expr_to_str, number_node  # noqa: E402
+
+ADD_1_2 = ExprNode(ExprNodeType.ADD, 3, [number_node(1), number_node(2)])
+
+
+def power(base, exponent):
+    return ExprNode(ExprNodeType.POWER, base.value ** exponent, [base, number_node(exponent)])
+
+
+@pytest.mark.parametrize('node, text', [
+    (power(number_node(3), 2), '3²'),
+    (power(ADD_1_2, 2), '(1 + 2)²'),
+    (power(ExprNode(ExprNodeType.PARENS, 3, [ADD_1_2]), 2), '(1 + 2)²'),
+    (power(ExprNode(ExprNodeType.PARENS, 3, [ExprNode(ExprNodeType.PARENS, 3, [ADD_1_2])]), 3),
+     '((1 + 2))³'),
+    (power(power(number_node(2), 2), 3), '(2²)³'),
+])
+def test_power(node, text):
+    assert expr_to_str(node)[0] == text
@@ -0,0 +1,76 @@
+"""Tests of the results log."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from results_store import ResultsLogReader, ResultsStore, read_results  # noqa: E402
+
+RESULTS = [
+    {'username': 'bob', 'correct_count': 3, 'answers': [{'state': 'answered_correct'}]},
+    {'username': 'zoë', 'correct_count': 0, 'answers': []},
+    {'username': 'al\n', 'correct_count': 5, 'answers': None},
+]
+
+
+def encode(result):
+    return (json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'results.jsonl')
+    reader = ResultsLogReader(path)
+    assert list(reader.read_new()) == []
+
+    store = ResultsStore(path)
+    store.record(RESULTS[0])
+    assert store.flush(5)
+    assert list(reader.read_new()) == RESULTS[:1]
+
+    for result in RESULTS[1:]:
+        store.record(result)
+    assert store.close(5)
+    assert list(reader.read_new()) == RESULTS[1:]
+    assert list(reader.read_new()) == []
+    assert list(read_results(path)) == RESULTS
+
+
+def test_line_being_written(tmp_path):
+    """The last line is only read once it's complete."""
+    path = str(tmp_path / 'results.jsonl')
+    line = encode(RESULTS[1])
+    with open(path, 'wb') as file:
+        file.write(encode(RESULTS[0]) + line[:5])
+    reader = ResultsLogReader(path)
+    assert list(reader.read_new()) == RESULTS[:1]
+    assert list(reader.read_new()) == []
+
+    with open(path, 'ab') as file:
+        file.write(line[5:])
+    assert list(reader.read_new()) == RESULTS[1:2]
+
+
+def test_line_cut_short(tmp_path):
+    """
+    A line cut short (eg. by a crash while writing it) is skipped, without
+    losing the result written after it, even when the reader saw the line
+    before the next result was written.
+    """
+    path = str(tmp_path / 'results.jsonl')
+    cut_line = encode(RESULTS[0])[:-9]
+    with open(path, 'wb') as file:
+        file.write(cut_line)
+    reader = ResultsLogReader(path)
+    assert list(reader.read_new()) == []
+
+    with open(path, 'ab') as file:
+        file.write(encode(RESULTS[1]) + encode(RESULTS[2]))
+    assert list(reader.read_new()) == RESULTS[1:]
+    assert list(read_results(path)) == RESULTS[1:]
+
+    # Cut short in the middle of a character.
+    line = encode(RESULTS[1])
+    with open(path, 'ab') as file:
+        file.write(line[:line.index('ë'.encode('utf-8')) + 1] + encode(RESULTS[0]))
+    assert list(reader.read_new()) == RESULTS[:1]
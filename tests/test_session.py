@@ -0,0 +1,82 @@
+"""Tests of the program's sessions and test scores."""
+import importlib.util
+import os
+import sys
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_PATH)
+
+import question_generation as qg  # noqa: E402
+from persistent_vector import PersistentVector  # noqa: E402
+
+# The program itself (__main__.py at the root of the repository).
+_spec = importlib.util.spec_from_file_location(
+    'quick_maths', os.path.join(ROOT_PATH, '__main__.py'))
+quick_maths = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(quick_maths)
+
+SETTINGS = qg.TestSettings(
+    difficulty=qg.TestDifficultySetting.HARD,
+    content={qg.TestContentArea.ALGEBRA},
+    question_count=qg.TestQuestionCountSetting.NORMAL
+)
+
+
+def test_session_from_record_list():
+    """
+    Any sequence of records can be used as a question bank: a session taking
+    its questions from one without settings uses the session's settings.
+    """
+    records = [qg.generate_question(SETTINGS, 1, i)
+               for i in range(SETTINGS.question_count.value)]
+    session = quick_maths.Session('bob', SETTINGS, question_bank=records)
+    assert session.test_settings is SETTINGS
+
+    questions = PersistentVector.from_iterable(
+        quick_maths.TestQuestion(None, quick_maths.TestQuestionAnswerStateNotAnswered())
+        for _ in records)
+    test = quick_maths.Test(10, questions, 0, quick_maths.TestScore(len(records)))
+    result = quick_maths.make_test_result(session, test, 25)
+    assert result['username'] == 'bob'
+    assert result['difficulty'] == 'hard'
+    assert result['content'] == ['algebra']
+    assert result['question_count'] == len(records)
+    assert result['time_taken'] == 15
+
+
+def test_test_score_update():
+    """
+    The score of a test follows the answers, including questions answered
+    again (going back, or retrying the incorrect questions).
+    """
+    states = quick_maths.TestQuestionAnswerStateType
+    score = quick_maths.TestScore(70)
+    assert score.unanswered_count == 70
+    assert score.first_incorrect_question_index is None
+
+    score = score.update(3, states.NOT_ANSWERED, states.ANSWERED_INCORRECT)
+    score = score.update(65, states.NOT_ANSWERED, states.ANSWERED_INCORRECT)
+    score = score.update(0, states.NOT_ANSWERED, states.ANSWERED_CORRECT)
+    assert (score.correct_count, score.incorrect_count, score.unanswered_count) == (1, 2, 67)
+    assert score.first_incorrect_question_index == 3
+    assert list(score.iter_incorrect_question_indices()) == [3, 65]
+
+    # Retrying an incorrect question.
+    retried = score.update(3, states.ANSWERED_INCORRECT, states.ANSWERED_CORRECT)
+    assert (retried.correct_count, retried.incorrect_count) == (2, 1)
+    assert retried.first_incorrect_question_index == 65
+    assert list(retried.iter_incorrect_question_indices()) == [65]
+    # Scores are never changed in place.
+    assert list(score.iter_incorrect_question_indices()) == [3, 65]
+
+    # Answering a question incorrectly again keeps it counted once.
+    again = score.update(65, states.ANSWERED_INCORRECT, states.ANSWERED_INCORRECT)
+    assert again.incorrect_count == 2
+    assert list(again.iter_incorrect_question_indices()) == [3, 65]
+
+    # Questions reset to be answered again.
+    cleared = retried.update(65, states.ANSWERED_INCORRECT, states.NOT_ANSWERED)
+    cleared = cleared.update(0, states.ANSWERED_CORRECT, states.NOT_ANSWERED)
+    assert (cleared.correct_count, cleared.incorrect_count, cleared.unanswered_count) == (1, 0, 69)
+    assert cleared.first_incorrect_question_index is None
+    assert list(cleared.iter_incorrect_question_indices()) == []
@@ -0,0 +1,113 @@
+"""Tests of the telnet protocol parser, with the input split into chunks."""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_toolkit.contrib.telnet.log import logger  # noqa: E402
+from prompt_toolkit.contrib.telnet.protocol import (  # noqa: E402
+    DO, DONT, IAC, NAWS, NOP, SB, SE, WILL, WONT, TelnetProtocolParser,
+    int2byte
+)
+
+# Random input has plenty of malformed NAWS messages, which are logged.
+logger.disabled = True
+
+
+def record_events(chunks):
+    """Returns the callbacks the parser makes, with consecutive data merged
+    (the chunks split the data differently)."""
+    events = []
+
+    def data_received(data):
+        if events and events[-1][0] == 'data':
+            events[-1] = ('data', events[-1][1] + data)
+        else:
+            events.append(('data', data))
+
+    parser = TelnetProtocolParser(
+        data_received, lambda rows, columns: events.append(('size', rows, columns)))
+    parser.command_received = lambda command, data: events.append(('command', command, data))
+    for chunk in chunks:
+        parser.feed(chunk)
+    return events
+
+
+def split_at(data, *positions):
+    bounds = [0] + list(positions) + [len(data)]
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def naws(columns, rows):
+    return IAC + SB + NAWS + bytes([columns >> 8, columns & 0xff, rows >> 8, rows & 0xff]) + IAC + SE
+
+
+STREAMS = [
+    # Window size between key presses.
+    (b'ab' + naws(80, 24) + b'cd',
+     [('data', b'ab'), ('size', 24, 80), ('data', b'cd')]),
+    # 255 columns: the IAC in the NAWS payload is escaped.
+    (IAC + SB + NAWS + b'\x00' + IAC + IAC + b'\x00\x28' + IAC + SE + b'x',
+     [('size', 40, 255), ('data', b'x')]),
+    # Escaped IAC in the data, NUL bytes are NOPs.
+    (b'a' + IAC + IAC + b'\x00b\x00',
+     [('data', b'a' + IAC + b'b')]),
+    (IAC + DO + NAWS + IAC + WILL + b'\x01' + b'z' + IAC + DONT + b'\x03' + IAC + WONT + IAC,
+     [('command', DO, NAWS), ('command', WILL, b'\x01'), ('data', b'z'),
+      ('command', DONT, b'\x03'), ('command', WONT, IAC)]),
+]
+
+
+@pytest.mark.parametrize('data, expected', STREAMS)
+def test_split_in_two(data, expected):
+    assert record_events([data]) == expected
+    for position in range(len(data) + 1):
+        assert record_events(split_at(data, position)) == expected, position
+
+
+@pytest.mark.parametrize('data, expected', STREAMS)
+def test_split_in_three(data, expected):
+    for first in range(len(data) + 1):
+        for second in range(first, len(data) + 1):
+            assert record_events(split_at(data, first, second)) == expected, (first, second)
+
+
+@pytest.mark.parametrize('data, expected', STREAMS)
+def test_single_bytes(data, expected):
+    assert record_events([data[i:i + 1] for i in range(len(data))]) == expected
+
+
+def random_telnet_stream(rng, length):
+    stream = bytearray()
+    while len(stream) < length:
+        kind = rng.random()
+        if kind < 0.6:
+            stream += bytes(rng.randrange(256) for _ in range(rng.randrange(20)))
+        elif kind < 0.7:
+            # NAWS, the payload may contain escaped (or unescaped) IACs.
+            stream += IAC + SB + NAWS + bytes(rng.randrange(256) for _ in range(4)) + IAC + SE
+        elif kind < 0.8:
+            stream += IAC + rng.choice([DO, DONT, WILL, WONT]) + int2byte(rng.randrange(256))
+        elif kind < 0.9:
+            stream += IAC + IAC
+        else:
+            stream += IAC + int2byte(rng.randrange(256))
+    return bytes(stream)
+
+
+def test_random_chunks():
+    """
+    Random streams of data and commands give the same events however they are
+    split into chunks (as they are read from the socket).
+    """
+    rng = random.Random(0)
+    for _ in range(500):
+        data = random_telnet_stream(rng, rng.randrange(200))
+        positions = sorted(rng.randrange(len(data) + 1) for _ in range(rng.randrange(8)))
+        expected = record_events([data[i:i + 1] for i in range(len(data))])
+        assert record_events([data]) == expected, data
+        assert record_events(split_at(data, *positions)) == expected, data
+        assert NOP not in b''.join(event[1] for event in expected if event[0] == 'data')